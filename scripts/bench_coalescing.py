@@ -0,0 +1,136 @@
+"""
+Бенчмарк объединения одинаковых GET-запросов к LeafFlow API.
+
+Backend заменён заглушкой с задержкой, которая считает дошедшие до неё
+запросы. Сценарии:
+- «админы»: несколько админов одновременно нажимают «📋 Подробнее» на
+  одной карточке заказа (одновременные get_order одного заказа);
+- «двойное нажатие»: покупатель нажимает «Подробнее» второй раз, когда
+  первый ответ уже получен;
+- «после записи»: get_order, смена статуса, снова get_order — второй
+  запрос обязан дойти до backend.
+
+Каждый сценарий прогоняется без объединения, с объединением запросов в
+полёте и с объединением плюс микрокэш.
+
+Запуск: python scripts/bench_coalescing.py [--orders 200] [--taps 5] [--backend-latency 0.05]
+"""
+import argparse
+import asyncio
+import logging
+import re
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+import httpx
+
+from tg_bot.api_client.base import BaseApiClient
+from tg_bot.api_client.breaker import EndpointGuards
+from tg_bot.api_client.cache import TTLCache
+from tg_bot.api_client.orders import OrdersApi
+from tg_bot.api_client.pool import ApiHttpPool
+
+BACKEND_URL = "http://backend.bench"
+
+
+def _stub_backend(latency: float, hits: Counter) -> httpx.MockTransport:
+    statuses: dict[str, str] = {}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        hits[request.method] += 1
+        await asyncio.sleep(latency)
+        match = re.fullmatch(r"/api/v1/internal/orders/([^/]+)(/status)?", request.url.path)
+        if match is None:
+            return httpx.Response(404, json={"detail": "unknown endpoint"})
+        order_id = match.group(1)
+        if request.method == "PATCH":
+            statuses[order_id] = httpx.Response(200, content=request.content).json()["newStatus"]
+        return httpx.Response(
+            200,
+            json={
+                "orderId": order_id,
+                "status": statuses.get(order_id, "created"),
+                "total": "1500.00",
+                "deliveryMethod": "courier",
+                "createdAt": datetime.now(timezone.utc).isoformat(),
+                "items": [],
+            },
+        )
+
+    return httpx.MockTransport(handler)
+
+
+def _client(mode: str, latency: float, hits: Counter) -> tuple[OrdersApi, ApiHttpPool]:
+    pool = ApiHttpPool(base_url=BACKEND_URL, timeout=BaseApiClient.DEFAULT_TIMEOUT, max_connections=1000)
+    pool.client = httpx.AsyncClient(base_url=BACKEND_URL, transport=_stub_backend(latency, hits))
+    api = OrdersApi(
+        base_url=BACKEND_URL,
+        token="bench",
+        pool=pool,
+        guards=EndpointGuards(max_concurrency=1000),
+        coalesce_gets=mode != "off",
+        get_cache=TTLCache(name=f"bench_{mode}", maxsize=1000, ttl=1.0) if mode == "cache" else None,
+    )
+    return api, pool
+
+
+async def _timed(call) -> float:
+    started = time.perf_counter()
+    await call
+    return time.perf_counter() - started
+
+
+async def _admins(api: OrdersApi, orders: int, taps: int) -> list[float]:
+    samples: list[float] = []
+    for index in range(orders):
+        samples += await asyncio.gather(*(_timed(api.get_order(f"A{index}")) for _ in range(taps)))
+    return samples
+
+
+async def _double_tap(api: OrdersApi, orders: int) -> list[float]:
+    samples: list[float] = []
+    for index in range(orders):
+        samples.append(await _timed(api.get_order(f"B{index}")))
+        samples.append(await _timed(api.get_order(f"B{index}")))
+    return samples
+
+
+async def _after_write(api: OrdersApi) -> bool:
+    before = await api.get_order("C1")
+    await api.update_order_status("C1", "paid")
+    after = await api.get_order("C1")
+    return before.status == "created" and after.status == "paid"
+
+
+def _mean_ms(samples: list[float]) -> float:
+    return sum(samples) / len(samples) * 1e3
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--taps", type=int, default=5)
+    parser.add_argument("--backend-latency", type=float, default=0.05)
+    args = parser.parse_args()
+    logging.disable(logging.ERROR)
+
+    print(f"{args.orders} заказов, {args.taps} одновременных нажатий, задержка backend {args.backend_latency * 1e3:.0f} мс")
+    modes = {"off": "без объединения", "coalesce": "объединение в полёте", "cache": "объединение + микрокэш 1 с"}
+    for mode, title in modes.items():
+        hits: Counter = Counter()
+        api, pool = _client(mode, args.backend_latency, hits)
+        admins = await _admins(api, args.orders, args.taps)
+        admins_hits = hits["GET"]
+        double_tap = await _double_tap(api, args.orders)
+        double_tap_hits = hits["GET"] - admins_hits
+        fresh = await _after_write(api)
+        await pool.aclose()
+        print(title)
+        print(f"  {'админы':>16}: запросов {admins_hits:5d} из {args.orders * args.taps:5d}, в среднем {_mean_ms(admins):6.1f} мс")
+        print(f"  {'двойное нажатие':>16}: запросов {double_tap_hits:5d} из {args.orders * 2:5d}, в среднем {_mean_ms(double_tap):6.1f} мс")
+        print(f"  {'после записи':>16}: {'свежий ответ' if fresh else 'УСТАРЕВШИЙ ОТВЕТ'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
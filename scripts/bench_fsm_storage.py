@@ -0,0 +1,79 @@
+"""
+Бенчмарк хранилищ FSM при большом числе активных ключей.
+
+Заполняет хранилище `--keys` активными сценариями (состояние + данные,
+как у OrderChatStates.waiting_message), затем измеряет задержку
+get_state / set_state / update_data для случайных ключей:
+- MemoryStorage (aiogram, по умолчанию до перехода);
+- TTLMemoryStorage;
+- SqliteStorage (WAL, временный файл).
+
+Запуск: python scripts/bench_fsm_storage.py [--keys 100000] [--ops 20000]
+"""
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from tg_bot.bot.fsm_storage import SqliteStorage, TTLMemoryStorage
+from tg_bot.bot.states import OrderChatStates
+
+BOT_ID = 42
+
+
+def _key(user_id: int) -> StorageKey:
+    return StorageKey(bot_id=BOT_ID, chat_id=user_id, user_id=user_id)
+
+
+def _percentiles(samples: list[float]) -> str:
+    samples.sort()
+    p50 = samples[len(samples) // 2]
+    p99 = samples[int(len(samples) * 0.99)]
+    return f"p50 {p50 * 1e6:7.1f} мкс  p99 {p99 * 1e6:7.1f} мкс"
+
+
+async def _bench(name: str, storage: BaseStorage, keys: int, ops: int) -> None:
+    started = time.perf_counter()
+    for user_id in range(keys):
+        key = _key(user_id)
+        await storage.set_state(key, OrderChatStates.waiting_message)
+        await storage.set_data(key, {"order_id": f"ORD-{user_id:06d}"})
+    fill = time.perf_counter() - started
+
+    targets = [_key(random.randrange(keys)) for _ in range(ops)]
+    operations = {
+        "get_state": lambda key: storage.get_state(key),
+        "set_state": lambda key: storage.set_state(key, OrderChatStates.waiting_message),
+        "update_data": lambda key: storage.update_data(key, {"order_id": "ORD-000001"}),
+    }
+    print(f"{name}: заполнение {keys} ключей за {fill:.2f} с")
+    for operation, call in operations.items():
+        samples = []
+        for key in targets:
+            op_started = time.perf_counter()
+            await call(key)
+            samples.append(time.perf_counter() - op_started)
+        print(f"  {operation:>11}: {_percentiles(samples)}")
+    await storage.close()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, default=100_000)
+    parser.add_argument("--ops", type=int, default=20_000)
+    args = parser.parse_args()
+
+    await _bench("MemoryStorage", MemoryStorage(), args.keys, args.ops)
+    await _bench("TTLMemoryStorage", TTLMemoryStorage(ttl=86400.0), args.keys, args.ops)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "fsm.sqlite3")
+        await _bench("SqliteStorage (WAL)", SqliteStorage(path=path, ttl=86400.0), args.keys, args.ops)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+"""
+Микробенчмарк декодирования ответов backend в модели.
+
+Сравнивает на реалистичном OrderDetails (по умолчанию 60 позиций):
+- старый путь: json.loads (как response.json()) + Model.model_validate(dict);
+- orjson.loads + model_validate (если установлен orjson);
+- новый путь: Model.model_validate_json(bytes) — разбор и валидация за один проход.
+
+Запуск: python scripts/bench_json_decode.py [--items 60] [--number 2000]
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from tg_bot.api_client.models import OrderDetails, OrderItem
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _payload(items: int) -> bytes:
+    order = OrderDetails(
+        orderId="ORD-2024-000123",
+        status="processing",
+        total="48250.00",
+        deliveryMethod="courier",
+        createdAt=datetime(2024, 11, 5, 14, 30, tzinfo=timezone.utc),
+        comment="Позвонить за час до доставки, домофон не работает",
+        items=[
+            OrderItem(
+                productId=f"prod-{index:05d}",
+                variantId=f"var-{index:05d}-100g",
+                quantity=1 + index % 4,
+                price=Decimal("790.00"),
+                total=Decimal("790.00") * (1 + index % 4),
+                productName=f"Да Хун Пао, урожай 2023 — партия {index}",
+                variantWeight="100 г",
+            )
+            for index in range(items)
+        ],
+    )
+    return order.model_dump_json().encode()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=60)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    raw = _payload(args.items)
+    print(f"OrderDetails: {args.items} позиций, {len(raw)} байт, {args.number} итераций")
+
+    variants = {
+        "json.loads + model_validate": lambda: OrderDetails.model_validate(json.loads(raw)),
+        "model_validate_json": lambda: OrderDetails.model_validate_json(raw),
+    }
+    if orjson is not None:
+        variants["orjson.loads + model_validate"] = lambda: OrderDetails.model_validate(orjson.loads(raw))
+
+    baseline = None
+    for name, func in variants.items():
+        best = min(timeit.repeat(func, number=args.number, repeat=5)) / args.number
+        baseline = baseline or best
+        print(f"{name:>32}: {best * 1e6:8.1f} мкс/ответ  (x{baseline / best:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Бенчмарк пропускной способности webhook-режима в зависимости от числа процессов.
+
+Фронт (ShardRouter) раздаёт апдейты воркер-процессам по chat_id через
+Unix-сокеты, как в режиме WEBHOOK_PROCESSES > 1. Хендлер каждого апдейта
+выполняет типичную CPU-работу бота: валидирует ответ backend
+(OrderDetails.model_validate_json) и рендерит карточку заказа. Запросы к
+Telegram не выполняются — измеряется только обработка.
+
+Для сравнения первой строкой идёт один процесс без IPC (локальная UpdateQueue).
+Прирост ограничен числом ядер машины.
+
+Запуск: python scripts/bench_sharding.py [--processes 1 2 4] [--updates 20000] [--chats 1000]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from aiogram import Bot, Router
+from aiogram.types import Message
+
+from tg_bot.api_client.models import OrderDetails, OrderItem
+from tg_bot.bot.scheduler import OrderedDispatcher
+from tg_bot.http_app.sharding import ShardRouter, serve_shard
+from tg_bot.http_app.update_queue import UpdateQueue
+from tg_bot.services.order_service import OrdersTextBuilder
+
+ORDER_PAYLOAD = OrderDetails(
+    orderId="ORD-2024-000123",
+    status="processing",
+    total="15800.00",
+    deliveryMethod="courier",
+    createdAt=datetime(2024, 11, 5, 14, 30, tzinfo=timezone.utc),
+    comment="Позвонить за час до доставки",
+    items=[
+        OrderItem(
+            productId=f"prod-{index:05d}",
+            variantId=f"var-{index:05d}-100g",
+            quantity=2,
+            price=Decimal("790.00"),
+            total=Decimal("1580.00"),
+            productName=f"Да Хун Пао, партия {index}",
+            variantWeight="100 г",
+        )
+        for index in range(20)
+    ],
+).model_dump_json().encode()
+
+
+def _update(update_id: int, chat_id: int) -> bytes:
+    return json.dumps(
+        {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": 1700000000,
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": chat_id, "is_bot": False, "first_name": "Покупатель"},
+                "text": "📦 Мои заказы",
+            },
+        }
+    ).encode()
+
+
+def _build_queue(counter) -> UpdateQueue:
+    bot = Bot("123456:bench")
+    builder = OrdersTextBuilder(webapp_url="https://example.com")
+    router = Router()
+
+    @router.message()
+    async def handler(message: Message) -> None:
+        builder.order_details(OrderDetails.model_validate_json(ORDER_PAYLOAD))
+        with counter.get_lock():
+            counter.value += 1
+
+    dispatcher = OrderedDispatcher()
+    dispatcher.include_router(router)
+    return UpdateQueue(dispatcher=dispatcher, bot=bot, maxsize=1000, workers=32)
+
+
+async def _serve_worker(socket_path: str, counter) -> None:
+    update_queue = _build_queue(counter)
+    await update_queue.start()
+    await serve_shard(socket_path, update_queue)
+    await asyncio.Event().wait()
+
+
+def _worker(socket_path: str, counter) -> None:
+    asyncio.run(_serve_worker(socket_path, counter))
+
+
+async def _feed(submit, updates: list[bytes], counter) -> float:
+    started = time.perf_counter()
+    for raw in updates:
+        # Как Telegram при 503: повторяем, пока апдейт не примут
+        while not submit(raw):
+            await asyncio.sleep(0.001)
+    while counter.value < len(updates):
+        await asyncio.sleep(0.001)
+    return time.perf_counter() - started
+
+
+async def _bench_local(updates: list[bytes]) -> float:
+    counter = multiprocessing.Value("q", 0)
+    update_queue = _build_queue(counter)
+    await update_queue.start()
+    elapsed = await _feed(update_queue.submit, updates, counter)
+    await update_queue.stop()
+    return elapsed
+
+
+async def _bench_sharded(processes: int, updates: list[bytes]) -> float:
+    context = multiprocessing.get_context("spawn")
+    counter = context.Value("q", 0)
+    with tempfile.TemporaryDirectory() as socket_dir:
+        socket_paths = [os.path.join(socket_dir, f"shard-{index}.sock") for index in range(processes)]
+        workers = [context.Process(target=_worker, args=(path, counter)) for path in socket_paths]
+        for process in workers:
+            process.start()
+        shard_router = ShardRouter(socket_paths=socket_paths)
+        await shard_router.start()
+        try:
+            return await _feed(shard_router.submit, updates, counter)
+        finally:
+            await shard_router.stop()
+            for process in workers:
+                process.terminate()
+                process.join()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--updates", type=int, default=20000)
+    parser.add_argument("--chats", type=int, default=1000)
+    args = parser.parse_args()
+    # Отклонения переполненной очереди ожидаемы: фидер повторяет апдейт
+    logging.basicConfig(level=logging.ERROR)
+
+    chats = [random.randrange(10**6, 10**10) for _ in range(args.chats)]
+    updates = [_update(update_id, random.choice(chats)) for update_id in range(args.updates)]
+    print(f"{args.updates} апдейтов, {args.chats} чатов, ядер: {os.cpu_count()}")
+
+    elapsed = await _bench_local(updates)
+    print(f"{'1 процесс без IPC':>22}: {args.updates / elapsed:8.0f} апдейтов/с")
+    for processes in args.processes:
+        elapsed = await _bench_sharded(processes, updates)
+        print(f"{f'{processes} воркер-процесс(ов)':>22}: {args.updates / elapsed:8.0f} апдейтов/с")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,232 @@
+"""
+Бенчмарк времени до первого ответа на /start (p50/p99).
+
+Backend (LeafFlow API) и Telegram заменены заглушками с искусственной
+задержкой на каждый запрос. Сравниваются два варианта хендлера:
+- «до»: фото профиля, регистрация, топик поддержки и список заказов
+  последовательно, затем приветствие;
+- «после»: текущий start_command — фото профиля ждём не дольше
+  PROFILE_PHOTO_TIMEOUT, приветствие сразу после регистрации, топик
+  поддержки создаётся в фоне (SideEffectQueue).
+
+Измеряется время от передачи апдейта диспетчеру до отправки первого
+сообщения — отдельно для новых и вернувшихся пользователей.
+
+Запуск: python scripts/bench_start_reply.py [--users 200] [--backend-latency 0.03] [--telegram-latency 0.05]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any
+
+import httpx
+from aiogram import Bot, Dispatcher, Router
+from aiogram.client.session.base import BaseSession
+from aiogram.filters import CommandStart
+from aiogram.methods import CreateForumTopic, GetUserProfilePhotos, SendMessage, TelegramMethod
+from aiogram.types import Chat, ForumTopic, Message, PhotoSize, Update, UserProfilePhotos
+
+from tg_bot.api_client.models import RegisterUserRequest
+from tg_bot.bot.app import create_bot_and_dispatcher
+from tg_bot.bot.middlewares.user_context import UserContextMiddleware
+from tg_bot.config import Settings
+
+BACKEND_URL = "http://backend.bench"
+
+
+class StubTelegramSession(BaseSession):
+    """Telegram с задержкой на каждый вызов; запоминает время первого сообщения в каждый чат."""
+
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+        self.first_reply: dict[int, float] = {}
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: int | None = None) -> Any:
+        await asyncio.sleep(self.latency)
+        if isinstance(method, SendMessage):
+            self.first_reply.setdefault(method.chat_id, time.perf_counter())
+            return Message(
+                message_id=1,
+                date=datetime.now(timezone.utc),
+                chat=Chat(id=method.chat_id, type="private"),
+                text=method.text,
+            )
+        if isinstance(method, GetUserProfilePhotos):
+            photo = PhotoSize(file_id="photo", file_unique_id="photo", width=640, height=640)
+            return UserProfilePhotos(total_count=1, photos=[[photo]])
+        if isinstance(method, CreateForumTopic):
+            return ForumTopic(message_thread_id=method.chat_id % 1000 + 2, name=method.name, icon_color=0)
+        return True
+
+    async def close(self) -> None:
+        pass
+
+    async def stream_content(self, *args: Any, **kwargs: Any):  # pragma: no cover - не используется
+        raise NotImplementedError
+
+
+def _stub_backend(latency: float) -> httpx.MockTransport:
+    registered: set[int] = set()
+
+    def profile(telegram_id: int) -> dict:
+        return {
+            "id": f"user-{telegram_id}",
+            "telegramId": telegram_id,
+            "firstName": "Анна",
+            "lastName": None,
+            "username": "anna",
+            "languageCode": "ru",
+            "photoUrl": None,
+        }
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        path = request.url.path
+        if match := re.fullmatch(r"/api/v1/internal/users/by-telegram/(\d+)", path):
+            telegram_id = int(match.group(1))
+            if telegram_id in registered:
+                return httpx.Response(200, json=profile(telegram_id))
+            return httpx.Response(404, json={"detail": "not found"})
+        if path == "/api/v1/internal/users/register":
+            telegram_id = json.loads(request.content)["telegramId"]
+            registered.add(telegram_id)
+            return httpx.Response(200, json=profile(telegram_id))
+        if path == "/api/v1/internal/orders":
+            return httpx.Response(200, json={"items": []})
+        if path.startswith("/api/v1/internal/support-topics/by-telegram/"):
+            return httpx.Response(404, json={"detail": "not found"})
+        if path == "/api/v1/internal/support-topics/ensure":
+            return httpx.Response(200, content=request.content)
+        return httpx.Response(404, json={"detail": "unknown endpoint"})
+
+    return httpx.MockTransport(handler)
+
+
+def _legacy_dispatcher(dispatcher: Dispatcher) -> Dispatcher:
+    """Диспетчер с исходным start_command: все вызовы последовательно до приветствия."""
+    router = Router()
+
+    @router.message(CommandStart())
+    async def start_command(message: Message, users_api, orders_api, user_service, support_topics_service, user_profile):
+        if not user_profile:
+            photo_url = None
+            photos = await message.bot.get_user_profile_photos(message.from_user.id, limit=1)
+            if photos.total_count > 0 and photos.photos:
+                photo_url = photos.photos[0][-1].file_id
+            user_profile = await users_api.register(
+                RegisterUserRequest(
+                    telegramId=message.from_user.id,
+                    firstName=message.from_user.first_name,
+                    photoUrl=photo_url,
+                )
+            )
+            await support_topics_service.get_or_create_thread(
+                user_telegram_id=message.from_user.id,
+                user_fullname=message.from_user.full_name,
+            )
+        orders = await orders_api.list_orders(user_profile.telegramId)
+        text, _ = user_service.greeting_with_orders(user_profile, len(orders.items) > 0)
+        await message.answer(text)
+        await message.answer("📱 <b>Открыть приложение</b>")
+
+    legacy = Dispatcher()
+    legacy.workflow_data.update(dispatcher.workflow_data)
+    legacy.message.middleware(UserContextMiddleware())
+    legacy.include_router(router)
+    return legacy
+
+
+def _update(update_id: int, user_id: int) -> Update:
+    return Update.model_validate(
+        {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": 1730000000,
+                "chat": {"id": user_id, "type": "private", "first_name": "Анна"},
+                "from": {"id": user_id, "is_bot": False, "first_name": "Анна", "language_code": "ru"},
+                "text": "/start",
+                "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+            },
+        }
+    )
+
+
+def _percentiles(samples: list[float]) -> str:
+    samples.sort()
+    p50 = samples[len(samples) // 2]
+    p99 = samples[int(len(samples) * 0.99)]
+    return f"p50 {p50 * 1e3:7.1f} мс  p99 {p99 * 1e3:7.1f} мс"
+
+
+async def _measure(bot: Bot, dispatcher: Dispatcher, user_ids: list[int]) -> list[float]:
+    session: StubTelegramSession = bot.session
+    samples = []
+    for update_id, user_id in enumerate(user_ids):
+        started = time.perf_counter()
+        result = await dispatcher.feed_update(bot, _update(update_id, user_id))
+        if isinstance(result, TelegramMethod):
+            await bot(result)
+        samples.append(session.first_reply.pop(user_id) - started)
+    return samples
+
+
+async def _bench(name: str, dispatcher: Dispatcher, bot: Bot, user_ids: list[int]) -> None:
+    await dispatcher["side_effects"].start()
+    new_users = await _measure(bot, dispatcher, user_ids)
+    # Фоновые действия новых пользователей должны завершиться до следующего прогона
+    await dispatcher["side_effects"].stop()
+    returning_users = await _measure(bot, dispatcher, user_ids)
+    print(name)
+    print(f"  {'новый пользователь':>22}: {_percentiles(new_users)}")
+    print(f"  {'вернувшийся':>22}: {_percentiles(returning_users)}")
+
+
+def _setup(args: argparse.Namespace) -> tuple[Bot, Dispatcher]:
+    settings = Settings(
+        _env_file=None,
+        telegram_bot_token="123456:bench",
+        admin_chat_id=-1001234567890,
+        api_base_url=BACKEND_URL,
+        internal_token="bench",
+        webapp_url="https://example.com",
+        webhook_secret="bench",
+        dedup_state_path=None,
+        media_state_path=None,
+        side_effects_journal_path=None,
+        # Кэш профилей отключён: каждый прогон видит backend как в первый раз
+        user_cache_ttl=0,
+    )
+    bot, dispatcher = create_bot_and_dispatcher(settings)
+    bot.session = StubTelegramSession(args.telegram_latency)
+    dispatcher["api_pool"].client = httpx.AsyncClient(
+        base_url=BACKEND_URL,
+        transport=_stub_backend(args.backend_latency),
+    )
+    return bot, dispatcher
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--backend-latency", type=float, default=0.03)
+    parser.add_argument("--telegram-latency", type=float, default=0.05)
+    args = parser.parse_args()
+    # Ответы 404 заглушки (новый пользователь, нет топика) ожидаемы
+    logging.disable(logging.ERROR)
+
+    print(f"{args.users} пользователей, задержка backend {args.backend_latency * 1e3:.0f} мс, "
+          f"Telegram {args.telegram_latency * 1e3:.0f} мс")
+    bot, dispatcher = _setup(args)
+    await _bench("до (последовательно)", _legacy_dispatcher(dispatcher), bot, list(range(10**6, 10**6 + args.users)))
+    await _bench("после (фоновые действия)", dispatcher, bot, list(range(2 * 10**6, 2 * 10**6 + args.users)))
+    await dispatcher["api_pool"].aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,159 @@
+"""
+Бенчмарк задержки подтверждения вебхука (p50/p99).
+
+Сравнивает два варианта эндпоинта на одном и том же апдейте:
+- «до»: await request.json() + Update.model_validate(...) в запросе, затем постановка в очередь;
+- «после»: текущий эндпоинт — только проверка секрета и постановка сырых байтов в очередь.
+
+Запросы подаются прямо в ASGI-приложение (без сети и HTTP-клиента), оба
+приложения с одинаковым набором middleware; воркеры очереди не запускаются,
+поэтому измеряется только серверный путь подтверждения.
+
+Запуск: python scripts/bench_webhook_ack.py [--requests 5000]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.middleware.cors import CORSMiddleware
+
+from tg_bot.config import Settings
+from tg_bot.http_app.app import create_app
+from tg_bot.http_app.update_queue import UpdateQueue
+
+SECRET = "bench-secret"
+
+
+def _update(update_id: int) -> bytes:
+    return json.dumps(
+        {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": 1730000000,
+                "chat": {"id": 100 + update_id % 50, "type": "private", "first_name": "Анна", "username": "anna"},
+                "from": {
+                    "id": 100 + update_id % 50,
+                    "is_bot": False,
+                    "first_name": "Анна",
+                    "last_name": "Петрова",
+                    "username": "anna",
+                    "language_code": "ru",
+                },
+                "text": "Здравствуйте! Подскажите, когда будет доставка заказа? " * 3,
+                "entities": [{"type": "bold", "offset": 0, "length": 12}],
+            },
+        }
+    ).encode()
+
+
+def _legacy_app(bot: Bot, dispatcher: Dispatcher, maxsize: int) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+    queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    # Как в исходном эндпоинте: bot и dispatcher через синхронные зависимости
+    def get_bot() -> Bot:
+        return bot
+
+    def get_dispatcher() -> Dispatcher:
+        return dispatcher
+
+    @app.post("/telegram/webhook")
+    async def handle(
+        request: Request,
+        bot: Bot = Depends(get_bot),
+        dispatcher: Dispatcher = Depends(get_dispatcher),
+    ) -> dict[str, str]:
+        if request.query_params.get("secret_token") != SECRET:
+            raise HTTPException(status_code=403, detail="invalid secret")
+        payload = await request.json()
+        update = Update.model_validate(payload)
+        queue.put_nowait(update)
+        return {"status": "accepted"}
+
+    return app
+
+
+async def _post(app: FastAPI, body: bytes) -> int:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "https",
+        "path": "/telegram/webhook",
+        "raw_path": b"/telegram/webhook",
+        "query_string": f"secret_token={SECRET}".encode(),
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("149.154.167.220", 443),
+        "server": ("bench", 443),
+    }
+    status = 0
+
+    async def receive() -> dict:
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message: dict) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def _measure(app: FastAPI, bodies: list[bytes]) -> list[float]:
+    latencies = []
+    for body in bodies[:200]:  # прогрев
+        await _post(app, body)
+    for body in bodies:
+        started = time.perf_counter()
+        status = await _post(app, body)
+        latencies.append(time.perf_counter() - started)
+        assert status == 200, status
+    return latencies
+
+
+def _report(name: str, latencies: list[float]) -> None:
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f"{name:>7}: p50={quantiles[49] * 1e6:7.1f} мкс  p99={quantiles[98] * 1e6:7.1f} мкс")
+
+
+async def main(requests: int) -> None:
+    bodies = [_update(index) for index in range(requests)]
+    bot = Bot(token="123456:bench")
+    dispatcher = Dispatcher()
+    dispatcher["update_deduplicator"] = None
+
+    legacy = _legacy_app(bot, dispatcher, maxsize=requests * 2)
+
+    settings = Settings(
+        telegram_bot_token="123456:bench",
+        admin_chat_id=-100,
+        api_base_url="http://backend",
+        internal_token="token",
+        webapp_url="http://webapp",
+        webhook_secret=SECRET,
+        webhook_queue_size=requests * 2,
+        _env_file=None,
+    )
+    current = create_app(settings=settings, bot=bot, dispatcher=dispatcher)
+    assert isinstance(current.state.update_queue, UpdateQueue)
+
+    print(f"{requests} запросов, размер апдейта {len(bodies[0])} байт")
+    _report("до", await _measure(legacy, bodies))
+    _report("после", await _measure(current, bodies))
+    await bot.session.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    asyncio.run(main(parser.parse_args().requests))
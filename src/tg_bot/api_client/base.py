@@ -1,12 +1,92 @@
+import asyncio
 import logging
-from typing import Any
+import re
+import time
+from functools import partial
+from typing import Any, AsyncIterator, Awaitable, Callable, TypeVar
 
 import httpx
+from pydantic import BaseModel
 
-from tg_bot.api_client.errors import ApiClientError
+from tg_bot.api_client.breaker import EndpointGuards
+from tg_bot.api_client.cache import MISSING, TTLCache
+from tg_bot.api_client.errors import ApiClientError, BackendUnavailableError
+from tg_bot.api_client.pool import ApiHttpPool
+from tg_bot.metrics import REGISTRY
+from tg_bot.singleflight import SingleFlight
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson необязателен (extra `speedups`)
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+M = TypeVar("M", bound=BaseModel)
+# Страница списка: поля items и nextCursor
+P = TypeVar("P", bound=BaseModel)
+
+BACKEND_REQUEST_DURATION = REGISTRY.histogram(
+    "backend_request_duration_seconds",
+    "Запросы к LeafFlow API (включая ожидание соединения в пуле)",
+    ["method", "endpoint", "status"],
+)
+
+BACKEND_COALESCED = REGISTRY.counter(
+    "backend_requests_coalesced_total",
+    "GET-запросы к LeafFlow API, присоединённые к такому же запросу в полёте",
+    ["endpoint"],
+)
+
+# Ключ GET-запроса: поколение записей, путь и параметры
+GetKey = tuple[int, str, tuple[tuple[str, str], ...]]
+
+# Сегмент пути с цифрами (id пользователя, номер заказа), кроме версии API (v1)
+_ID_SEGMENT = re.compile(r"/(?!v\d+(?:/|$))[^/]*\d[^/]*")
+
+
+def endpoint_label(path: str) -> str:
+    """Шаблон пути для метрик: `/api/v1/internal/users/by-telegram/{id}`."""
+    return _ID_SEGMENT.sub("/{id}", path)
+
+
+def has_more_pages(page: Any, page_size: int) -> bool:
+    """Есть ли страница после page: по nextCursor, без курсора — по полной странице."""
+    return page.nextCursor is not None or len(page.items) >= page_size
+
+
+async def iter_pages(
+    fetch: Callable[..., Awaitable[P]],
+    *,
+    page_size: int,
+    cursor: str | None = None,
+    offset: int = 0,
+) -> AsyncIterator[P]:
+    """
+    Страницы списка по порядку, начиная с cursor (или offset).
+
+    `fetch(cursor=..., offset=...)` загружает одну страницу. Следующая
+    страница запрашивается по nextCursor (иначе по offset) и загружается
+    в фоне, пока вызывающий обрабатывает текущую.
+    """
+    pending: asyncio.Future[P] | None = asyncio.ensure_future(fetch(cursor=cursor, offset=offset))
+    try:
+        while pending is not None:
+            page = await pending
+            pending = None
+            if not page.items:
+                return
+            offset += len(page.items)
+            if has_more_pages(page, page_size):
+                pending = asyncio.ensure_future(fetch(cursor=page.nextCursor, offset=offset))
+            yield page
+    finally:
+        if pending is not None:
+            if pending.done() and not pending.cancelled():
+                # Ошибка предзагрузки никому не нужна — не даём ей попасть в лог как необработанной
+                pending.exception()
+            pending.cancel()
+
 
 class BaseApiClient:
     # Таймауты для API запросов (в секундах)
@@ -17,69 +97,126 @@ class BaseApiClient:
         pool=5.0,       # Время ожидания в пуле соединений
     )
 
-    def __init__(self, *, base_url: str, token: str, timeout: httpx.Timeout | None = None):
+    def __init__(
+        self,
+        *,
+        base_url: str,
+        token: str,
+        timeout: httpx.Timeout | None = None,
+        pool: ApiHttpPool | None = None,
+        guards: EndpointGuards | None = None,
+        coalesce_gets: bool = True,
+        get_cache: TTLCache[GetKey, httpx.Response] | None = None,
+    ):
         self.base_url = base_url.rstrip("/")
         self.token = token
-        self._client = httpx.AsyncClient(
-            base_url=self.base_url,
-            timeout=timeout or self.DEFAULT_TIMEOUT,
-        )
+        # Общий пул передаётся снаружи и закрывается владельцем; без него клиент создаёт собственный
+        self._owns_pool = pool is None
+        self._pool = pool or ApiHttpPool(base_url=self.base_url, timeout=timeout or self.DEFAULT_TIMEOUT)
+        # Circuit breaker и bulkhead по эндпоинтам; общие для клиентов, как и пул
+        self._guards = guards or EndpointGuards()
+        # Одинаковые одновременные GET (путь и параметры) выполняются одним запросом
+        self._get_flight: SingleFlight[GetKey, httpx.Response] | None = SingleFlight() if coalesce_gets else None
+        # Микрокэш ответов GET на короткое время; None — без кэша
+        self._get_cache = get_cache
+        # Растёт после каждого изменяющего запроса: GET после него не получит ответ, полученный до него
+        self._write_generation = 0
 
-    async def _get(self, path: str, params: dict[str, Any] | None = None) -> httpx.Response:
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: dict[str, Any] | None = None,
+        json: dict[str, Any] | None = None,
+    ) -> httpx.Response:
         url = f"{self.base_url}{path}"
         headers = {"Authorization": f"Bearer {self.token}"}
-        logger.debug(f"GET запрос: {url}, params={params}")
+        logger.debug(f"{method} запрос: {url}, params={params}, json={json}")
+        content: bytes | None = None
+        if json is not None and orjson is not None:
+            content = orjson.dumps(json, default=str)
+            headers["Content-Type"] = "application/json"
+            json = None
+        endpoint = endpoint_label(path)
+        started = time.perf_counter()
+        status = "error"
         try:
-            response = await self._client.get(path, params=params, headers=headers)
-            logger.debug(f"Ответ GET {url}: status={response.status_code}")
-            if response.status_code >= 400:
-                logger.error(f"Ошибка GET {url}: status={response.status_code}, body={response.text[:200]}")
-                raise ApiClientError(response)
+            async with self._guards.get(f"{method} {endpoint}").slot():
+                async with self._pool.connection() as client:
+                    response = await client.request(
+                        method, path, params=params, json=json, content=content, headers=headers
+                    )
+                status = str(response.status_code)
+                logger.debug(f"Ответ {method} {url}: status={response.status_code}")
+                if response.status_code >= 400:
+                    logger.error(f"Ошибка {method} {url}: status={response.status_code}, body={response.text[:200]}")
+                    raise ApiClientError(response)
+            if method != "GET":
+                logger.debug(f"Успешный {method} {url}: body={response.text[:200]}")
             return response
+        except BackendUnavailableError as e:
+            # Запрос не отправлялся: не ждём таймаута недоступного или перегруженного эндпоинта
+            status = type(e).__name__
+            logger.warning(f"{method} {url} не выполнен: {e}")
+            raise
         except httpx.RequestError as e:
-            logger.error(f"Ошибка сети при GET {url}: {e}")
+            status = type(e).__name__
+            logger.error(f"Ошибка сети при {method} {url}: {e}")
             raise
         except Exception as e:
-            logger.error(f"Неожиданная ошибка при GET {url}: {e}")
+            logger.error(f"Неожиданная ошибка при {method} {url}: {e}")
             raise
+        finally:
+            if method != "GET":
+                self._write_generation += 1
+            BACKEND_REQUEST_DURATION.observe(
+                time.perf_counter() - started,
+                method=method,
+                endpoint=endpoint,
+                status=status,
+            )
+
+    async def _get(self, path: str, params: dict[str, Any] | None = None) -> httpx.Response:
+        if self._get_flight is None and self._get_cache is None:
+            return await self._request("GET", path, params=params)
+        key = (self._write_generation, path, tuple(sorted((name, str(value)) for name, value in (params or {}).items())))
+        if self._get_cache is not None:
+            cached = self._get_cache.get(key)
+            if cached is not MISSING:
+                return cached
+        fetch = partial(self._request, "GET", path, params=params)
+        if self._get_flight is None:
+            response = await fetch()
+        else:
+            if self._get_flight.inflight(key):
+                BACKEND_COALESCED.inc(endpoint=endpoint_label(path))
+            response = await self._get_flight.do(key, fetch)
+        if self._get_cache is not None:
+            self._get_cache.set(key, response)
+        return response
 
     async def _post(self, path: str, json: dict[str, Any] | None = None) -> httpx.Response:
-        url = f"{self.base_url}{path}"
-        headers = {"Authorization": f"Bearer {self.token}"}
-        logger.debug(f"POST запрос: {url}, json={json}")
-        try:
-            response = await self._client.post(path, json=json, headers=headers)
-            logger.debug(f"Ответ POST {url}: status={response.status_code}")
-            if response.status_code >= 400:
-                logger.error(f"Ошибка POST {url}: status={response.status_code}, body={response.text[:200]}")
-                raise ApiClientError(response)
-            logger.debug(f"Успешный POST {url}: body={response.text[:200]}")
-            return response
-        except httpx.RequestError as e:
-            logger.error(f"Ошибка сети при POST {url}: {e}")
-            raise
-        except Exception as e:
-            logger.error(f"Неожиданная ошибка при POST {url}: {e}")
-            raise
+        return await self._request("POST", path, json=json)
 
     async def _patch(self, path: str, json: dict[str, Any] | None = None) -> httpx.Response:
-        url = f"{self.base_url}{path}"
-        headers = {"Authorization": f"Bearer {self.token}"}
-        logger.debug(f"PATCH запрос: {url}, json={json}")
-        try:
-            response = await self._client.patch(path, json=json, headers=headers)
-            logger.debug(f"Ответ PATCH {url}: status={response.status_code}")
-            if response.status_code >= 400:
-                logger.error(f"Ошибка PATCH {url}: status={response.status_code}, body={response.text[:200]}")
-                raise ApiClientError(response)
-            logger.debug(f"Успешный PATCH {url}: body={response.text[:200]}")
-            return response
-        except httpx.RequestError as e:
-            logger.error(f"Ошибка сети при PATCH {url}: {e}")
-            raise
-        except Exception as e:
-            logger.error(f"Неожиданная ошибка при PATCH {url}: {e}")
-            raise
+        return await self._request("PATCH", path, json=json)
+
+    # Типизированные запросы: модель валидируется прямо из байтов ответа
+    # (model_validate_json), без промежуточного dict из response.json()
+
+    async def _get_model(self, path: str, model: type[M], params: dict[str, Any] | None = None) -> M:
+        response = await self._get(path, params=params)
+        return model.model_validate_json(response.content)
+
+    async def _post_model(self, path: str, model: type[M], json: dict[str, Any] | None = None) -> M:
+        response = await self._post(path, json=json)
+        return model.model_validate_json(response.content)
+
+    async def _patch_model(self, path: str, model: type[M], json: dict[str, Any] | None = None) -> M:
+        response = await self._patch(path, json=json)
+        return model.model_validate_json(response.content)
 
     async def close(self) -> None:
-        await self._client.aclose()
+        if self._owns_pool:
+            await self._pool.aclose()
@@ -0,0 +1,245 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import httpx
+
+from tg_bot.api_client.errors import ApiClientError, BulkheadFullError, CircuitOpenError
+from tg_bot.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_STATE = REGISTRY.gauge(
+    "backend_circuit_state",
+    "Состояние circuit breaker эндпоинта LeafFlow API: 0 — закрыт, 1 — пробные запросы, 2 — открыт",
+    ["endpoint"],
+)
+CIRCUIT_TRANSITIONS = REGISTRY.counter(
+    "backend_circuit_transitions_total",
+    "Переходы circuit breaker эндпоинтов LeafFlow API",
+    ["endpoint", "state"],
+)
+BACKEND_REJECTED = REGISTRY.counter(
+    "backend_requests_rejected_total",
+    "Запросы к LeafFlow API, отклонённые без отправки (circuit breaker открыт, bulkhead заполнен)",
+    ["endpoint", "reason"],
+)
+BULKHEAD_IN_USE = REGISTRY.gauge(
+    "backend_bulkhead_in_use",
+    "Одновременные запросы к эндпоинту LeafFlow API",
+    ["endpoint"],
+)
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def is_backend_failure(exc: BaseException) -> bool:
+    """Ошибки, говорящие о неисправности backend: сеть, таймауты и 5xx (но не 4xx и не очередь в нашем пуле)."""
+    if isinstance(exc, ApiClientError):
+        return exc.status_code >= 500
+    return isinstance(exc, httpx.RequestError) and not isinstance(exc, httpx.PoolTimeout)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker по доле ошибок за скользящее окно.
+
+    Если за последние `window` секунд было не меньше `min_requests`
+    запросов и доля ошибок достигла `failure_rate`, breaker открывается:
+    запросы сразу завершаются CircuitOpenError, не дожидаясь таймаутов.
+    Через `open_timeout` секунд пропускаются `half_open_probes` пробных
+    запросов: успех закрывает breaker, ошибка открывает снова.
+    """
+
+    def __init__(
+        self,
+        *,
+        name: str,
+        window: float = 30.0,
+        min_requests: int = 10,
+        failure_rate: float = 0.5,
+        open_timeout: float = 15.0,
+        half_open_probes: int = 1,
+    ):
+        self.name = name
+        self.window = window
+        self.min_requests = min_requests
+        self.failure_rate = failure_rate
+        self.open_timeout = open_timeout
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        # (время, ошибка ли) результатов за окно и число ошибок среди них
+        self._results: deque[tuple[float, bool]] = deque()
+        self._failures = 0
+        CIRCUIT_STATE.set(0, endpoint=name)
+
+    def acquire(self) -> bool:
+        """
+        Разрешить запрос или бросить CircuitOpenError.
+
+        Возвращает True для пробного запроса в полуоткрытом состоянии —
+        его результат решает, закрыть ли breaker.
+        """
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.open_timeout:
+                raise CircuitOpenError(f"circuit breaker for {self.name} is open")
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._probes >= self.half_open_probes:
+                raise CircuitOpenError(f"circuit breaker for {self.name} is half-open, probe in flight")
+            self._probes += 1
+            return True
+        return False
+
+    def record(self, failed: bool, probe: bool) -> None:
+        if probe:
+            self._probes -= 1
+            self._transition(OPEN if failed else CLOSED)
+            return
+        if self.state != CLOSED:
+            # Запрос начался до открытия breaker — его результат уже ничего не меняет
+            return
+        now = time.monotonic()
+        self._results.append((now, failed))
+        self._failures += failed
+        while self._results and self._results[0][0] < now - self.window:
+            self._failures -= self._results.popleft()[1]
+        total = len(self._results)
+        if total >= self.min_requests and self._failures >= self.failure_rate * total:
+            self._transition(OPEN)
+
+    def release(self, probe: bool) -> None:
+        """Запрос отменён, не дав результата."""
+        if probe:
+            self._probes -= 1
+
+    def _transition(self, state: str) -> None:
+        if state == self.state and state != OPEN:
+            return
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            if self.state == HALF_OPEN:
+                reason = "пробный запрос завершился ошибкой"
+            else:
+                reason = f"ошибок {self._failures} из {len(self._results)} за {self.window:.0f} с"
+            logger.warning(f"Circuit breaker {self.name} открыт на {self.open_timeout:.0f} с: {reason}")
+        elif state == CLOSED:
+            logger.info(f"Circuit breaker {self.name} закрыт")
+        self.state = state
+        self._results.clear()
+        self._failures = 0
+        CIRCUIT_STATE.set(_STATE_VALUES[state], endpoint=self.name)
+        CIRCUIT_TRANSITIONS.inc(endpoint=self.name, state=state)
+
+
+class EndpointGuard:
+    """Circuit breaker и bulkhead (лимит одновременных запросов) одного эндпоинта."""
+
+    def __init__(self, *, name: str, breaker: CircuitBreaker, max_concurrency: int, queue_timeout: float):
+        self.name = name
+        self.breaker = breaker
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._in_use = 0
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Выполнить запрос к эндпоинту с учётом breaker и лимита одновременных запросов."""
+        try:
+            probe = self.breaker.acquire()
+        except CircuitOpenError:
+            BACKEND_REJECTED.inc(endpoint=self.name, reason="circuit_open")
+            raise
+        try:
+            await self._acquire_slot()
+        except BaseException:
+            self.breaker.release(probe)
+            raise
+        try:
+            yield
+        except asyncio.CancelledError:
+            self.breaker.release(probe)
+            raise
+        except Exception as e:
+            self.breaker.record(is_backend_failure(e), probe)
+            raise
+        else:
+            self.breaker.record(False, probe)
+        finally:
+            self._in_use -= 1
+            BULKHEAD_IN_USE.set(self._in_use, endpoint=self.name)
+            self._slots.release()
+
+    async def _acquire_slot(self) -> None:
+        if self._slots.locked():
+            try:
+                async with asyncio.timeout(self.queue_timeout):
+                    await self._slots.acquire()
+            except asyncio.TimeoutError:
+                BACKEND_REJECTED.inc(endpoint=self.name, reason="bulkhead")
+                raise BulkheadFullError(f"too many concurrent requests to {self.name}") from None
+        else:
+            await self._slots.acquire()
+        self._in_use += 1
+        BULKHEAD_IN_USE.set(self._in_use, endpoint=self.name)
+
+
+class EndpointGuards:
+    """
+    Breaker и bulkhead для каждого эндпоинта LeafFlow API.
+
+    Общий для всех клиентов, как и пул соединений: медленный эндпоинт
+    занимает не больше `max_concurrency` соединений пула, а после серии
+    ошибок запросы к нему завершаются сразу, не дожидаясь таймаута, —
+    остальные эндпоинты продолжают работать.
+    """
+
+    def __init__(
+        self,
+        *,
+        window: float = 30.0,
+        min_requests: int = 10,
+        failure_rate: float = 0.5,
+        open_timeout: float = 15.0,
+        max_concurrency: int = 20,
+        queue_timeout: float = 1.0,
+    ):
+        self.window = window
+        self.min_requests = min_requests
+        self.failure_rate = failure_rate
+        self.open_timeout = open_timeout
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self._guards: dict[str, EndpointGuard] = {}
+
+    def get(self, endpoint: str) -> EndpointGuard:
+        guard = self._guards.get(endpoint)
+        if guard is None:
+            breaker = CircuitBreaker(
+                name=endpoint,
+                window=self.window,
+                min_requests=self.min_requests,
+                failure_rate=self.failure_rate,
+                open_timeout=self.open_timeout,
+            )
+            guard = EndpointGuard(
+                name=endpoint,
+                breaker=breaker,
+                max_concurrency=self.max_concurrency,
+                queue_timeout=self.queue_timeout,
+            )
+            self._guards[endpoint] = guard
+        return guard
+
+    def states(self) -> dict[str, str]:
+        """Состояние breaker каждого эндпоинта, к которому уже были запросы."""
+        return {endpoint: guard.breaker.state for endpoint, guard in self._guards.items()}
@@ -0,0 +1,121 @@
+import enum
+import time
+from collections import OrderedDict
+from typing import Callable, Final, Generic, Hashable, Literal, TypeVar
+
+from tg_bot.metrics import REGISTRY
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class _Missing(enum.Enum):
+    # Enum из одного значения: проверка `is MISSING` сужает тип для mypy
+    MISSING = enum.auto()
+
+
+# Маркер отсутствия значения в кэше (None — валидное «отрицательное» значение)
+MISSING: Final = _Missing.MISSING
+
+CACHE_HITS = REGISTRY.counter("cache_hits_total", "Попадания в кэш", ["cache"])
+CACHE_MISSES = REGISTRY.counter("cache_misses_total", "Промахи кэша", ["cache"])
+
+
+class TTLCache(Generic[K, V]):
+    """
+    LRU-кэш с ограничением по времени жизни записей.
+
+    Поддерживает отрицательное кэширование: `set_negative` сохраняет None
+    с отдельным (обычно более коротким) TTL, чтобы не спрашивать backend
+    о заведомо отсутствующих объектах на каждый апдейт.
+
+    `on_evict` вызывается для значения, которое покинуло кэш не через `pop`:
+    вытеснено, устарело, заменено, удалено `invalidate`/`clear` или не было
+    сохранено (TTL 0) — например, чтобы отменить связанную фоновую задачу.
+    """
+
+    def __init__(
+        self,
+        *,
+        name: str,
+        maxsize: int,
+        ttl: float,
+        negative_ttl: float | None = None,
+        on_evict: Callable[[V], None] | None = None,
+    ):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.on_evict = on_evict
+        self._data: OrderedDict[K, tuple[float, V | None]] = OrderedDict()
+
+    def get(self, key: K) -> V | None | Literal[_Missing.MISSING]:
+        """Вернуть значение или MISSING, если записи нет или она устарела."""
+        entry = self._data.get(key)
+        if entry is None:
+            CACHE_MISSES.inc(cache=self.name)
+            return MISSING
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self._evicted(value)
+            CACHE_MISSES.inc(cache=self.name)
+            return MISSING
+        self._data.move_to_end(key)
+        CACHE_HITS.inc(cache=self.name)
+        return value
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        self._store(key, value, self.ttl if ttl is None else ttl)
+
+    def set_negative(self, key: K) -> None:
+        self._store(key, None, self.negative_ttl)
+
+    def invalidate(self, key: K) -> None:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._evicted(entry[1])
+
+    def pop(self, key: K) -> V | None | Literal[_Missing.MISSING]:
+        """Удалить запись и вернуть её значение (MISSING, если записи нет или она устарела); без учёта в метриках."""
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return MISSING
+        if entry[0] <= time.monotonic():
+            self._evicted(entry[1])
+            return MISSING
+        return entry[1]
+
+    def clear(self) -> None:
+        entries = list(self._data.values())
+        self._data.clear()
+        for _, value in entries:
+            self._evicted(value)
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "size": len(self._data),
+            "hits": CACHE_HITS.value(cache=self.name),
+            "misses": CACHE_MISSES.value(cache=self.name),
+        }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _store(self, key: K, value: V | None, ttl: float) -> None:
+        if ttl <= 0 or self.maxsize <= 0:
+            self._evicted(value)
+            return
+        previous = self._data.get(key)
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        if previous is not None and previous[1] is not value:
+            self._evicted(previous[1])
+        while len(self._data) > self.maxsize:
+            _, (_, evicted) = self._data.popitem(last=False)
+            self._evicted(evicted)
+
+    def _evicted(self, value: V | None) -> None:
+        if self.on_evict is not None and value is not None:
+            self.on_evict(value)
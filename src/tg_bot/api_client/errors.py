@@ -9,3 +9,15 @@ class ApiClientError(Exception):
     @property
     def status_code(self) -> int:
         return self.response.status_code
+
+
+class BackendUnavailableError(httpx.TransportError):
+    """Запрос к LeafFlow API не отправлен: эндпоинт отключён circuit breaker или перегружен (bulkhead)."""
+
+
+class CircuitOpenError(BackendUnavailableError):
+    pass
+
+
+class BulkheadFullError(BackendUnavailableError):
+    pass
@@ -1,6 +1,6 @@
 from datetime import datetime
 from decimal import Decimal
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -29,6 +29,12 @@ class UserProfile(BaseModel):
         return " ".join(names) if names else "Гость"
 
 
+class RecipientListResponse(BaseModel):
+    """Страница telegram_id покупателей для рассылки"""
+    items: list[int] = Field(default_factory=list)
+    nextCursor: Optional[str] = None
+
+
 class OrderSummary(BaseModel):
     orderId: str
     customerName: Optional[str]
@@ -59,6 +65,8 @@ class OrderSummary(BaseModel):
 
 class OrderListResponse(BaseModel):
     items: list[OrderSummary] = Field(default_factory=list)
+    # Курсор следующей страницы (keyset), если backend его поддерживает
+    nextCursor: Optional[str] = None
 
 
 class OrderItem(BaseModel):
@@ -79,3 +87,14 @@ class OrderDetails(BaseModel):
     createdAt: datetime
     comment: Optional[str] = None
     items: list[OrderItem]
+
+
+class OrderEvent(BaseModel):
+    """Событие заказа, которое backend присылает во внутренний API бота"""
+    type: Literal["created", "status_changed"]
+    orderId: str
+    userTelegramId: int
+    userFullname: Optional[str] = None
+    # Новый статус и комментарий администратора для status_changed
+    status: Optional[str] = None
+    comment: Optional[str] = None
@@ -1,23 +1,160 @@
-from typing import Optional
+import asyncio
+from functools import partial
+from typing import Awaitable, Callable, Optional
 
-from tg_bot.api_client.base import BaseApiClient
-from tg_bot.api_client.models import OrderDetails, OrderListResponse
+import httpx
+
+from tg_bot.api_client.base import BaseApiClient, GetKey, has_more_pages
+from tg_bot.api_client.breaker import EndpointGuards
+from tg_bot.api_client.cache import MISSING, TTLCache
+from tg_bot.api_client.models import OrderDetails, OrderListResponse, OrderSummary
+from tg_bot.api_client.pool import ApiHttpPool
+
+
+class OrderPages:
+    """
+    Уже загруженные страницы заказов пользователя и позиция следующей.
+
+    Хранится в кэше страниц между нажатиями кнопок: запрошенная страница
+    берётся из памяти, следующая загружается по сохранённому курсору
+    (или offset). После выдачи страницы следующая загружается в фоне, пока
+    пользователь смотрит текущую; `close` отменяет эту загрузку — её
+    вызывает кэш при вытеснении записи и `orders_page` при обновлении списка.
+    """
+
+    def __init__(self, page_size: int):
+        self.page_size = page_size
+        self.pages: list[OrderListResponse] = []
+        # Позиция следующей страницы: nextCursor последней страницы, иначе offset
+        self.cursor: str | None = None
+        self.offset = 0
+        self.exhausted = False
+        self._lock = asyncio.Lock()
+        # Фоновая загрузка страницы на позиции cursor/offset
+        self._prefetch: asyncio.Task[OrderListResponse] | None = None
+
+    async def page(
+        self,
+        index: int,
+        fetch: Callable[..., Awaitable[OrderListResponse]],
+    ) -> tuple[list[OrderSummary], bool]:
+        """
+        Заказы страницы index (с нуля) и признак того, что есть следующая страница.
+
+        `fetch(cursor=..., offset=...)` загружает одну страницу. При ошибке
+        загруженные страницы и позиция сохраняются: повтор продолжит с того же места.
+        """
+        async with self._lock:
+            while len(self.pages) <= index and not self.exhausted:
+                page = await self._take_prefetch()
+                if page is None:
+                    page = await fetch(cursor=self.cursor, offset=self.offset)
+                self._append(page)
+            if len(self.pages) == index + 1 and not self.exhausted and self._prefetch is None:
+                self._prefetch = asyncio.create_task(fetch(cursor=self.cursor, offset=self.offset))
+        if index >= len(self.pages):
+            return [], False
+        has_next = index + 1 < len(self.pages) or not self.exhausted
+        return self.pages[index].items, has_next
+
+    def close(self) -> None:
+        """Отменить фоновую загрузку следующей страницы."""
+        prefetch, self._prefetch = self._prefetch, None
+        if prefetch is None:
+            return
+        if prefetch.done() and not prefetch.cancelled():
+            # Ошибка предзагрузки никому не нужна — не даём ей попасть в лог как необработанной
+            prefetch.exception()
+        prefetch.cancel()
+
+    async def _take_prefetch(self) -> OrderListResponse | None:
+        """Результат фоновой загрузки; None — её не было или она не удалась (страница загружается заново)."""
+        prefetch, self._prefetch = self._prefetch, None
+        if prefetch is None:
+            return None
+        try:
+            return await prefetch
+        except Exception:  # noqa: BLE001
+            return None
+
+    def _append(self, page: OrderListResponse) -> None:
+        if not page.items:
+            self.exhausted = True
+            return
+        self.pages.append(page)
+        self.offset += len(page.items)
+        self.cursor = page.nextCursor
+        if not has_more_pages(page, self.page_size):
+            self.exhausted = True
 
 
 class OrdersApi(BaseApiClient):
-    async def list_orders(self, telegram_id: int, limit: int = 5, offset: int = 0) -> OrderListResponse:
-        response = await self._get(
-            "/api/v1/internal/orders",
-            params={"telegram_id": telegram_id, "limit": limit, "offset": offset},
+    def __init__(
+        self,
+        *,
+        base_url: str,
+        token: str,
+        timeout: httpx.Timeout | None = None,
+        pool: ApiHttpPool | None = None,
+        guards: EndpointGuards | None = None,
+        coalesce_gets: bool = True,
+        get_cache: TTLCache[GetKey, httpx.Response] | None = None,
+        page_cache: TTLCache[tuple[int, int], OrderPages] | None = None,
+    ):
+        super().__init__(
+            base_url=base_url,
+            token=token,
+            timeout=timeout,
+            pool=pool,
+            guards=guards,
+            coalesce_gets=coalesce_gets,
+            get_cache=get_cache,
         )
-        return OrderListResponse.model_validate(response.json())
+        # Страницы списка заказов по (telegram_id, размер страницы); без кэша каждая страница листается с начала
+        self.page_cache = page_cache or TTLCache(name="order_pages", maxsize=1000, ttl=60.0, on_evict=OrderPages.close)
+
+    async def list_orders(
+        self,
+        telegram_id: int,
+        limit: int = 5,
+        offset: int = 0,
+        cursor: str | None = None,
+    ) -> OrderListResponse:
+        params: dict[str, int | str] = {"telegram_id": telegram_id, "limit": limit}
+        # Курсор (keyset) из nextCursor предыдущей страницы заменяет offset
+        if cursor is not None:
+            params["cursor"] = cursor
+        else:
+            params["offset"] = offset
+        return await self._get_model("/api/v1/internal/orders", OrderListResponse, params=params)
+
+    async def orders_page(
+        self,
+        telegram_id: int,
+        index: int,
+        *,
+        page_size: int = 5,
+        refresh: bool = False,
+    ) -> tuple[list[OrderSummary], bool]:
+        """
+        Страница index списка заказов и признак наличия следующей.
+
+        Страницы кэшируются на пользователя на короткий TTL; `refresh`
+        начинает список заново (например, при новом открытии «Мои заказы»).
+        """
+        key = (telegram_id, page_size)
+        pages = MISSING if refresh else self.page_cache.get(key)
+        if pages is MISSING:
+            # Прежняя запись (при refresh) заменяется, и кэш закрывает её фоновую загрузку
+            pages = OrderPages(page_size)
+            self.page_cache.set(key, pages)
+        return await pages.page(index, partial(self.list_orders, telegram_id, page_size))
 
     async def get_order(self, order_id: str) -> Optional[OrderDetails]:
         try:
-            response = await self._get(f"/api/v1/internal/orders/{order_id}")
+            return await self._get_model(f"/api/v1/internal/orders/{order_id}", OrderDetails)
         except Exception:  # noqa: BLE001
             return None
-        return OrderDetails.model_validate(response.json())
 
     async def update_order_status(
         self, 
@@ -41,10 +178,10 @@ class OrdersApi(BaseApiClient):
             if comment:
                 payload["comment"] = comment
             
-            response = await self._patch(
+            return await self._patch_model(
                 f"/api/v1/internal/orders/{order_id}/status",
+                OrderDetails,
                 json=payload,
             )
-            return OrderDetails.model_validate(response.json())
         except Exception:  # noqa: BLE001
             return None
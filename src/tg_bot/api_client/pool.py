@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import httpx
+
+from tg_bot.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+POOL_WAIT = REGISTRY.histogram(
+    "backend_pool_wait_seconds",
+    "Ожидание свободного соединения к LeafFlow API",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+)
+POOL_SATURATED = REGISTRY.counter(
+    "backend_pool_saturated_total",
+    "Запросы, которым пришлось ждать соединение (пул исчерпан)",
+)
+POOL_TIMEOUTS = REGISTRY.counter("backend_pool_timeouts_total", "Запросы, не дождавшиеся соединения")
+POOL_IN_USE = REGISTRY.gauge("backend_pool_in_use", "Занятые соединения к LeafFlow API")
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class ApiHttpPool:
+    """
+    Общий пул HTTP-соединений к LeafFlow API для всех клиентов.
+
+    Число одновременных запросов ограничено `max_connections` — тем же
+    лимитом, что и пул httpx, — поэтому ожидание соединения видно в
+    метриках, а не скрыто внутри httpx.
+    """
+
+    def __init__(
+        self,
+        *,
+        base_url: str,
+        timeout: httpx.Timeout,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False,
+    ):
+        if http2 and not _http2_available():
+            logger.warning("HTTP/2 к backend недоступен: установите пакет `h2` (pip install 'httpx[http2]')")
+            http2 = False
+        self.max_connections = max_connections
+        self.pool_timeout = timeout.pool
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+        )
+        self._slots = asyncio.Semaphore(max_connections)
+        self._in_use = 0
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[httpx.AsyncClient]:
+        """Занять слот соединения на время запроса."""
+        if self._slots.locked():
+            POOL_SATURATED.inc()
+        started = time.monotonic()
+        try:
+            async with asyncio.timeout(self.pool_timeout):
+                await self._slots.acquire()
+        except asyncio.TimeoutError:
+            POOL_TIMEOUTS.inc()
+            raise httpx.PoolTimeout("Timed out waiting for a free backend connection") from None
+        POOL_WAIT.observe(time.monotonic() - started)
+        self._in_use += 1
+        POOL_IN_USE.set(self._in_use)
+        try:
+            yield self.client
+        finally:
+            self._in_use -= 1
+            POOL_IN_USE.set(self._in_use)
+            self._slots.release()
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
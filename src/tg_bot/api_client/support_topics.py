@@ -1,9 +1,13 @@
 import logging
 from typing import Optional
 
+import httpx
 from pydantic import BaseModel
 
-from tg_bot.api_client.base import BaseApiClient
+from tg_bot.api_client.base import BaseApiClient, GetKey
+from tg_bot.api_client.breaker import EndpointGuards
+from tg_bot.api_client.pool import ApiHttpPool
+from tg_bot.api_client.cache import MISSING, TTLCache
 from tg_bot.api_client.errors import ApiClientError
 
 logger = logging.getLogger(__name__)
@@ -15,18 +19,97 @@ class SupportTopicMapping(BaseModel):
     thread_id: int
 
 
+class SupportTopicMappingCache:
+    """
+    Двунаправленный кэш связей user_telegram_id <-> (admin_chat_id, thread_id).
+
+    Два TTLCache (по пользователю и по топику) с общими TTL и размером:
+    вытеснение, устаревание и метрики — как у остальных кэшей. Запись и
+    инвалидация обновляют оба индекса; смена топика пользователя удаляет
+    старый обратный ключ.
+    """
+
+    def __init__(self, *, maxsize: int, ttl: float, name: str = "support_topics"):
+        self.name = name
+        self._by_user: TTLCache[int, SupportTopicMapping] = TTLCache(name=name, maxsize=maxsize, ttl=ttl)
+        self._by_thread: TTLCache[tuple[int, int], SupportTopicMapping] = TTLCache(
+            name=f"{name}_by_thread", maxsize=maxsize, ttl=ttl
+        )
+
+    def get_by_user(self, user_telegram_id: int) -> SupportTopicMapping | None:
+        mapping = self._by_user.get(user_telegram_id)
+        return None if mapping is MISSING else mapping
+
+    def get_by_thread(self, admin_chat_id: int, thread_id: int) -> SupportTopicMapping | None:
+        mapping = self._by_thread.get((admin_chat_id, thread_id))
+        return None if mapping is MISSING else mapping
+
+    def put(self, mapping: SupportTopicMapping) -> None:
+        # Топик пользователя мог смениться — убираем старый обратный ключ
+        self.invalidate_user(mapping.user_telegram_id)
+        self._by_user.set(mapping.user_telegram_id, mapping)
+        self._by_thread.set((mapping.admin_chat_id, mapping.thread_id), mapping)
+
+    def invalidate_user(self, user_telegram_id: int) -> None:
+        mapping = self._by_user.pop(user_telegram_id)
+        if mapping is not MISSING:
+            self._by_thread.invalidate((mapping.admin_chat_id, mapping.thread_id))
+
+    def invalidate_thread(self, admin_chat_id: int, thread_id: int) -> None:
+        mapping = self._by_thread.pop((admin_chat_id, thread_id))
+        if mapping is not MISSING:
+            self._by_user.invalidate(mapping.user_telegram_id)
+
+    def __len__(self) -> int:
+        return len(self._by_user)
+
+
 class SupportTopicsApi(BaseApiClient):
+    def __init__(
+        self,
+        *,
+        base_url: str,
+        token: str,
+        timeout: httpx.Timeout | None = None,
+        pool: ApiHttpPool | None = None,
+        guards: EndpointGuards | None = None,
+        coalesce_gets: bool = True,
+        get_cache: TTLCache[GetKey, httpx.Response] | None = None,
+        mapping_cache: SupportTopicMappingCache | None = None,
+    ):
+        super().__init__(
+            base_url=base_url,
+            token=token,
+            timeout=timeout,
+            pool=pool,
+            guards=guards,
+            coalesce_gets=coalesce_gets,
+            get_cache=get_cache,
+        )
+        # Кэш связей; None — каждый запрос идёт в backend
+        self.mapping_cache = mapping_cache
+
     async def get_by_telegram(self, user_telegram_id: int) -> Optional[SupportTopicMapping]:
         """Получить связь по user_telegram_id"""
+        if self.mapping_cache is not None:
+            cached = self.mapping_cache.get_by_user(user_telegram_id)
+            if cached is not None:
+                return cached
         try:
             logger.debug(f"Запрос связи для user_telegram_id={user_telegram_id}")
-            response = await self._get(f"/api/v1/internal/support-topics/by-telegram/{user_telegram_id}")
-            mapping = SupportTopicMapping.model_validate(response.json())
+            mapping = await self._get_model(
+                f"/api/v1/internal/support-topics/by-telegram/{user_telegram_id}",
+                SupportTopicMapping,
+            )
             logger.info(f"Найдена связь для user_telegram_id={user_telegram_id}, thread_id={mapping.thread_id}")
+            if self.mapping_cache is not None:
+                self.mapping_cache.put(mapping)
             return mapping
         except ApiClientError as e:
             if e.status_code == 404:
                 logger.debug(f"Связь для user_telegram_id={user_telegram_id} не найдена (404)")
+                if self.mapping_cache is not None:
+                    self.mapping_cache.invalidate_user(user_telegram_id)
                 return None
             logger.error(f"Ошибка API при получении связи для user_telegram_id={user_telegram_id}: {e.status_code} {e}")
             raise
@@ -36,18 +119,26 @@ class SupportTopicsApi(BaseApiClient):
 
     async def get_by_thread(self, admin_chat_id: int, thread_id: int) -> Optional[SupportTopicMapping]:
         """Получить связь по thread_id"""
+        if self.mapping_cache is not None:
+            cached = self.mapping_cache.get_by_thread(admin_chat_id, thread_id)
+            if cached is not None:
+                return cached
         try:
             logger.debug(f"Запрос связи для thread_id={thread_id}, admin_chat_id={admin_chat_id}")
-            response = await self._get(
+            mapping = await self._get_model(
                 "/api/v1/internal/support-topics/by-thread",
-                params={"admin_chat_id": admin_chat_id, "thread_id": thread_id}
+                SupportTopicMapping,
+                params={"admin_chat_id": admin_chat_id, "thread_id": thread_id},
             )
-            mapping = SupportTopicMapping.model_validate(response.json())
             logger.info(f"Найдена связь для thread_id={thread_id}, user_telegram_id={mapping.user_telegram_id}")
+            if self.mapping_cache is not None:
+                self.mapping_cache.put(mapping)
             return mapping
         except ApiClientError as e:
             if e.status_code == 404:
                 logger.debug(f"Связь для thread_id={thread_id} не найдена (404)")
+                if self.mapping_cache is not None:
+                    self.mapping_cache.invalidate_thread(admin_chat_id, thread_id)
                 return None
             logger.error(f"Ошибка API при получении связи для thread_id={thread_id}: {e.status_code} {e}")
             raise
@@ -67,15 +158,17 @@ class SupportTopicsApi(BaseApiClient):
                 f"Создание/обеспечение связи: user_telegram_id={user_telegram_id}, "
                 f"admin_chat_id={admin_chat_id}, thread_id={thread_id}"
             )
-            response = await self._post(
+            mapping = await self._post_model(
                 "/api/v1/internal/support-topics/ensure",
+                SupportTopicMapping,
                 json={
                     "user_telegram_id": user_telegram_id,
                     "admin_chat_id": admin_chat_id,
                     "thread_id": thread_id,
                 },
             )
-            mapping = SupportTopicMapping.model_validate(response.json())
+            if self.mapping_cache is not None:
+                self.mapping_cache.put(mapping)
             logger.info(
                 f"Связь успешно создана/получена: user_telegram_id={mapping.user_telegram_id}, "
                 f"thread_id={mapping.thread_id}"
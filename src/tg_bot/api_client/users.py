@@ -1,20 +1,64 @@
 import logging
-from typing import Optional
+from functools import partial
+from typing import AsyncIterator, Optional
 
-from tg_bot.api_client.base import BaseApiClient
-from tg_bot.api_client.models import UserProfile, RegisterUserRequest
+import httpx
+
+from tg_bot.api_client.base import BaseApiClient, GetKey, iter_pages
+from tg_bot.api_client.breaker import EndpointGuards
+from tg_bot.api_client.pool import ApiHttpPool
+from tg_bot.api_client.cache import MISSING, TTLCache
+from tg_bot.api_client.models import RecipientListResponse, UserProfile, RegisterUserRequest
 from tg_bot.api_client.errors import ApiClientError
 
 logger = logging.getLogger(__name__)
 
 
 class UsersApi(BaseApiClient):
+    def __init__(
+        self,
+        *,
+        base_url: str,
+        token: str,
+        timeout: httpx.Timeout | None = None,
+        pool: ApiHttpPool | None = None,
+        guards: EndpointGuards | None = None,
+        coalesce_gets: bool = True,
+        get_cache: TTLCache[GetKey, httpx.Response] | None = None,
+        profile_cache: TTLCache[int, UserProfile] | None = None,
+    ):
+        super().__init__(
+            base_url=base_url,
+            token=token,
+            timeout=timeout,
+            pool=pool,
+            guards=guards,
+            coalesce_gets=coalesce_gets,
+            get_cache=get_cache,
+        )
+        # Кэш профилей по telegram_id; None — кэширование отключено
+        self.profile_cache = profile_cache
+
     async def get_by_telegram(self, telegram_id: int) -> Optional[UserProfile]:
+        if self.profile_cache is not None:
+            cached = self.profile_cache.get(telegram_id)
+            if cached is not MISSING:
+                return cached
+
         try:
-            response = await self._get(f"/api/v1/internal/users/by-telegram/{telegram_id}")
-        except Exception as exc:  # noqa: BLE001
+            user_profile = await self._get_model(f"/api/v1/internal/users/by-telegram/{telegram_id}", UserProfile)
+        except ApiClientError as exc:
+            # Кэшируем только достоверное «не зарегистрирован», а не сетевые сбои
+            if exc.status_code == 404 and self.profile_cache is not None:
+                self.profile_cache.set_negative(telegram_id)
             return None
-        return UserProfile.model_validate(response.json())
+        except Exception as exc:
+            # Backend недоступен: профиль неизвестен, но в кэш это не попадает
+            logger.warning(f"Не удалось получить профиль telegram_id={telegram_id}: {exc}")
+            return None
+        if self.profile_cache is not None:
+            self.profile_cache.set(telegram_id, user_profile)
+        return user_profile
 
     async def register(self, request: RegisterUserRequest) -> UserProfile:
         """
@@ -29,13 +73,18 @@ class UsersApi(BaseApiClient):
         Raises:
             ApiClientError: При ошибке API
         """
+        if self.profile_cache is not None:
+            # Сбрасываем отрицательную запись, даже если регистрация не удастся
+            self.profile_cache.invalidate(request.telegramId)
         try:
             logger.info(f"Регистрация пользователя с telegramId={request.telegramId}")
-            response = await self._post(
+            user_profile = await self._post_model(
                 "/api/v1/internal/users/register",
+                UserProfile,
                 json=request.model_dump(exclude_none=True),
             )
-            user_profile = UserProfile.model_validate(response.json())
+            if self.profile_cache is not None:
+                self.profile_cache.set(user_profile.telegramId, user_profile)
             logger.info(f"Пользователь успешно зарегистрирован: id={user_profile.id}, telegramId={user_profile.telegramId}")
             return user_profile
         except ApiClientError as e:
@@ -44,3 +93,27 @@ class UsersApi(BaseApiClient):
         except Exception as e:
             logger.error(f"Неожиданная ошибка при регистрации пользователя telegramId={request.telegramId}: {e}")
             raise
+
+    async def list_recipients(
+        self,
+        limit: int = 500,
+        offset: int = 0,
+        cursor: str | None = None,
+    ) -> RecipientListResponse:
+        """Страница telegram_id покупателей для рассылки."""
+        params: dict[str, int | str] = {"limit": limit}
+        if cursor is not None:
+            params["cursor"] = cursor
+        else:
+            params["offset"] = offset
+        return await self._get_model("/api/v1/internal/users/telegram-ids", RecipientListResponse, params=params)
+
+    def iter_recipients(
+        self,
+        *,
+        page_size: int = 500,
+        cursor: str | None = None,
+        offset: int = 0,
+    ) -> AsyncIterator[RecipientListResponse]:
+        """Страницы получателей рассылки, начиная с cursor (или offset); следующая загружается в фоне."""
+        return iter_pages(partial(self.list_recipients, page_size), page_size=page_size, cursor=cursor, offset=offset)
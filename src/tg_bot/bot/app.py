@@ -1,42 +1,142 @@
+
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 
 from tg_bot.bot.routers import start, orders, support, chat, support_topics, admin
 from tg_bot.bot.middlewares.logging import LoggingMiddleware
+from tg_bot.bot.middlewares.metrics import HandlerMetricsMiddleware, UpdateMetricsMiddleware
 from tg_bot.bot.middlewares.user_context import UserContextMiddleware
 from tg_bot.bot.middlewares.retry_session import RetryAiohttpSession
+from tg_bot.bot.middlewares.rate_limiter import TelegramRateLimiter
+from tg_bot.bot.scheduler import OrderedDispatcher
+from tg_bot.bot.dedup import UpdateDeduplicator
+from tg_bot.bot.fsm_storage import create_fsm_storage
+from tg_bot.bot.media import MediaRegistry
+from tg_bot.bot.side_effects import SideEffectQueue
 from tg_bot.config import Settings
+from tg_bot.api_client.base import BaseApiClient
+from tg_bot.api_client.breaker import EndpointGuards
+from tg_bot.api_client.cache import TTLCache
+from tg_bot.api_client.pool import ApiHttpPool
 from tg_bot.api_client.users import UsersApi
-from tg_bot.api_client.orders import OrdersApi
-from tg_bot.api_client.support_topics import SupportTopicsApi
+from tg_bot.api_client.orders import OrderPages, OrdersApi
+from tg_bot.api_client.support_topics import SupportTopicMappingCache, SupportTopicsApi
+from tg_bot.services.broadcast_service import BroadcastService
+from tg_bot.services.order_events import OrderEventsService
 from tg_bot.services.order_service import OrdersTextBuilder
 from tg_bot.services.user_service import UserService
 from tg_bot.services.support_topics_service import SupportTopicsService
 
 
+def _get_cache(settings: Settings, name: str) -> TTLCache | None:
+    """Микрокэш ответов GET клиента API: повторное нажатие той же кнопки не доходит до backend."""
+    if settings.api_get_cache_ttl <= 0:
+        return None
+    return TTLCache(name=name, maxsize=settings.api_get_cache_size, ttl=settings.api_get_cache_ttl)
+
+
 def create_bot_and_dispatcher(settings: Settings) -> tuple[Bot, Dispatcher]:
     # Настраиваем сессию с retry логикой для Telegram API:
     # - timeout: таймаут на запросы (в секундах)
     # - max_retries: количество повторных попыток при сетевых ошибках
     # - base_delay: начальная задержка между попытками (экспоненциально растёт)
+    # - rate_limiter: глобальный лимит бота и лимиты по чатам (отдельно — админский чат)
     session = RetryAiohttpSession(
         timeout=30.0,
         proxy=settings.proxy_url,
         max_retries=3,
         base_delay=1.0,
         max_delay=5.0,
+        rate_limiter=TelegramRateLimiter(
+            global_rate=settings.telegram_global_rate,
+            private_rate=settings.telegram_private_chat_rate,
+            private_burst=settings.telegram_private_chat_burst,
+            group_rate_per_minute=settings.telegram_group_rate_per_minute,
+            group_burst=settings.telegram_group_burst,
+            admin_chat_id=settings.admin_chat_id,
+            admin_rate_per_minute=settings.telegram_admin_chat_rate_per_minute,
+            admin_burst=settings.telegram_admin_chat_burst,
+        ),
     )
     bot = Bot(
         token=settings.telegram_bot_token,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML),
         session=session,
     )
-    dispatcher = Dispatcher()
+    # Апдейты одного чата обрабатываются строго по очереди, разных чатов — параллельно
+    dispatcher = OrderedDispatcher(
+        storage=create_fsm_storage(settings),
+        max_lanes=settings.update_lanes_max,
+    )
 
-    users_api = UsersApi(base_url=str(settings.api_base_url), token=settings.internal_token)
-    orders_api = OrdersApi(base_url=str(settings.api_base_url), token=settings.internal_token)
-    support_topics_api = SupportTopicsApi(base_url=str(settings.api_base_url), token=settings.internal_token)
+    # Один пул соединений на все клиенты LeafFlow API
+    api_pool = ApiHttpPool(
+        base_url=str(settings.api_base_url).rstrip("/"),
+        timeout=BaseApiClient.DEFAULT_TIMEOUT,
+        max_connections=settings.api_max_connections,
+        max_keepalive_connections=settings.api_max_keepalive_connections,
+        keepalive_expiry=settings.api_keepalive_expiry,
+        http2=settings.api_http2,
+    )
+    # Breaker и bulkhead по эндпоинтам: медленный эндпоинт не занимает весь пул и отказывает сразу
+    api_guards = EndpointGuards(
+        window=settings.api_breaker_window,
+        min_requests=settings.api_breaker_min_requests,
+        failure_rate=settings.api_breaker_failure_rate,
+        open_timeout=settings.api_breaker_open_timeout,
+        max_concurrency=settings.api_endpoint_max_concurrency,
+        queue_timeout=settings.api_endpoint_queue_timeout,
+    )
+    profile_cache = TTLCache(
+        name="user_profiles",
+        maxsize=settings.user_cache_size,
+        ttl=settings.user_cache_ttl,
+        negative_ttl=settings.user_cache_negative_ttl,
+    )
+    users_api = UsersApi(
+        base_url=str(settings.api_base_url),
+        token=settings.internal_token,
+        pool=api_pool,
+        guards=api_guards,
+        coalesce_gets=settings.api_get_coalescing,
+        get_cache=_get_cache(settings, "users_get"),
+        profile_cache=profile_cache,
+    )
+    orders_api = OrdersApi(
+        base_url=str(settings.api_base_url),
+        token=settings.internal_token,
+        pool=api_pool,
+        guards=api_guards,
+        coalesce_gets=settings.api_get_coalescing,
+        get_cache=_get_cache(settings, "orders_get"),
+        page_cache=TTLCache(
+            name="order_pages",
+            maxsize=settings.orders_page_cache_size,
+            ttl=settings.orders_page_cache_ttl,
+            on_evict=OrderPages.close,
+        ),
+    )
+    support_topics_api = SupportTopicsApi(
+        base_url=str(settings.api_base_url),
+        token=settings.internal_token,
+        pool=api_pool,
+        guards=api_guards,
+        coalesce_gets=settings.api_get_coalescing,
+        get_cache=_get_cache(settings, "support_topics_get"),
+        mapping_cache=SupportTopicMappingCache(
+            maxsize=settings.support_topics_cache_size,
+            ttl=settings.support_topics_cache_ttl,
+        ),
+    )
+    side_effects = SideEffectQueue(
+        maxsize=settings.side_effects_queue_size,
+        workers=settings.side_effects_workers,
+        journal_path=settings.side_effects_journal_path,
+        max_attempts=settings.side_effects_max_attempts,
+        retry_base_delay=settings.side_effects_retry_base_delay,
+        retry_max_delay=settings.side_effects_retry_max_delay,
+    )
     order_builder = OrdersTextBuilder(webapp_url=str(settings.webapp_url))
     user_service = UserService(order_builder=order_builder, webapp_url=str(settings.webapp_url))
     support_topics_service = SupportTopicsService(
@@ -45,18 +145,64 @@ def create_bot_and_dispatcher(settings: Settings) -> tuple[Bot, Dispatcher]:
         support_topics_api=support_topics_api,
         orders_api=orders_api,
         order_builder=order_builder,
+        side_effects=side_effects,
+        media_group_window=settings.media_group_window,
+    )
+    order_events = OrderEventsService(
+        bot=bot,
+        support_topics_service=support_topics_service,
+        side_effects=side_effects,
+        window=settings.order_events_window,
+    )
+    broadcast_service = BroadcastService(
+        bot=bot,
+        users_api=users_api,
+        admin_chat_id=settings.admin_chat_id,
+        state_path=settings.broadcast_state_path,
+        rate=settings.broadcast_rate,
+        workers=settings.broadcast_workers,
+        page_size=settings.broadcast_page_size,
+        report_interval=settings.broadcast_report_interval,
     )
+    broadcast_service.load()
+    # Обработчики всех действий уже зарегистрированы — можно восстанавливать журнал
+    side_effects.load()
 
     dispatcher['settings'] = settings
+    dispatcher['api_pool'] = api_pool
+    dispatcher['api_guards'] = api_guards
     dispatcher['users_api'] = users_api
     dispatcher['orders_api'] = orders_api
     dispatcher['support_topics_api'] = support_topics_api
     dispatcher['order_builder'] = order_builder
     dispatcher['user_service'] = user_service
     dispatcher['support_topics_service'] = support_topics_service
+    dispatcher['side_effects'] = side_effects
+    dispatcher['order_events'] = order_events
+    dispatcher['broadcast_service'] = broadcast_service
 
+    update_deduplicator = UpdateDeduplicator(
+        window=settings.dedup_window,
+        state_path=settings.dedup_state_path,
+    )
+    update_deduplicator.load()
+    dispatcher['update_deduplicator'] = update_deduplicator
+
+    media_registry = MediaRegistry(bot_id=bot.id, state_path=settings.media_state_path)
+    media_registry.load()
+    dispatcher['media_registry'] = media_registry
+
+    dispatcher.update.outer_middleware(UpdateMetricsMiddleware())
     dispatcher.message.middleware(LoggingMiddleware())
-    dispatcher.message.middleware(UserContextMiddleware())
+    # Последними среди мидлварей диспетчера, чтобы измерять хендлер (с мидлварями его роутера)
+    dispatcher.message.middleware(HandlerMetricsMiddleware())
+    dispatcher.callback_query.middleware(HandlerMetricsMiddleware())
+
+    # Профиль пользователя запрашивается только для роутеров, хендлеры которых принимают user_profile
+    user_context = UserContextMiddleware()
+    start.router.message.middleware(user_context)
+    orders.router.message.middleware(user_context)
+    orders.router.callback_query.middleware(user_context)
 
     dispatcher.include_router(start.router)
     dispatcher.include_router(orders.router)
@@ -0,0 +1,87 @@
+import logging
+import os
+from collections import deque
+from pathlib import Path
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.types import Update
+
+from tg_bot.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_UPDATES = REGISTRY.counter("telegram_duplicate_updates_total", "Повторно доставленные апдейты")
+
+
+class UpdateDeduplicator:
+    """
+    Окно последних update_id для отбрасывания повторных доставок Telegram.
+
+    Хранит не больше `window` идентификаторов (кольцо + множество). При
+    заданном `state_path` окно сохраняется в файл, чтобы переживать рестарты.
+    """
+
+    def __init__(self, *, window: int, state_path: str | None = None, flush_every: int = 100):
+        self.window = window
+        self.state_path = Path(state_path) if state_path else None
+        self.flush_every = flush_every
+        self._order: deque[int] = deque()
+        self._ids: set[int] = set()
+        self._unsaved = 0
+
+    def seen(self, update_id: int) -> bool:
+        """Проверить апдейт: True — дубликат, False — новый (и теперь запомнен)."""
+        if update_id in self._ids:
+            DUPLICATE_UPDATES.inc()
+            return True
+        self._ids.add(update_id)
+        self._order.append(update_id)
+        while len(self._order) > self.window:
+            self._ids.discard(self._order.popleft())
+        self._unsaved += 1
+        if self.state_path and self._unsaved >= self.flush_every:
+            self.save()
+        return False
+
+    def load(self) -> None:
+        if not self.state_path or not self.state_path.exists():
+            return
+        try:
+            ids = [int(line) for line in self.state_path.read_text().split() if line]
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось загрузить окно update_id из {self.state_path}: {e}")
+            return
+        for update_id in ids[-self.window:]:
+            if update_id not in self._ids:
+                self._ids.add(update_id)
+                self._order.append(update_id)
+        logger.info(f"Загружено {len(self._order)} update_id из {self.state_path}")
+
+    def save(self) -> None:
+        if not self.state_path:
+            return
+        tmp_path = self.state_path.with_suffix(self.state_path.suffix + ".tmp")
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text("\n".join(map(str, self._order)))
+            os.replace(tmp_path, self.state_path)
+            self._unsaved = 0
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить окно update_id в {self.state_path}: {e}")
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+
+class DeduplicationMiddleware(BaseMiddleware):
+    """Outer-мидлварь апдейтов для polling-режима: повторные update_id не обрабатываются."""
+
+    def __init__(self, deduplicator: UpdateDeduplicator):
+        self.deduplicator = deduplicator
+
+    async def __call__(self, handler, event: Update, data):  # type: ignore[override]
+        if self.deduplicator.seen(event.update_id):
+            logger.info(f"Пропускаем повторный update id={event.update_id}")
+            return UNHANDLED
+        return await handler(event, data)
@@ -0,0 +1,228 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Mapping, TypeVar
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+
+from tg_bot.config import Settings
+from tg_bot.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+FSM_EXPIRED = REGISTRY.counter("fsm_expired_total", "Состояния FSM, удалённые по истечении TTL", ["storage"])
+FSM_KEYS = REGISTRY.gauge("fsm_keys", "Активные ключи FSM в хранилище", ["storage"])
+
+
+def _state_name(state: StateType) -> str | None:
+    return state.state if isinstance(state, State) else state
+
+
+class _Record:
+    __slots__ = ("state", "data", "expires_at")
+
+    def __init__(self) -> None:
+        self.state: str | None = None
+        self.data: dict[str, Any] = {}
+        self.expires_at = 0.0
+
+
+class TTLMemoryStorage(BaseStorage):
+    """
+    In-memory хранилище FSM с удалением брошенных сценариев.
+
+    Каждое обращение к ключу продлевает его жизнь на `ttl` секунд. Записи
+    хранятся в порядке последнего обращения, поэтому просроченные всегда
+    в начале словаря и удаляются за O(1) на операцию, без фоновых задач.
+    """
+
+    def __init__(self, *, ttl: float, key_builder: KeyBuilder | None = None):
+        self.ttl = ttl
+        self.key_builder = key_builder or DefaultKeyBuilder()
+        self._records: OrderedDict[str, _Record] = OrderedDict()
+
+    def _touch(self, key: StorageKey, create: bool) -> _Record | None:
+        now = time.monotonic()
+        self._evict(now)
+        name = self.key_builder.build(key)
+        record = self._records.get(name)
+        if record is None:
+            if not create:
+                return None
+            record = self._records[name] = _Record()
+        else:
+            self._records.move_to_end(name)
+        record.expires_at = now + self.ttl
+        return record
+
+    def _evict(self, now: float) -> None:
+        expired = 0
+        while self._records:
+            name, record = next(iter(self._records.items()))
+            if record.expires_at > now:
+                break
+            del self._records[name]
+            expired += 1
+        if expired:
+            FSM_EXPIRED.inc(expired, storage="memory")
+        FSM_KEYS.set(len(self._records), storage="memory")
+
+    def _drop_if_empty(self, key: StorageKey, record: _Record) -> None:
+        # Сценарий завершён (state.clear()) — ключ больше не нужен
+        if record.state is None and not record.data:
+            self._records.pop(self.key_builder.build(key), None)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = self._touch(key, create=state is not None)
+        if record is not None:
+            record.state = _state_name(state)
+            self._drop_if_empty(key, record)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        record = self._touch(key, create=False)
+        return record.state if record is not None else None
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        record = self._touch(key, create=bool(data))
+        if record is not None:
+            record.data = dict(data)
+            self._drop_if_empty(key, record)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        record = self._touch(key, create=False)
+        return dict(record.data) if record is not None else {}
+
+    async def close(self) -> None:
+        pass
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+
+class SqliteStorage(BaseStorage):
+    """
+    Хранилище FSM в локальной SQLite (WAL) — состояние переживает рестарт.
+
+    В режиме WAL читатели не блокируют писателя, поэтому один файл могут
+    использовать несколько процессов на одной машине (реплики с общим
+    томом). Запросы выполняются по очереди в отдельном потоке хранилища:
+    пока другой процесс держит блокировку записи (busy_timeout), event
+    loop продолжает обрабатывать апдейты. Брошенные сценарии удаляются
+    по TTL: просроченные ключи не читаются и периодически вычищаются.
+    """
+
+    # Раз в столько записей удаляются просроченные ключи
+    SWEEP_EVERY = 1000
+
+    def __init__(self, *, path: str, ttl: float, key_builder: KeyBuilder | None = None):
+        self.ttl = ttl
+        self.key_builder = key_builder or DefaultKeyBuilder()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Один поток на хранилище: запросы к соединению выполняются строго по очереди
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fsm-sqlite")
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # В WAL с NORMAL коммит не делает fsync; при сбое питания теряются только последние записи
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS fsm ("
+            "key TEXT PRIMARY KEY, state TEXT, data TEXT, expires_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS fsm_expires_at ON fsm (expires_at)")
+        self._writes = 0
+        self.sweep()
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def sweep(self) -> int:
+        """Удалить просроченные ключи. Возвращает число удалённых."""
+        # Время в файле — wall clock: его читают и другие процессы
+        deleted = self._db.execute("DELETE FROM fsm WHERE expires_at <= ?", (time.time(),)).rowcount
+        if deleted:
+            FSM_EXPIRED.inc(deleted, storage="sqlite")
+        return deleted
+
+    def _after_write(self) -> None:
+        self._writes += 1
+        if self._writes % self.SWEEP_EVERY == 0:
+            self.sweep()
+
+    def _row(self, name: str) -> tuple[str | None, str | None] | None:
+        return self._db.execute(
+            "SELECT state, data FROM fsm WHERE key = ? AND expires_at > ?", (name, time.time())
+        ).fetchone()
+
+    def _set_state(self, name: str, state_name: str | None) -> None:
+        now = time.time()
+        if state_name is None:
+            # Пустая запись (ни состояния, ни данных) не хранится; просроченные данные не продлеваются
+            self._db.execute("DELETE FROM fsm WHERE key = ? AND (data IS NULL OR expires_at <= ?)", (name, now))
+            self._db.execute("UPDATE fsm SET state = NULL, expires_at = ? WHERE key = ?", (now + self.ttl, name))
+        else:
+            # Данные просроченной, ещё не вычищенной записи относятся к брошенному сценарию
+            self._db.execute(
+                "INSERT INTO fsm (key, state, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET state = excluded.state, "
+                "data = CASE WHEN fsm.expires_at <= ? THEN NULL ELSE fsm.data END, "
+                "expires_at = excluded.expires_at",
+                (name, state_name, now + self.ttl, now),
+            )
+        self._after_write()
+
+    def _set_data(self, name: str, data: str | None) -> None:
+        now = time.time()
+        if data is None:
+            # Пустая запись (ни состояния, ни данных) не хранится; просроченное состояние не продлевается
+            self._db.execute("DELETE FROM fsm WHERE key = ? AND (state IS NULL OR expires_at <= ?)", (name, now))
+            self._db.execute("UPDATE fsm SET data = NULL, expires_at = ? WHERE key = ?", (now + self.ttl, name))
+        else:
+            # Состояние просроченной, ещё не вычищенной записи относится к брошенному сценарию
+            self._db.execute(
+                "INSERT INTO fsm (key, data, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET data = excluded.data, "
+                "state = CASE WHEN fsm.expires_at <= ? THEN NULL ELSE fsm.state END, "
+                "expires_at = excluded.expires_at",
+                (name, data, now + self.ttl, now),
+            )
+        self._after_write()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self._run(self._set_state, self.key_builder.build(key), _state_name(state))
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        row = await self._run(self._row, self.key_builder.build(key))
+        return row[0] if row is not None else None
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        encoded = json.dumps(dict(data), ensure_ascii=False) if data else None
+        await self._run(self._set_data, self.key_builder.build(key), encoded)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        row = await self._run(self._row, self.key_builder.build(key))
+        if row is None or row[1] is None:
+            return {}
+        return json.loads(row[1])
+
+    async def close(self) -> None:
+        await self._run(self._db.close)
+        self._executor.shutdown()
+
+
+def create_fsm_storage(settings: Settings) -> BaseStorage:
+    """Хранилище FSM по настройке FSM_STORAGE: `memory` или `sqlite`."""
+    if settings.fsm_storage == "sqlite":
+        logger.info(f"FSM хранится в SQLite: {settings.fsm_storage_path}")
+        return SqliteStorage(path=settings.fsm_storage_path, ttl=settings.fsm_state_ttl)
+    if settings.fsm_storage != "memory":
+        raise ValueError(f"Неизвестное хранилище FSM: {settings.fsm_storage}")
+    return TTLMemoryStorage(ttl=settings.fsm_state_ttl)
@@ -1,5 +1,7 @@
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo
 
+from tg_bot.api_client.models import OrderSummary
+
 
 def order_actions(order_id: str) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(
@@ -14,13 +16,27 @@ def open_webapp_button(webapp_url: str) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(text="Открыть приложение", web_app=WebAppInfo(url=webapp_url))]])
 
 
-def orders_pagination_keyboard(next_offset: int) -> InlineKeyboardMarkup:
-    """Клавиатура с кнопкой пагинации для списка заказов"""
-    return InlineKeyboardMarkup(
-        inline_keyboard=[
-            [InlineKeyboardButton(text="Показать еще", callback_data=f"orders:page:{next_offset}")]
+def orders_page_keyboard(
+    orders: list[OrderSummary],
+    prev_offset: int | None,
+    next_offset: int | None,
+) -> InlineKeyboardMarkup:
+    """Клавиатура страницы заказов: кнопки каждого заказа и навигация по страницам"""
+    rows = [
+        [
+            InlineKeyboardButton(text=f"📋 #{order.orderId}", callback_data=f"order:{order.orderId}"),
+            InlineKeyboardButton(text="💬 Чат", callback_data=f"chat:order:{order.orderId}"),
         ]
-    )
+        for order in orders
+    ]
+    navigation = []
+    if prev_offset is not None:
+        navigation.append(InlineKeyboardButton(text="◀️ Назад", callback_data=f"orders:page:{prev_offset}"))
+    if next_offset is not None:
+        navigation.append(InlineKeyboardButton(text="Вперёд ▶️", callback_data=f"orders:page:{next_offset}"))
+    if navigation:
+        rows.append(navigation)
+    return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
 def admin_order_details_button(order_id: str) -> InlineKeyboardMarkup:
@@ -61,3 +77,13 @@ def admin_status_comment_keyboard(order_id: str, new_status: str) -> InlineKeybo
             [InlineKeyboardButton(text="❌ Отмена", callback_data=f"admin:status:cancel:{order_id}")]
         ]
     )
+
+
+def admin_broadcast_confirm_keyboard(message_id: int) -> InlineKeyboardMarkup:
+    """Подтверждение рассылки сообщения всем покупателям"""
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [InlineKeyboardButton(text="📣 Разослать", callback_data=f"admin:broadcast:start:{message_id}")],
+            [InlineKeyboardButton(text="❌ Отмена", callback_data="admin:broadcast:cancel")]
+        ]
+    )
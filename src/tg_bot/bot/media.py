@@ -0,0 +1,152 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile, Message
+
+from tg_bot.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+MEDIA_UPLOADS = REGISTRY.counter("telegram_media_uploads_total", "Загрузки статичных файлов в Telegram", ["asset"])
+
+# Корень статичных файлов бота (tg_bot/data)
+MEDIA_DIR = Path(__file__).resolve().parents[1] / "data"
+
+PHOTO_SUFFIXES = (".jpg", ".jpeg", ".png", ".webp")
+
+# Ошибки Telegram, после которых file_id нужно заменить повторной загрузкой файла
+FILE_ID_ERRORS = ("wrong file identifier", "file reference expired")
+
+
+def is_file_id_error(error: TelegramBadRequest) -> bool:
+    message = str(error).lower()
+    return any(marker in message for marker in FILE_ID_ERRORS)
+
+
+class MediaRegistry:
+    """
+    Реестр file_id статичных файлов из `tg_bot/data`.
+
+    Файл загружается в Telegram один раз, дальше отправляется по file_id.
+    Ключ — id бота и SHA-256 содержимого (file_id действителен только для
+    своего бота), поэтому после деплоя неизменённые файлы не загружаются
+    повторно, а изменённые — загружаются заново. При заданном `state_path`
+    реестр сохраняется в JSON-файл.
+    """
+
+    def __init__(self, *, bot_id: int, media_dir: Path = MEDIA_DIR, state_path: str | None = None):
+        self.bot_id = bot_id
+        self.media_dir = media_dir
+        self.state_path = Path(state_path) if state_path else None
+        self._file_ids: dict[str, str] = {}
+        self._keys: dict[str, str] = {}
+        self._uploads: dict[str, asyncio.Lock] = {}
+        # file_id, которые Telegram отклонил: не берём их снова из файла реестра
+        self._rejected: set[str] = set()
+
+    def photos(self) -> list[str]:
+        """Имена всех изображений относительно media_dir (например, `img/support_6x4.jpg`)."""
+        return sorted(
+            path.relative_to(self.media_dir).as_posix()
+            for path in self.media_dir.rglob("*")
+            if path.suffix.lower() in PHOTO_SUFFIXES
+        )
+
+    def file_id(self, name: str) -> str | None:
+        return self._file_ids.get(self._key(name))
+
+    async def send_photo(self, bot: Bot, chat_id: int | str, name: str, **kwargs: Any) -> Message:
+        """Отправить изображение из media_dir: по file_id, если он известен, иначе загрузить файл."""
+        key = self._key(name)
+        file_id = self._file_ids.get(key)
+        if file_id is not None:
+            message = await self._send_by_file_id(bot, chat_id, name, key, file_id, **kwargs)
+            if message is not None:
+                return message
+
+        # Одновременные первые отправки загружают файл один раз
+        upload = self._uploads.setdefault(key, asyncio.Lock())
+        async with upload:
+            # Пока ждали блокировку, файл могла загрузить другая отправка
+            file_id = self._file_ids.get(key)
+            if file_id is not None and file_id not in self._rejected:
+                self._file_ids[key] = file_id
+                message = await self._send_by_file_id(bot, chat_id, name, key, file_id, **kwargs)
+                if message is not None:
+                    return message
+            message = await bot.send_photo(chat_id, photo=FSInputFile(self.media_dir / name), **kwargs)
+            MEDIA_UPLOADS.inc(asset=name)
+            self._file_ids[key] = message.photo[-1].file_id
+            self.save()
+            return message
+
+    async def _send_by_file_id(
+        self, bot: Bot, chat_id: int | str, name: str, key: str, file_id: str, **kwargs: Any
+    ) -> Message | None:
+        """Отправить по file_id; None — Telegram отклонил file_id, и файл нужно загрузить заново."""
+        try:
+            return await bot.send_photo(chat_id, photo=file_id, **kwargs)
+        except TelegramBadRequest as e:
+            # Остальные ошибки (чат не найден, неверная подпись) повторная загрузка не исправит
+            if not is_file_id_error(e):
+                raise
+            logger.warning(f"file_id для {name} не принят Telegram, загружаем файл заново: {e}")
+            self._rejected.add(file_id)
+            if self._file_ids.get(key) == file_id:
+                del self._file_ids[key]
+            return None
+
+    async def warm_up(self, bot: Bot, chat_id: int | str) -> None:
+        """
+        Загрузить ещё не известные изображения заранее: отправить в служебный
+        чат без уведомления и сразу удалить сообщение.
+        """
+        for name in self.photos():
+            if self.file_id(name) is not None:
+                continue
+            try:
+                message = await self.send_photo(bot, chat_id, name, disable_notification=True)
+                await bot.delete_message(chat_id, message.message_id)
+                logger.info(f"Изображение {name} загружено в Telegram заранее")
+            except Exception as e:
+                logger.warning(f"Не удалось заранее загрузить {name}: {e}")
+
+    def load(self) -> None:
+        self._file_ids.update(self._read_state())
+        if self._file_ids:
+            logger.info(f"Загружено {len(self._file_ids)} file_id из {self.state_path}")
+
+    def save(self) -> None:
+        if not self.state_path:
+            return
+        tmp_path = self.state_path.with_suffix(f"{self.state_path.suffix}.tmp")
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text(json.dumps(self._file_ids, indent=2, sort_keys=True))
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить реестр file_id в {self.state_path}: {e}")
+
+    def _read_state(self) -> dict[str, str]:
+        if not self.state_path or not self.state_path.exists():
+            return {}
+        try:
+            return json.loads(self.state_path.read_text())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось загрузить реестр file_id из {self.state_path}: {e}")
+            return {}
+
+    def _key(self, name: str) -> str:
+        key = self._keys.get(name)
+        if key is None:
+            # Хэш считается один раз за время жизни процесса: файлы меняются только при деплое
+            digest = hashlib.sha256((self.media_dir / name).read_bytes()).hexdigest()
+            key = self._keys[name] = f"{self.bot_id}:{digest}"
+        return key
@@ -0,0 +1,73 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+FlushCallback = Callable[[list[int]], Awaitable[None]]
+
+
+@dataclass
+class _Group:
+    flush: FlushCallback
+    message_ids: list[int] = field(default_factory=list)
+    timer: asyncio.TimerHandle | None = None
+
+
+class MediaGroupCollector:
+    """
+    Буфер сообщений альбомов (media_group_id).
+
+    Telegram присылает каждое фото альбома отдельным апдейтом. Сообщения
+    одного альбома копятся, пока новые приходят чаще чем раз в `window`
+    секунд, затем `flush` первого сообщения получает все message_id разом:
+    альбом пересылается одним copy_messages и остаётся альбомом.
+
+    `scope` — поток сообщений, в котором важен порядок (чат пользователя,
+    топик админского чата).
+    """
+
+    def __init__(self, *, window: float):
+        self.window = window
+        self._groups: dict[tuple[Hashable, str], _Group] = {}
+        self._flushing: set[asyncio.Task] = set()
+
+    def add(self, scope: Hashable, media_group_id: str, message_id: int, flush: FlushCallback) -> None:
+        key = (scope, media_group_id)
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = _Group(flush=flush)
+        group.message_ids.append(message_id)
+        if group.timer is not None:
+            group.timer.cancel()
+        group.timer = asyncio.get_running_loop().call_later(self.window, self._expire, key)
+
+    async def flush_scope(self, scope: Hashable) -> None:
+        """Переслать собранные альбомы сейчас — чтобы следующее сообщение не обогнало их."""
+        for key in [key for key in self._groups if key[0] == scope]:
+            await self._flush(self._pop(key))
+
+    async def flush_all(self) -> None:
+        """Переслать все собранные альбомы (при остановке)."""
+        for key in list(self._groups):
+            await self._flush(self._pop(key))
+        await asyncio.gather(*self._flushing, return_exceptions=True)
+
+    def _pop(self, key: tuple[Hashable, str]) -> _Group:
+        group = self._groups.pop(key)
+        if group.timer is not None:
+            group.timer.cancel()
+        return group
+
+    def _expire(self, key: tuple[Hashable, str]) -> None:
+        task = asyncio.create_task(self._flush(self._pop(key)))
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+
+    @staticmethod
+    async def _flush(group: _Group) -> None:
+        try:
+            await group.flush(sorted(group.message_ids))
+        except Exception as e:
+            logger.error(f"Ошибка при пересылке альбома {group.message_ids}: {e}", exc_info=True)
@@ -0,0 +1,84 @@
+import time
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.types import TelegramObject, Update
+from aiogram.types.update import UpdateTypeLookupError
+
+from tg_bot.metrics import REGISTRY
+
+UPDATES_IN_FLIGHT = REGISTRY.gauge("telegram_updates_in_flight", "Апдейты, обрабатываемые прямо сейчас")
+UPDATE_DURATION = REGISTRY.histogram(
+    "telegram_update_duration_seconds",
+    "Полное время обработки апдейта диспетчером",
+    ["event_type", "handled"],
+)
+HANDLER_DURATION = REGISTRY.histogram(
+    "telegram_handler_duration_seconds",
+    "Время работы хендлера (router.handler)",
+    ["handler", "status"],
+)
+
+
+def handler_name(callback: Callable[..., Any]) -> str:
+    """Имя хендлера для метки: `orders.list_orders` (модуль роутера + функция)."""
+    module = getattr(callback, "__module__", "") or ""
+    name = getattr(callback, "__qualname__", None) or type(callback).__name__
+    return f"{module.rsplit('.', 1)[-1]}.{name}"
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Outer-мидлварь апдейтов: число апдейтов в обработке и полное время обработки."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: dict[str, Any],
+    ) -> Any:
+        try:
+            event_type = event.event_type
+        except UpdateTypeLookupError:
+            event_type = "unknown"
+        UPDATES_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        handled = "false"
+        try:
+            result = await handler(event, data)
+            handled = "false" if result is UNHANDLED else "true"
+            return result
+        finally:
+            UPDATES_IN_FLIGHT.dec()
+            UPDATE_DURATION.observe(
+                time.perf_counter() - started,
+                event_type=event_type,
+                handled=handled,
+            )
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Inner-мидлварь: время работы конкретного хендлера.
+
+    Регистрируется на наблюдателях диспетчера и поэтому применяется к
+    хендлерам всех вложенных роутеров; выбранный хендлер aiogram передаёт
+    в `data["handler"]`.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        handler_object = data.get("handler")
+        name = handler_name(handler_object.callback) if handler_object is not None else "unknown"
+        started = time.perf_counter()
+        status = "error"
+        try:
+            result = await handler(event, data)
+            status = "ok"
+            return result
+        finally:
+            HANDLER_DURATION.observe(time.perf_counter() - started, handler=name, status=status)
@@ -0,0 +1,163 @@
+import asyncio
+import time
+
+from tg_bot.bot.middlewares.retry_policy import remaining_time
+from tg_bot.metrics import REGISTRY
+
+RATE_LIMIT_WAIT = REGISTRY.histogram(
+    "telegram_ratelimit_wait_seconds",
+    "Задержка исходящих запросов к Telegram в лимитере",
+    ["method"],
+)
+RATE_LIMIT_REJECTED = REGISTRY.counter(
+    "telegram_ratelimit_rejected_total",
+    "Отправки, отклонённые лимитером: очередь дольше дедлайна обработки апдейта",
+    ["method"],
+)
+RATE_LIMIT_PAUSES = REGISTRY.counter(
+    "telegram_ratelimit_pauses_total",
+    "Паузы бакетов по TelegramRetryAfter",
+    ["scope"],
+)
+
+# Методы, на которые распространяются лимиты Telegram на отправку сообщений
+LIMITED_METHOD_PREFIXES = ("send", "copy", "forward", "edit", "createForumTopic")
+
+
+class RateLimitDeadlineError(TimeoutError):
+    """Очередь отправки в лимитере длиннее, чем осталось до дедлайна обработки апдейта."""
+
+
+class TokenBucket:
+    """
+    Токен-бакет в форме GCRA: вместо счётчика токенов хранится теоретическое
+    время следующей отправки, поэтому резервирование — O(1) без фоновых задач,
+    а ожидающие обслуживаются в порядке вызова `reserve`.
+    """
+
+    __slots__ = ("interval", "tolerance", "_tat")
+
+    def __init__(self, *, rate: float, burst: int = 1):
+        self.interval = 1.0 / rate
+        self.tolerance = self.interval * (max(burst, 1) - 1)
+        self._tat = 0.0
+
+    def reserve(self, now: float) -> float:
+        """Зарезервировать отправку и вернуть, сколько секунд нужно подождать."""
+        send_at = max(now, self._tat - self.tolerance)
+        self._tat = max(self._tat, send_at) + self.interval
+        return send_at - now
+
+    def release(self) -> None:
+        """Вернуть резервацию, по которой отправки не будет (ожидание отменено)."""
+        self._tat -= self.interval
+
+    def pause_until(self, until: float) -> None:
+        """Не выпускать запросы раньше `until` (например, после TelegramRetryAfter)."""
+        self._tat = max(self._tat, until + self.tolerance)
+
+    def idle(self, now: float) -> bool:
+        return self._tat <= now
+
+
+class TelegramRateLimiter:
+    """
+    Лимитер исходящих сообщений с учётом ограничений Telegram.
+
+    Каждая отправка проходит через бакет чата (личный чат, группа или
+    админская супергруппа со своим лимитом), а затем через глобальный бакет бота.
+    """
+
+    # Начиная с этого числа бакетов чатов выполняется очистка простаивающих
+    SWEEP_THRESHOLD = 10000
+
+    def __init__(
+        self,
+        *,
+        global_rate: float = 30.0,
+        private_rate: float = 1.0,
+        private_burst: int = 3,
+        group_rate_per_minute: float = 20.0,
+        group_burst: int = 5,
+        admin_chat_id: int | None = None,
+        admin_rate_per_minute: float = 20.0,
+        admin_burst: int = 5,
+    ):
+        self.global_bucket = TokenBucket(rate=global_rate, burst=int(global_rate))
+        self.private_rate = private_rate
+        self.private_burst = private_burst
+        self.group_rate = group_rate_per_minute / 60.0
+        self.group_burst = group_burst
+        self.admin_chat_id = admin_chat_id
+        self.admin_bucket = TokenBucket(rate=admin_rate_per_minute / 60.0, burst=admin_burst)
+        self._chat_buckets: dict[int | str, TokenBucket] = {}
+
+    @staticmethod
+    def is_limited(method_name: str) -> bool:
+        return method_name.startswith(LIMITED_METHOD_PREFIXES)
+
+    async def acquire(self, method_name: str, chat_id: int | str | None) -> float:
+        """
+        Дождаться разрешения на отправку. Возвращает суммарное время ожидания.
+
+        Если ожидание не укладывается в дедлайн обработки апдейта
+        (`remaining_time`), сразу бросает RateLimitDeadlineError. При ошибке
+        и отмене резервации возвращаются в бакеты: отправки не будет, и
+        следующие отправки не должны ждать её очереди.
+        """
+        buckets = [self._chat_bucket(chat_id)] if chat_id is not None else []
+        buckets.append(self.global_bucket)
+        reserved: list[TokenBucket] = []
+        waited = 0.0
+        try:
+            for bucket in buckets:
+                delay = bucket.reserve(time.monotonic())
+                reserved.append(bucket)
+                if delay <= 0:
+                    continue
+                remaining = remaining_time()
+                if remaining is not None and delay >= remaining:
+                    RATE_LIMIT_REJECTED.inc(method=method_name)
+                    raise RateLimitDeadlineError(
+                        f"{method_name} chat_id={chat_id}: rate limit delay {delay:.1f}s "
+                        f"exceeds update deadline ({remaining:.1f}s left)"
+                    )
+                await asyncio.sleep(delay)
+                waited += delay
+        except BaseException:
+            for bucket in reserved:
+                bucket.release()
+            raise
+        RATE_LIMIT_WAIT.observe(waited, method=method_name)
+        return waited
+
+    def pause(self, chat_id: int | str | None, seconds: float) -> None:
+        """Приостановить отправку в чат (или всю отправку, если чат неизвестен)."""
+        until = time.monotonic() + seconds
+        if chat_id is None:
+            self.global_bucket.pause_until(until)
+            RATE_LIMIT_PAUSES.inc(scope="global")
+        else:
+            self._chat_bucket(chat_id).pause_until(until)
+            RATE_LIMIT_PAUSES.inc(scope="admin" if chat_id == self.admin_chat_id else "chat")
+
+    def _chat_bucket(self, chat_id: int | str) -> TokenBucket:
+        if chat_id == self.admin_chat_id:
+            return self.admin_bucket
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= self.SWEEP_THRESHOLD:
+                self._sweep()
+            # Положительные id — личные чаты, отрицательные и @username — группы и каналы
+            if isinstance(chat_id, int) and chat_id > 0:
+                bucket = TokenBucket(rate=self.private_rate, burst=self.private_burst)
+            else:
+                bucket = TokenBucket(rate=self.group_rate, burst=self.group_burst)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _sweep(self) -> None:
+        now = time.monotonic()
+        idle = [chat_id for chat_id, bucket in self._chat_buckets.items() if bucket.idle(now)]
+        for chat_id in idle:
+            del self._chat_buckets[chat_id]
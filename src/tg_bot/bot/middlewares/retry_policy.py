@@ -0,0 +1,134 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator
+
+from aiogram.exceptions import (
+    TelegramEntityTooLarge,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+
+from tg_bot.metrics import REGISTRY
+
+RETRIES = REGISTRY.counter("telegram_retries_total", "Повторы запросов к Telegram", ["method", "error"])
+RETRIES_REJECTED = REGISTRY.counter(
+    "telegram_retries_rejected_total",
+    "Повторы, от которых отказались (бюджет, дедлайн, лимит попыток)",
+    ["method", "reason"],
+)
+
+# Момент (time.monotonic), к которому должна завершиться обработка текущего апдейта
+_deadline: ContextVar[float | None] = ContextVar("update_deadline", default=None)
+
+
+@contextmanager
+def update_deadline(seconds: float) -> Iterator[None]:
+    """Ограничить повторы запросов внутри блока общим дедлайном обработки апдейта."""
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> float | None:
+    """Сколько секунд осталось до дедлайна текущего апдейта (None — дедлайна нет)."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+@dataclass(frozen=True)
+class RetryRule:
+    """Правило повторов для класса ошибок."""
+
+    max_retries: int
+    base_delay: float = 1.0
+    max_delay: float = 10.0
+    # Доля задержки, которая выбирается случайно (0 — без джиттера, 1 — full jitter)
+    jitter: float = 0.5
+    # Ждать ровно столько, сколько указал Telegram в retry_after
+    honor_retry_after: bool = False
+
+    def delay(self, attempt: int, error: Exception) -> float:
+        if self.honor_retry_after and isinstance(error, TelegramRetryAfter):
+            return float(error.retry_after)
+        backoff = min(self.base_delay * (2 ** attempt), self.max_delay)
+        return backoff * (1 - self.jitter) + random.uniform(0, backoff * self.jitter)
+
+
+class RetryBudget:
+    """
+    Бюджет повторов метода: каждый запрос пополняет бюджет на `ratio` токена,
+    каждый повтор тратит один. Не даёт повторам умножить нагрузку, когда
+    Telegram массово отвечает ошибками.
+    """
+
+    __slots__ = ("ratio", "max_tokens", "_tokens")
+
+    def __init__(self, *, ratio: float, max_tokens: float):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+
+    def on_request(self) -> None:
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        return True
+
+
+class RetryPolicy:
+    """Набор правил повторов по классам ошибок и бюджеты повторов по методам."""
+
+    def __init__(
+        self,
+        rules: dict[type[Exception], RetryRule],
+        *,
+        budget_ratio: float = 0.2,
+        budget_max_tokens: float = 20.0,
+    ):
+        self.rules = rules
+        self.budget_ratio = budget_ratio
+        self.budget_max_tokens = budget_max_tokens
+        self._budgets: dict[str, RetryBudget] = {}
+
+    @classmethod
+    def default(cls, *, max_retries: int = 3, base_delay: float = 1.0, max_delay: float = 10.0) -> "RetryPolicy":
+        return cls(
+            {
+                # Флуд-контроль: ждём столько, сколько попросил Telegram
+                TelegramRetryAfter: RetryRule(max_retries=max(max_retries, 5), honor_retry_after=True),
+                # 5xx и перезапуск Telegram: экспоненциальная задержка с джиттером
+                TelegramServerError: RetryRule(
+                    max_retries=max_retries, base_delay=base_delay, max_delay=max_delay, jitter=0.5
+                ),
+                TelegramNetworkError: RetryRule(
+                    max_retries=max_retries, base_delay=base_delay, max_delay=max_delay, jitter=0.2
+                ),
+                # Файл слишком большой — повтор ничего не изменит
+                TelegramEntityTooLarge: RetryRule(max_retries=0),
+            }
+        )
+
+    def rule_for(self, error: Exception) -> RetryRule | None:
+        for error_class in type(error).__mro__:
+            rule = self.rules.get(error_class)
+            if rule is not None:
+                return rule
+        return None
+
+    def budget(self, method_name: str) -> RetryBudget:
+        budget = self._budgets.get(method_name)
+        if budget is None:
+            budget = RetryBudget(ratio=self.budget_ratio, max_tokens=self.budget_max_tokens)
+            self._budgets[method_name] = budget
+        return budget
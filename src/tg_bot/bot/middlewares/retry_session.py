@@ -1,20 +1,35 @@
 import asyncio
 import logging
+import time
 
 from aiogram import Bot
 from aiogram.client.session.aiohttp import AiohttpSession
-from aiogram.exceptions import TelegramNetworkError
+from aiogram.exceptions import TelegramAPIError, TelegramRetryAfter
 from aiogram.methods import TelegramMethod
 from aiogram.methods.base import TelegramType
 
+from tg_bot.bot.middlewares.rate_limiter import TelegramRateLimiter
+from tg_bot.bot.middlewares.retry_policy import RETRIES, RETRIES_REJECTED, RetryPolicy, remaining_time
+from tg_bot.metrics import REGISTRY
+
 logger = logging.getLogger(__name__)
 
+TELEGRAM_REQUEST_DURATION = REGISTRY.histogram(
+    "telegram_request_duration_seconds",
+    "Запросы к Telegram Bot API (каждая попытка, без ожидания в лимитере)",
+    ["method", "outcome"],
+)
+
 
 class RetryAiohttpSession(AiohttpSession):
     """
-    Сессия aiogram с retry логикой для сетевых ошибок.
+    Сессия aiogram с политикой повторов и лимитером отправки.
     
-    При TelegramNetworkError повторяет запрос с экспоненциальной задержкой.
+    Правила повторов задаются по классам ошибок (RetryPolicy): флуд-контроль
+    ждёт retry_after, сетевые ошибки и 5xx повторяются с экспоненциальной
+    задержкой и джиттером. Повторы ограничены бюджетом метода и дедлайном
+    обработки текущего апдейта. При TelegramRetryAfter бакет чата в лимитере
+    ставится на паузу, чтобы остальные отправки в этот чат тоже подождали.
     """
 
     def __init__(
@@ -25,11 +40,36 @@ class RetryAiohttpSession(AiohttpSession):
         max_retries: int = 3,
         base_delay: float = 1.0,
         max_delay: float = 10.0,
+        rate_limiter: TelegramRateLimiter | None = None,
+        retry_policy: RetryPolicy | None = None,
     ):
         super().__init__(proxy=proxy, timeout=timeout)
-        self.max_retries = max_retries
-        self.base_delay = base_delay
-        self.max_delay = max_delay
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy or RetryPolicy.default(
+            max_retries=max_retries,
+            base_delay=base_delay,
+            max_delay=max_delay,
+        )
+
+    async def _timed_request(
+        self,
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+        timeout: int | None,
+    ) -> TelegramType:
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            return await super().make_request(bot, method, timeout)
+        except BaseException as e:
+            outcome = type(e).__name__
+            raise
+        finally:
+            TELEGRAM_REQUEST_DURATION.observe(
+                time.perf_counter() - started,
+                method=method.__api_method__,
+                outcome=outcome,
+            )
 
     async def make_request(
         self,
@@ -37,27 +77,53 @@ class RetryAiohttpSession(AiohttpSession):
         method: TelegramMethod[TelegramType],
         timeout: int | None = None,
     ) -> TelegramType:
-        """Выполняет запрос с retry при сетевых ошибках."""
-        last_error: Exception | None = None
+        """Выполняет запрос, повторяя его по правилам политики."""
+        method_name = method.__api_method__
+        chat_id = getattr(method, "chat_id", None)
+        limited = self.rate_limiter is not None and self.rate_limiter.is_limited(method_name)
+        budget = self.retry_policy.budget(method_name)
+        budget.on_request()
 
-        for attempt in range(self.max_retries + 1):
+        attempt = 0
+        while True:
+            if limited:
+                await self.rate_limiter.acquire(method_name, chat_id)
             try:
-                return await super().make_request(bot, method, timeout)
-            except TelegramNetworkError as e:
-                last_error = e
-                
-                if attempt < self.max_retries:
-                    # Экспоненциальная задержка: 1s, 2s, 4s, ...
-                    delay = min(self.base_delay * (2 ** attempt), self.max_delay)
-                    logger.warning(
-                        f"Telegram API network error (attempt {attempt + 1}/{self.max_retries + 1}): {e}. "
-                        f"Retrying in {delay:.1f}s..."
-                    )
-                    await asyncio.sleep(delay)
-                else:
+                return await self._timed_request(bot, method, timeout)
+            except TelegramAPIError as e:
+                rule = self.retry_policy.rule_for(e)
+                if rule is None:
+                    raise
+
+                error_name = type(e).__name__
+                if attempt >= rule.max_retries:
+                    RETRIES_REJECTED.inc(method=method_name, reason="attempts")
+                    logger.error(f"Telegram API {error_name} for {method_name} after {attempt + 1} attempts: {e}")
+                    raise
+
+                delay = rule.delay(attempt, e)
+                remaining = remaining_time()
+                if remaining is not None and delay >= remaining:
+                    RETRIES_REJECTED.inc(method=method_name, reason="deadline")
                     logger.error(
-                        f"Telegram API network error after {self.max_retries + 1} attempts: {e}"
+                        f"Telegram API {error_name} for {method_name}: retry in {delay:.1f}s "
+                        f"exceeds update deadline ({remaining:.1f}s left): {e}"
                     )
+                    raise
 
-        # Если все попытки исчерпаны
-        raise last_error  # type: ignore[misc]
+                if not budget.try_spend():
+                    RETRIES_REJECTED.inc(method=method_name, reason="budget")
+                    logger.error(f"Telegram API {error_name} for {method_name}: retry budget exhausted: {e}")
+                    raise
+
+                RETRIES.inc(method=method_name, error=error_name)
+                logger.warning(
+                    f"Telegram API {error_name} for {method_name} chat_id={chat_id} "
+                    f"(attempt {attempt + 1}/{rule.max_retries + 1}): {e}. Retrying in {delay:.1f}s..."
+                )
+                if isinstance(e, TelegramRetryAfter) and limited:
+                    # Пауза бакета задерживает и этот повтор, и остальные отправки в чат
+                    self.rate_limiter.pause(chat_id, delay)
+                else:
+                    await asyncio.sleep(delay)
+                attempt += 1
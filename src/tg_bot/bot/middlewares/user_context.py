@@ -1,12 +1,14 @@
 from aiogram import BaseMiddleware
-from aiogram.types import Message
+from aiogram.types import CallbackQuery, Message
 
 from tg_bot.api_client.users import UsersApi
 from tg_bot.api_client.models import UserProfile
 
 
 class UserContextMiddleware(BaseMiddleware):
-    async def __call__(self, handler, event: Message, data):  # type: ignore[override]
+    """Кладёт профиль отправителя в `user_profile`, чтобы хендлеры не запрашивали его повторно."""
+
+    async def __call__(self, handler, event: Message | CallbackQuery, data):  # type: ignore[override]
         users_api: UsersApi = data.get("users_api")
         user: UserProfile | None = None
         if event.from_user and users_api:
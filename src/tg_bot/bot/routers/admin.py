@@ -2,13 +2,19 @@ import logging
 
 from aiogram import Router
 from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
 
 from tg_bot.api_client.orders import OrdersApi
-from tg_bot.bot.keyboards.inline import admin_order_status_keyboard, admin_status_comment_keyboard
+from tg_bot.bot.keyboards.inline import (
+    admin_broadcast_confirm_keyboard,
+    admin_order_status_keyboard,
+    admin_status_comment_keyboard,
+)
 from tg_bot.bot.states import AdminOrderStatusStates
 from tg_bot.config import Settings
+from tg_bot.services.broadcast_service import BroadcastService
 
 logger = logging.getLogger(__name__)
 
@@ -68,13 +74,11 @@ async def admin_status_confirm_no_comment(
     """Подтверждение изменения статуса без комментария"""
     # Проверяем, что это админский чат
     if callback.message and callback.message.chat.id != settings.admin_chat_id:
-        await _safe_callback_answer(callback, "❌ Эта команда доступна только администраторам")
-        return
+        return callback.answer("❌ Эта команда доступна только администраторам")
     
     data_parts = callback.data.split(":")
     if len(data_parts) < 5:
-        await _safe_callback_answer(callback, "❌ Ошибка: неверный формат данных")
-        return
+        return callback.answer("❌ Ошибка: неверный формат данных")
     
     # Сразу отвечаем на callback, чтобы не было таймаута
     await _safe_callback_answer(callback)
@@ -102,13 +106,11 @@ async def admin_change_status_start(
     """Начало процесса изменения статуса заказа администратором"""
     # Проверяем, что это админский чат
     if callback.message and callback.message.chat.id != settings.admin_chat_id:
-        await _safe_callback_answer(callback, "❌ Эта команда доступна только администраторам")
-        return
+        return callback.answer("❌ Эта команда доступна только администраторам")
     
     data_parts = callback.data.split(":")
     if len(data_parts) < 3:
-        await _safe_callback_answer(callback, "❌ Ошибка: неверный формат данных")
-        return
+        return callback.answer("❌ Ошибка: неверный формат данных")
     
     action = data_parts[2]
     
@@ -116,14 +118,12 @@ async def admin_change_status_start(
         # Отмена изменения статуса
         order_id = data_parts[-1]
         await state.clear()
-        await _safe_callback_answer(callback, "❌ Изменение статуса отменено")
-        return
+        return callback.answer("❌ Изменение статуса отменено")
     
     if action == "select":
         # Выбор статуса
         if len(data_parts) < 5:
-            await _safe_callback_answer(callback, "❌ Ошибка: неверный формат данных")
-            return
+            return callback.answer("❌ Ошибка: неверный формат данных")
         
         order_id = data_parts[3]
         new_status = data_parts[4]
@@ -138,8 +138,7 @@ async def admin_change_status_start(
             "Введите комментарий или нажмите кнопку ниже, чтобы пропустить:",
             reply_markup=admin_status_comment_keyboard(order_id, new_status)
         )
-        await _safe_callback_answer(callback)
-        return
+        return callback.answer()
     
     # Начало процесса - показываем клавиатуру выбора статуса
     order_id = data_parts[-1]
@@ -151,7 +150,7 @@ async def admin_change_status_start(
         "Выберите новый статус заказа:",
         reply_markup=admin_order_status_keyboard(order_id)
     )
-    await _safe_callback_answer(callback)
+    return callback.answer()
 
 
 @router.message(AdminOrderStatusStates.waiting_comment)
@@ -192,3 +191,78 @@ async def admin_status_comment(
     
     await state.clear()
 
+
+@router.message(Command("broadcast"))
+async def admin_broadcast_command(
+    message: Message,
+    settings: Settings,
+    broadcast_service: BroadcastService,
+):
+    """Рассылка покупателям: /broadcast ответом на сообщение, которое нужно разослать"""
+    if message.chat.id != settings.admin_chat_id:
+        return
+
+    current = broadcast_service.current
+    if current is not None:
+        return message.answer(broadcast_service.report_text(current))
+
+    target = message.reply_to_message
+    # В форуме сообщение топика без явного ответа ссылается на служебное сообщение о создании топика
+    if target is None or target.forum_topic_created is not None:
+        return message.answer(
+            "📣 <b>Рассылка</b>\n\n"
+            "Отправьте сообщение для покупателей в общий чат и ответьте на него командой /broadcast"
+        )
+
+    return message.reply(
+        "📣 Разослать это сообщение всем покупателям?",
+        reply_markup=admin_broadcast_confirm_keyboard(target.message_id),
+    )
+
+
+@router.message(Command("broadcast_stop"))
+async def admin_broadcast_stop(
+    message: Message,
+    settings: Settings,
+    broadcast_service: BroadcastService,
+):
+    """Остановка текущей рассылки"""
+    if message.chat.id != settings.admin_chat_id:
+        return
+
+    if broadcast_service.cancel_broadcast():
+        logger.info(f"Администратор {message.from_user.id if message.from_user else None} остановил рассылку")
+        return message.answer("⏹ Рассылка останавливается, итоговый отчёт придёт в сообщение рассылки")
+    return message.answer("Рассылка сейчас не идёт")
+
+
+@router.callback_query(lambda c: c.data and c.data.startswith("admin:broadcast:"))
+async def admin_broadcast_confirm(
+    callback: CallbackQuery,
+    settings: Settings,
+    broadcast_service: BroadcastService,
+):
+    """Подтверждение или отмена рассылки"""
+    if not callback.message or callback.message.chat.id != settings.admin_chat_id:
+        return callback.answer("❌ Эта команда доступна только администраторам")
+
+    data_parts = callback.data.split(":")
+    action = data_parts[2]
+
+    if action == "cancel":
+        await _safe_callback_answer(callback)
+        return callback.message.edit_text("❌ Рассылка отменена")
+
+    if action != "start" or len(data_parts) < 4 or not data_parts[3].isdigit():
+        return callback.answer("❌ Ошибка: неверный формат данных")
+
+    # Отчёт о ходе рассылки обновляется в сообщении с подтверждением
+    state = broadcast_service.start_broadcast(
+        from_chat_id=callback.message.chat.id,
+        message_id=int(data_parts[3]),
+        started_by=callback.from_user.id,
+        report_message_id=callback.message.message_id,
+    )
+    if state is None:
+        return callback.answer("⏳ Уже идёт другая рассылка", show_alert=True)
+    return callback.answer("📣 Рассылка запущена")
@@ -33,7 +33,7 @@ async def start_order_chat(
         "Отправьте сообщение (текст, фото, файл и т.д.) — мы передадим его оператору.\n\n"
         "Ожидаю ваше сообщение... 👇"
     )
-    await callback.answer()
+    return callback.answer()
 
 
 @router.message(OrderChatStates.waiting_message)
@@ -46,8 +46,8 @@ async def relay_order_chat(
     data = await state.get_data()
     order_id = data.get("order_id")
     await support_topics_service.forward_user_to_topic(message, order_id=order_id)
-    await message.answer(
+    await state.clear()
+    return message.answer(
         f"✅ <b>Сообщение отправлено</b>\n\n"
         f"Ваше сообщение по заказу #{order_id} передано оператору. Ответ придёт в этот чат."
-    )
-    await state.clear()
\ No newline at end of file
+    )
\ No newline at end of file
@@ -1,11 +1,11 @@
 from aiogram import F, Router
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
-from aiogram.types import CallbackQuery, Message
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup, Message
 
+from tg_bot.api_client.models import UserProfile
 from tg_bot.api_client.orders import OrdersApi
-from tg_bot.api_client.users import UsersApi
-from tg_bot.bot.keyboards.inline import order_actions, open_webapp_button, orders_pagination_keyboard
+from tg_bot.bot.keyboards.inline import open_webapp_button, orders_page_keyboard
 from tg_bot.config import Settings
 from tg_bot.services.order_service import OrdersTextBuilder
 
@@ -24,107 +24,79 @@ router = Router()
 ORDERS_PER_PAGE = 3
 
 
-async def _send_orders_page(
-    message_or_callback: Message | CallbackQuery,
+async def _render_orders_page(
     user_telegram_id: int,
     orders_api: OrdersApi,
     order_builder: OrdersTextBuilder,
     offset: int = 0,
-) -> None:
-    """Отправить страницу заказов с пагинацией"""
-    orders = await orders_api.list_orders(user_telegram_id, limit=ORDERS_PER_PAGE, offset=offset)
-    
-    if not orders.items:
+    refresh: bool = False,
+) -> tuple[str, InlineKeyboardMarkup | None]:
+    """Текст и клавиатура страницы заказов: вся страница — одно сообщение"""
+    # Страницы кэшируются на пользователя: листание назад не ходит в backend, следующая загружается заранее
+    page_orders, has_next = await orders_api.orders_page(
+        user_telegram_id,
+        offset // ORDERS_PER_PAGE,
+        page_size=ORDERS_PER_PAGE,
+        refresh=refresh,
+    )
+
+    if not page_orders:
         if offset > 0:
-            text = "✅ <b>Больше заказов нет</b>\n\nВы просмотрели все свои заказы."
-        else:
-            text = (
-                "📦 <b>У вас пока нет заказов</b>\n\n"
-                "Вы можете оформить первый заказ в приложении — нажмите кнопку ниже 👇"
-            )
-        if isinstance(message_or_callback, CallbackQuery):
-            await message_or_callback.message.answer(text)
-            await _safe_callback_answer(message_or_callback)
-        else:
-            await message_or_callback.answer(text)
-        return
-
-    # Отправляем каждый заказ отдельным сообщением
-    for order in orders.items:
-        if isinstance(message_or_callback, CallbackQuery):
-            await message_or_callback.message.answer(
-                order_builder.format_order(order), 
-                reply_markup=order_actions(order.orderId)
-            )
-        else:
-            await message_or_callback.answer(
-                order_builder.format_order(order), 
-                reply_markup=order_actions(order.orderId)
-            )
-    
-    # Если вернулось ровно ORDERS_PER_PAGE заказов, возможно есть еще
-    if len(orders.items) == ORDERS_PER_PAGE:
-        next_offset = offset + ORDERS_PER_PAGE
-        pagination_text = "📄 <b>Показать еще заказы?</b>\n\nНажмите кнопку ниже 👇"
-        if isinstance(message_or_callback, CallbackQuery):
-            await message_or_callback.message.answer(
-                pagination_text,
-                reply_markup=orders_pagination_keyboard(next_offset)
-            )
-            await _safe_callback_answer(message_or_callback)
-        else:
-            await message_or_callback.answer(
-                pagination_text,
-                reply_markup=orders_pagination_keyboard(next_offset)
-            )
+            back = orders_page_keyboard([], prev_offset=max(offset - ORDERS_PER_PAGE, 0), next_offset=None)
+            return "✅ <b>Больше заказов нет</b>\n\nВы просмотрели все свои заказы.", back
+        return (
+            "📦 <b>У вас пока нет заказов</b>\n\n"
+            "Вы можете оформить первый заказ в приложении — нажмите кнопку ниже 👇"
+        ), None
+
+    prev_offset = max(offset - ORDERS_PER_PAGE, 0) if offset > 0 else None
+    next_offset = offset + ORDERS_PER_PAGE if has_next else None
+    text = order_builder.orders_page(page_orders, page=offset // ORDERS_PER_PAGE + 1)
+    return text, orders_page_keyboard(page_orders, prev_offset, next_offset)
 
 
 @router.message(Command("orders"))
 @router.message(F.text == "📦 Мои заказы")
-async def list_orders(message: Message, settings: Settings, users_api: UsersApi, orders_api: OrdersApi, order_builder: OrdersTextBuilder):
-    user_profile = await users_api.get_by_telegram(message.from_user.id) if message.from_user else None
+async def list_orders(message: Message, settings: Settings, user_profile: UserProfile | None, orders_api: OrdersApi, order_builder: OrdersTextBuilder):
+    # Профиль уже получен UserContextMiddleware
     if not user_profile:
-        await message.answer(
+        return message.answer(
             "📱 <b>Привет!</b>\n\n"
             "Похоже, вы ещё не открывали приложение. Нажмите кнопку ниже, чтобы перейти в него 👇",
             reply_markup=open_webapp_button(str(settings.webapp_url)),
         )
-        return
 
-    await _send_orders_page(message, user_profile.telegramId, orders_api, order_builder, offset=0)
+    # Новое открытие списка — без кэша, чтобы показать свежие заказы
+    text, reply_markup = await _render_orders_page(
+        user_profile.telegramId, orders_api, order_builder, offset=0, refresh=True
+    )
+    return message.answer(text, reply_markup=reply_markup)
 
 
 @router.callback_query(lambda c: c.data and c.data.startswith("orders:page:"))
-async def orders_pagination(callback: CallbackQuery, users_api: UsersApi, orders_api: OrdersApi, order_builder: OrdersTextBuilder):
-    """Обработчик пагинации списка заказов"""
+async def orders_pagination(callback: CallbackQuery, user_profile: UserProfile | None, orders_api: OrdersApi, order_builder: OrdersTextBuilder):
+    """Обработчик пагинации списка заказов: страница меняется в том же сообщении"""
     if not callback.from_user:
-        await _safe_callback_answer(callback, "❌ Ошибка: не удалось определить пользователя")
-        return
-    
-    # Удаляем сообщение с кнопкой "Показать еще"
-    if callback.message:
-        try:
-            await callback.message.delete()
-        except Exception:
-            # Если не удалось удалить (например, сообщение уже удалено), продолжаем
-            pass
-    
-    await _safe_callback_answer(callback)
-    
-    user_profile = await users_api.get_by_telegram(callback.from_user.id)
+        return callback.answer("❌ Ошибка: не удалось определить пользователя")
+
     if not user_profile:
-        if callback.message:
-            await callback.message.answer("❌ <b>Ошибка</b>\n\nПользователь не найден")
-        return
-    
+        return callback.answer("❌ Пользователь не найден")
+
     try:
-        offset = int(callback.data.split(":")[-1])
+        offset = max(int(callback.data.split(":")[-1]), 0)
     except (ValueError, IndexError):
-        if callback.message:
-            await callback.message.answer("❌ <b>Ошибка</b>\n\nНеверный формат данных")
-        return
-    
-    await _send_orders_page(callback, user_profile.telegramId, orders_api, order_builder, offset=offset)
+        return callback.answer("❌ Ошибка: неверный формат данных")
+
+    # Сразу отвечаем на callback: кнопка не «крутится», пока загружается страница
+    await _safe_callback_answer(callback)
+
+    text, reply_markup = await _render_orders_page(user_profile.telegramId, orders_api, order_builder, offset=offset)
+    if callback.message:
+        try:
+            await callback.message.edit_text(text, reply_markup=reply_markup)
+        except TelegramBadRequest:
+            # Страница не изменилась (двойное нажатие) или сообщение уже недоступно
+            pass
 
 
 @router.callback_query(lambda c: c.data and c.data.startswith("order:"))
@@ -147,8 +119,7 @@ async def admin_order_details(
     """Обработчик кнопки 'Подробнее' для администратора в админском чате"""
     # Проверяем, что это админский чат
     if callback.message and callback.message.chat.id != settings.admin_chat_id:
-        await _safe_callback_answer(callback, "❌ Эта команда доступна только администраторам")
-        return
+        return callback.answer("❌ Эта команда доступна только администраторам")
     
     # Сразу отвечаем на callback, чтобы не было таймаута
     await _safe_callback_answer(callback)
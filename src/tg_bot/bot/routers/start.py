@@ -1,3 +1,4 @@
+import asyncio
 import logging
 
 from aiogram import Router
@@ -9,7 +10,7 @@ from tg_bot.services.user_service import UserService
 from tg_bot.services.support_topics_service import SupportTopicsService
 from tg_bot.api_client.orders import OrdersApi
 from tg_bot.api_client.users import UsersApi
-from tg_bot.api_client.models import RegisterUserRequest
+from tg_bot.api_client.models import RegisterUserRequest, UserProfile
 from tg_bot.config import Settings
 
 logger = logging.getLogger(__name__)
@@ -17,68 +18,64 @@ logger = logging.getLogger(__name__)
 router = Router()
 
 
+async def _profile_photo_url(message: Message) -> str | None:
+    """file_id самого большого фото профиля отправителя или None, если фото нет."""
+    photos = await message.bot.get_user_profile_photos(message.from_user.id, limit=1)
+    if photos.total_count > 0 and photos.photos:
+        return photos.photos[0][-1].file_id
+    return None
+
+
 @router.message(CommandStart())
-async def start_command(message: Message, settings: Settings, users_api: UsersApi, orders_api: OrdersApi, user_service: UserService, support_topics_service: SupportTopicsService):
+async def start_command(message: Message, settings: Settings, users_api: UsersApi, orders_api: OrdersApi, user_service: UserService, support_topics_service: SupportTopicsService, user_profile: UserProfile | None):
     if not message.from_user:
-        await message.answer("❌ <b>Ошибка</b>\n\nНе удалось определить пользователя")
-        return
+        return message.answer("❌ <b>Ошибка</b>\n\nНе удалось определить пользователя")
     
-    # Пытаемся получить существующего пользователя
-    user_profile = await users_api.get_by_telegram(message.from_user.id)
+    # Существующий пользователь уже получен UserContextMiddleware
+    reply_markup, inline_markup = main_menu_with_inline_webapp(webapp_url=str(settings.webapp_url))
 
     # Если пользователь не найден, регистрируем его
     if not user_profile:
+        # Фото профиля ждём не дольше PROFILE_PHOTO_TIMEOUT: приветствие важнее фото
+        photo_url = None
+        try:
+            photo_url = await asyncio.wait_for(_profile_photo_url(message), settings.profile_photo_timeout)
+        except Exception as e:
+            logger.debug(f"Не удалось получить фото профиля для пользователя {message.from_user.id}: {e!r}")
+
+        # Создаем запрос на регистрацию
+        register_request = RegisterUserRequest(
+            telegramId=message.from_user.id,
+            firstName=message.from_user.first_name,
+            lastName=message.from_user.last_name,
+            username=message.from_user.username,
+            languageCode=message.from_user.language_code,
+            photoUrl=photo_url,
+        )
         try:
-            # Получаем фото профиля, если доступно
-            photo_url = None
-            try:
-                photos = await message.bot.get_user_profile_photos(message.from_user.id, limit=1)
-                if photos.total_count > 0 and photos.photos:
-                    # Используем file_id самого большого фото
-                    photo_url = photos.photos[0][-1].file_id
-            except Exception as e:
-                logger.debug(f"Не удалось получить фото профиля для пользователя {message.from_user.id}: {e}")
-            
-            # Создаем запрос на регистрацию
-            register_request = RegisterUserRequest(
-                telegramId=message.from_user.id,
-                firstName=message.from_user.first_name,
-                lastName=message.from_user.last_name,
-                username=message.from_user.username,
-                languageCode=message.from_user.language_code,
-                photoUrl=photo_url,
-            )
-            
             # Регистрируем пользователя
             user_profile = await users_api.register(register_request)
             logger.info(f"Пользователь {message.from_user.id} успешно зарегистрирован")
-
-            # Создаём топик поддержки для нового пользователя
-            try:
-                await support_topics_service.get_or_create_thread(
-                    user_telegram_id=message.from_user.id,
-                    user_fullname=message.from_user.full_name,
-                )
-            except Exception as topic_err:
-                logger.warning(
-                    f"Не удалось создать топик поддержки при регистрации "
-                    f"пользователя {message.from_user.id}: {topic_err}"
-                )
         except Exception as e:
             logger.error(f"Ошибка при регистрации пользователя {message.from_user.id}: {e}", exc_info=True)
             # Продолжаем работу даже если регистрация не удалась
             text, _ = user_service.greeting_for_unknown(message.from_user.first_name)
-            reply_markup, inline_markup = main_menu_with_inline_webapp(webapp_url=str(settings.webapp_url))
             await message.answer(text, reply_markup=reply_markup)
-            await message.answer("📱 <b>Открыть приложение</b>\n\nНажмите кнопку ниже 👇", reply_markup=inline_markup)
-            return
+            return message.answer("📱 <b>Открыть приложение</b>\n\nНажмите кнопку ниже 👇", reply_markup=inline_markup)
+
+        # Приветствие не ждёт создания топика поддержки: оно выполняется после ответа
+        await support_topics_service.create_thread_later(
+            user_telegram_id=message.from_user.id,
+            user_fullname=message.from_user.full_name,
+        )
+        # Только что зарегистрированный пользователь заказов ещё не делал
+        has_orders = False
+    else:
+        # Для приветствия достаточно знать, есть ли хотя бы один заказ
+        orders = await orders_api.list_orders(user_profile.telegramId, limit=1)
+        has_orders = len(orders.items) > 0
 
-    # Получаем заказы пользователя
-    orders = await orders_api.list_orders(user_profile.telegramId)
-    has_orders = len(orders.items) > 0
     text, _ = user_service.greeting_with_orders(user_profile, has_orders)
-    
     # Используем инлайн-кнопку для webapp, чтобы гарантировать передачу initData
-    reply_markup, inline_markup = main_menu_with_inline_webapp(webapp_url=str(settings.webapp_url))
     await message.answer(text, reply_markup=reply_markup)
-    await message.answer("📱 <b>Открыть приложение</b>\n\nНажмите кнопку ниже 👇", reply_markup=inline_markup)
+    return message.answer("📱 <b>Открыть приложение</b>\n\nНажмите кнопку ниже 👇", reply_markup=inline_markup)
@@ -1,18 +1,19 @@
-from pathlib import Path
-
 from aiogram import F, Router
 from aiogram.filters import Command
-from aiogram.types import Message, FSInputFile
+from aiogram.types import Message
+
+from tg_bot.bot.media import MediaRegistry
 
 router = Router()
 
 @router.message(Command("support"))
 @router.message(F.text == "👨‍💻 Поддержка")
-async def support_entry(message: Message):
-    tg_bot_dir = Path(__file__).resolve().parents[2]
-    img_path = tg_bot_dir / "data" / "img" / "support_6x4.jpg"
-    await message.answer_photo(
-        photo=FSInputFile(img_path),
+async def support_entry(message: Message, media_registry: MediaRegistry):
+    # Картинка отправляется по file_id и загружается только при первой отправке
+    await media_registry.send_photo(
+        message.bot,
+        message.chat.id,
+        "img/support_6x4.jpg",
         caption=(
             "👨‍💻 <b>Поддержка</b>\n\n"
             "Напишите ваш вопрос — мы передадим его оператору.\n"
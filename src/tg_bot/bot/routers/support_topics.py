@@ -47,7 +47,7 @@ async def on_write_access_allowed(
     """
     Хендлер для события write_access_allowed (авторизация через Telegram Login Widget).
     
-    Создаём топик поддержки для пользователя, но не пересылаем служебное сообщение админу.
+    Создаём топик поддержки для пользователя (в фоне), но не пересылаем служебное сообщение админу.
     """
     if not message.from_user:
         return
@@ -57,16 +57,10 @@ async def on_write_access_allowed(
         f"({message.from_user.full_name})"
     )
 
-    try:
-        await support_topics_service.get_or_create_thread(
-            user_telegram_id=message.from_user.id,
-            user_fullname=message.from_user.full_name,
-        )
-    except Exception as e:
-        logger.warning(
-            f"Не удалось создать топик поддержки при write_access_allowed "
-            f"для пользователя {message.from_user.id}: {e}"
-        )
+    await support_topics_service.create_thread_later(
+        user_telegram_id=message.from_user.id,
+        user_fullname=message.from_user.full_name,
+    )
 
 
 @router.message(
@@ -0,0 +1,174 @@
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Hashable
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiogram.types.update import UpdateTypeLookupError
+
+from tg_bot.metrics import REGISTRY
+
+ACTIVE_LANES = REGISTRY.gauge("update_lanes_active", "Активные полосы обработки апдейтов (чаты)")
+LANE_SLOT_WAITS = REGISTRY.counter("update_lane_slot_waits_total", "Ожидания свободной полосы из-за лимита")
+
+# Полоса, уже занятая текущей задачей: повторный вход в неё не ждёт
+_held_lane: ContextVar[Hashable | None] = ContextVar("update_lane", default=None)
+
+
+class _Lane:
+    __slots__ = ("lock", "users")
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class KeyedLanes:
+    """
+    FIFO-полосы выполнения по ключу.
+
+    Задачи с одним ключом выполняются строго по очереди в порядке входа,
+    задачи с разными ключами — параллельно. Число одновременно существующих
+    полос ограничено `max_lanes`; полоса удаляется, как только в ней не
+    остаётся ни выполняющихся, ни ожидающих задач.
+    """
+
+    def __init__(self, *, max_lanes: int):
+        self.max_lanes = max_lanes
+        self._lanes: dict[Hashable, _Lane] = {}
+        self._slot_waiters: deque[asyncio.Future[None]] = deque()
+
+    def lane(self, key: Hashable) -> "_LaneGuard":
+        """Асинхронный контекстный менеджер: вход — очередь полосы `key`, выход — её освобождение."""
+        return _LaneGuard(self, key)
+
+    def __len__(self) -> int:
+        return len(self._lanes)
+
+    async def _join(self, key: Hashable) -> _Lane:
+        lane = self._lanes.get(key)
+        if lane is None and len(self._lanes) >= self.max_lanes:
+            LANE_SLOT_WAITS.inc()
+            while lane is None and len(self._lanes) >= self.max_lanes:
+                waiter = asyncio.get_running_loop().create_future()
+                self._slot_waiters.append(waiter)
+                try:
+                    await waiter
+                except asyncio.CancelledError:
+                    # Слот мог быть передан нам — отдаём его следующему
+                    if waiter.done() and not waiter.cancelled():
+                        self._wake_next()
+                    raise
+                lane = self._lanes.get(key)
+                if lane is not None:
+                    # Полосу уже создал предыдущий апдейт этого чата — слот не нужен
+                    self._wake_next()
+        if lane is None:
+            lane = _Lane()
+            self._lanes[key] = lane
+            ACTIVE_LANES.set(len(self._lanes))
+        lane.users += 1
+        return lane
+
+    def _leave(self, key: Hashable, lane: _Lane) -> None:
+        lane.users -= 1
+        if lane.users == 0:
+            del self._lanes[key]
+            ACTIVE_LANES.set(len(self._lanes))
+            self._wake_next()
+
+    def _wake_next(self) -> None:
+        while self._slot_waiters:
+            waiter = self._slot_waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+
+class _LaneGuard:
+    __slots__ = ("_lanes", "_key", "_lane")
+
+    def __init__(self, lanes: KeyedLanes, key: Hashable):
+        self._lanes = lanes
+        self._key = key
+        self._lane: _Lane | None = None
+
+    async def __aenter__(self) -> None:
+        lane = await self._lanes._join(self._key)
+        try:
+            await lane.lock.acquire()
+        except BaseException:
+            self._lanes._leave(self._key, lane)
+            raise
+        self._lane = lane
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        lane = self._lane
+        lane.lock.release()
+        self._lanes._leave(self._key, lane)
+
+
+def update_lane_key(update: Update) -> Hashable | None:
+    """
+    Ключ упорядочивания апдейта: чат для сообщений, пользователь для callback.
+
+    В личных чатах chat.id совпадает с user.id, поэтому сообщения и нажатия
+    кнопок одного пользователя попадают в одну полосу. В форуме (админский
+    чат поддержки) у каждого топика своя полоса: переписка с одним
+    пользователем не задерживает остальные топики.
+    """
+    if update.callback_query is not None:
+        return update.callback_query.from_user.id
+    try:
+        event = update.event
+    except UpdateTypeLookupError:
+        return None
+    chat = getattr(event, "chat", None)
+    if chat is not None:
+        thread_id = getattr(event, "message_thread_id", None)
+        if chat.is_forum and thread_id is not None:
+            return chat.id, thread_id
+        return chat.id
+    user = getattr(event, "from_user", None)
+    if user is not None:
+        return user.id
+    return None
+
+
+class OrderedDispatcher(Dispatcher):
+    """
+    Dispatcher, сериализующий апдейты одного чата.
+
+    Упорядочивание встроено в `feed_update`, поэтому работает одинаково в
+    webhook- и polling-режимах и выполняется до FSM-мидлварей: состояние
+    читается уже после завершения предыдущего апдейта того же чата.
+    """
+
+    def __init__(self, *, max_lanes: int = 1000, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.lanes = KeyedLanes(max_lanes=max_lanes)
+
+    @asynccontextmanager
+    async def lane(self, update: Update) -> AsyncIterator[None]:
+        """
+        Дождаться очереди апдейта в полосе его чата.
+
+        UpdateQueue занимает полосу до начала отсчёта дедлайна обработки;
+        вложенный `feed_update` в той же задаче полосу повторно не ждёт.
+        """
+        key = update_lane_key(update)
+        if key is None or _held_lane.get() == key:
+            yield
+            return
+        async with self.lanes.lane(key):
+            token = _held_lane.set(key)
+            try:
+                yield
+            finally:
+                _held_lane.reset(token)
+
+    async def feed_update(self, bot: Bot, update: Update, **kwargs: Any) -> Any:
+        async with self.lane(update):
+            return await super().feed_update(bot, update, **kwargs)
@@ -0,0 +1,322 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import IO, Any, Awaitable, Callable
+
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+
+from tg_bot.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+SIDE_EFFECTS = REGISTRY.counter(
+    "bot_side_effects_total",
+    "Фоновые действия хендлеров после ответа пользователю",
+    ["name", "status"],
+)
+SIDE_EFFECTS_PENDING = REGISTRY.gauge("bot_side_effects_pending", "Фоновые действия, ожидающие выполнения")
+SIDE_EFFECTS_DEAD = REGISTRY.gauge("bot_side_effects_dead", "Фоновые действия в dead-letter")
+
+JobHandler = Callable[[dict[str, Any]], Awaitable[object]]
+
+# Ошибки, которые не исправит повтор: Telegram отклонил запрос (400) или пользователь заблокировал бота (403)
+PERMANENT_ERRORS: tuple[type[Exception], ...] = (TelegramBadRequest, TelegramForbiddenError)
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    payload: dict[str, Any]
+    # Действия с одним ключом выполняются строго по очереди (например, сообщения одного пользователя)
+    key: str | None = None
+    attempt: int = 0
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+
+
+class SideEffectQueue:
+    """
+    Очередь фоновых действий хендлеров, не влияющих на ответ пользователю
+    (топик поддержки, уведомления админов, пересылка сообщений).
+
+    Действие — тип (`kind`) и JSON-данные; обработчик типа регистрируется
+    через `register`. Хендлер только ставит действие в очередь, выполняет
+    его пул воркеров. При ошибке действие повторяется с экспоненциальной
+    задержкой, после `max_attempts` попыток (или сразу при ошибке из
+    PERMANENT_ERRORS) оно попадает в dead-letter.
+
+    При заданном `journal_path` постановка, повторы и завершение действий
+    дописываются в JSONL-журнал: после рестарта незавершённые действия
+    выполняются снова, dead-letter сохраняется. Журнал периодически
+    сжимается до незавершённых действий.
+    """
+
+    def __init__(
+        self,
+        *,
+        maxsize: int,
+        workers: int,
+        journal_path: str | None = None,
+        max_attempts: int = 8,
+        retry_base_delay: float = 1.0,
+        retry_max_delay: float = 300.0,
+        max_dead: int = 1000,
+        compact_every: int = 1000,
+    ):
+        self.maxsize = maxsize
+        self.workers = workers
+        self.journal_path = Path(journal_path) if journal_path else None
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.max_dead = max_dead
+        self.compact_every = compact_every
+        self._handlers: dict[str, JobHandler] = {}
+        self._queue: asyncio.Queue[Job] = asyncio.Queue()
+        # Все незавершённые действия: в очереди, выполняются, ждут повтора или своей очереди по ключу
+        self._pending: dict[str, Job] = {}
+        self._lanes: dict[str, deque[Job]] = {}
+        self._dead: dict[str, Job] = {}
+        self._tasks: list[asyncio.Task] = []
+        self._retries: set[asyncio.Task] = set()
+        self._journal: IO[str] | None = None
+        self._journal_records = 0
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        self._handlers[kind] = handler
+
+    def enqueue(self, kind: str, payload: dict[str, Any], *, key: str | None = None) -> bool:
+        """Поставить действие в очередь. Возвращает False, если очередь заполнена."""
+        if len(self._pending) >= self.maxsize:
+            SIDE_EFFECTS.inc(name=kind, status="dropped")
+            logger.warning(f"Очередь фоновых действий переполнена, действие {kind} отброшено")
+            return False
+        job = Job(id=uuid.uuid4().hex, kind=kind, payload=payload, key=key)
+        # Состояние меняется до записи в журнал: сжатие журнала внутри записи должно видеть действие
+        self._pending[job.id] = job
+        try:
+            self._write({"op": "add", **asdict(job)})
+        except TypeError:
+            # Данные действия не сериализуются в JSON — ошибка в вызывающем коде
+            del self._pending[job.id]
+            raise
+        self._schedule(job)
+        return True
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"side-effect-worker-{index}")
+            for index in range(self.workers)
+        ]
+
+    async def stop(self, drain_timeout: float = 10.0) -> None:
+        """
+        Дождаться выполнения действий из очереди (не дольше drain_timeout) и
+        остановить воркеры. Невыполненные действия остаются в журнале.
+        """
+        if self._tasks:
+            try:
+                async with asyncio.timeout(drain_timeout):
+                    await self._queue.join()
+            except asyncio.TimeoutError:
+                logger.warning(f"Не дождались выполнения {self._queue.qsize()} фоновых действий при остановке")
+        for task in [*self._tasks, *self._retries]:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._retries, return_exceptions=True)
+        self._tasks = []
+        # Сжатие закрывает файл журнала; следующая запись откроет его снова
+        self._compact()
+
+    def dead_letters(self) -> list[Job]:
+        return list(self._dead.values())
+
+    def retry_dead(self, job_id: str) -> bool:
+        """Вернуть действие из dead-letter в очередь с обнулённым счётчиком попыток."""
+        job = self._dead.pop(job_id, None)
+        if job is None:
+            return False
+        job.attempt = 0
+        job.error = None
+        self._pending[job.id] = job
+        self._write({"op": "revive", "id": job_id})
+        self._schedule(job)
+        SIDE_EFFECTS_DEAD.set(len(self._dead))
+        return True
+
+    def discard_dead(self, job_id: str) -> bool:
+        if self._dead.pop(job_id, None) is None:
+            return False
+        self._write({"op": "discard", "id": job_id})
+        SIDE_EFFECTS_DEAD.set(len(self._dead))
+        return True
+
+    def load(self) -> None:
+        """Восстановить незавершённые действия и dead-letter из журнала."""
+        if not self.journal_path or not self.journal_path.exists():
+            return
+        jobs: dict[str, Job] = {}
+        try:
+            with self.journal_path.open(encoding="utf-8") as journal:
+                for line in journal:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Оборванная при падении последняя строка
+                        logger.warning(f"Пропущена повреждённая запись журнала {self.journal_path}")
+                        continue
+                    self._replay(record, jobs)
+        except OSError as e:
+            logger.warning(f"Не удалось загрузить журнал фоновых действий из {self.journal_path}: {e}")
+            return
+        for job in jobs.values():
+            self._pending[job.id] = job
+            self._schedule(job)
+        SIDE_EFFECTS_DEAD.set(len(self._dead))
+        self._compact()
+        logger.info(
+            f"Из журнала {self.journal_path} восстановлено фоновых действий: {len(jobs)}, "
+            f"в dead-letter: {len(self._dead)}"
+        )
+
+    def _replay(self, record: dict[str, Any], jobs: dict[str, Job]) -> None:
+        op = record.pop("op", None)
+        if op == "add":
+            jobs[record["id"]] = Job(**record)
+        elif op == "retry" and record["id"] in jobs:
+            jobs[record["id"]].attempt = record["attempt"]
+            jobs[record["id"]].error = record["error"]
+        elif op == "done":
+            jobs.pop(record["id"], None)
+        elif op == "dead" and record["id"] in jobs:
+            job = jobs.pop(record["id"])
+            job.attempt = record["attempt"]
+            job.error = record["error"]
+            self._dead[job.id] = job
+        elif op == "revive" and record["id"] in self._dead:
+            job = self._dead.pop(record["id"])
+            job.attempt = 0
+            job.error = None
+            jobs[job.id] = job
+        elif op == "discard":
+            self._dead.pop(record["id"], None)
+
+    def _schedule(self, job: Job) -> None:
+        if job.key is not None:
+            lane = self._lanes.get(job.key)
+            if lane is not None:
+                # Ключ занят: действие дождётся завершения предыдущих
+                lane.append(job)
+                SIDE_EFFECTS_PENDING.set(len(self._pending))
+                return
+            self._lanes[job.key] = deque()
+        self._queue.put_nowait(job)
+        SIDE_EFFECTS_PENDING.set(len(self._pending))
+
+    def _finish(self, job: Job) -> None:
+        self._pending.pop(job.id, None)
+        SIDE_EFFECTS_PENDING.set(len(self._pending))
+        if job.key is None:
+            return
+        lane = self._lanes.get(job.key)
+        if lane:
+            self._queue.put_nowait(lane.popleft())
+        else:
+            self._lanes.pop(job.key, None)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        handler = self._handlers.get(job.kind)
+        try:
+            if handler is None:
+                raise LookupError(f"нет обработчика для действия {job.kind}")
+            await handler(job.payload)
+        except Exception as e:
+            job.attempt += 1
+            job.error = f"{type(e).__name__}: {e}"
+            if handler is None or isinstance(e, PERMANENT_ERRORS) or job.attempt >= self.max_attempts:
+                self._bury(job)
+                return
+            delay = min(self.retry_base_delay * 2 ** (job.attempt - 1), self.retry_max_delay)
+            delay *= random.uniform(0.5, 1.0)
+            self._write({"op": "retry", "id": job.id, "attempt": job.attempt, "error": job.error})
+            SIDE_EFFECTS.inc(name=job.kind, status="retry")
+            logger.warning(
+                f"Фоновое действие {job.kind} (попытка {job.attempt}) завершилось ошибкой, "
+                f"повтор через {delay:.1f} с: {job.error}"
+            )
+            retry = asyncio.create_task(self._retry_later(job, delay))
+            self._retries.add(retry)
+            retry.add_done_callback(self._retries.discard)
+            return
+        self._finish(job)
+        self._write({"op": "done", "id": job.id})
+        SIDE_EFFECTS.inc(name=job.kind, status="ok")
+
+    async def _retry_later(self, job: Job, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._queue.put_nowait(job)
+
+    def _bury(self, job: Job) -> None:
+        self._finish(job)
+        self._dead[job.id] = job
+        self._write({"op": "dead", "id": job.id, "attempt": job.attempt, "error": job.error})
+        SIDE_EFFECTS.inc(name=job.kind, status="dead")
+        logger.error(f"Фоновое действие {job.kind} id={job.id} перемещено в dead-letter: {job.error}")
+        while len(self._dead) > self.max_dead:
+            self.discard_dead(next(iter(self._dead)))
+        SIDE_EFFECTS_DEAD.set(len(self._dead))
+
+    def _write(self, record: dict[str, Any]) -> None:
+        if not self.journal_path:
+            return
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        try:
+            if self._journal is None:
+                self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+                self._journal = self.journal_path.open("a", encoding="utf-8")
+            self._journal.write(line)
+            self._journal.flush()
+        except OSError as e:
+            logger.warning(f"Не удалось записать журнал фоновых действий {self.journal_path}: {e}")
+            return
+        self._journal_records += 1
+        if self._journal_records >= self.compact_every + len(self._pending) + len(self._dead):
+            self._compact()
+
+    def _compact(self) -> None:
+        """Переписать журнал: только незавершённые действия и dead-letter."""
+        if not self.journal_path:
+            return
+        records = [{"op": "add", **asdict(job)} for job in self._pending.values()]
+        for job in self._dead.values():
+            records.append({"op": "add", **asdict(job)})
+            records.append({"op": "dead", "id": job.id, "attempt": job.attempt, "error": job.error})
+        tmp_path = self.journal_path.with_suffix(self.journal_path.suffix + ".tmp")
+        try:
+            self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            os.replace(tmp_path, self.journal_path)
+        except OSError as e:
+            logger.warning(f"Не удалось сжать журнал фоновых действий {self.journal_path}: {e}")
+            return
+        self._journal_records = len(records)
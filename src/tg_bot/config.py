@@ -16,6 +16,15 @@ class Settings(BaseSettings):
     webhook_base_url: HttpUrl = "http://localhost:8000"
 
     proxy_url: str | None = None
+
+    # Лимиты исходящих сообщений в Telegram
+    telegram_global_rate: float = 30.0
+    telegram_private_chat_rate: float = 1.0
+    telegram_private_chat_burst: int = 3
+    telegram_group_rate_per_minute: float = 20.0
+    telegram_group_burst: int = 5
+    telegram_admin_chat_rate_per_minute: float = 20.0
+    telegram_admin_chat_burst: int = 5
     use_polling: bool = False
 
     host: str = "0.0.0.0"
@@ -23,6 +32,90 @@ class Settings(BaseSettings):
     log_level: str = "INFO"
 
     webhook_path: str = "/telegram/webhook"
+    # Очередь апдейтов вебхука: размер и число воркеров
+    webhook_queue_size: int = 1000
+    webhook_workers: int = 32
+    # Возвращать первый метод Bot API прямо в ответе на вебхук, если апдейт обработан
+    # за webhook_reply_timeout секунд (иначе ответ отправляется отдельным запросом)
+    webhook_reply_in_response: bool = False
+    webhook_reply_timeout: float = 0.1
+    # Число воркер-процессов: больше 1 — фронт-процесс раздаёт апдейты по процессам по chat_id
+    webhook_processes: int = 1
+    # Максимум чатов, апдейты которых обрабатываются одновременно (апдейты одного чата — по очереди)
+    update_lanes_max: int = 1000
+    # Окно последних update_id для отбрасывания повторных доставок; файл — чтобы пережить рестарт
+    dedup_window: int = 10000
+    dedup_state_path: str | None = None
+
+    # Хранилище FSM: memory (теряется при рестарте) или sqlite (файл в режиме WAL);
+    # брошенные сценарии удаляются через fsm_state_ttl секунд без обращений
+    fsm_storage: str = "memory"
+    fsm_storage_path: str = "state/fsm.sqlite3"
+    fsm_state_ttl: float = 86400.0
+
+    # file_id статичных изображений (tg_bot/data): файл реестра и предзагрузка в админский чат при старте
+    media_state_path: str | None = "state/media_file_ids.json"
+    media_warm_up: bool = True
+
+    # Пул HTTP-соединений к LeafFlow API (общий для всех клиентов)
+    api_max_connections: int = 100
+    api_max_keepalive_connections: int = 20
+    api_keepalive_expiry: float = 30.0
+    api_http2: bool = False
+    # Circuit breaker по эндпоинтам LeafFlow API: открывается, если за api_breaker_window секунд было не меньше
+    # api_breaker_min_requests запросов и доля ошибок (сеть, таймауты, 5xx) достигла api_breaker_failure_rate;
+    # через api_breaker_open_timeout секунд пропускается пробный запрос
+    api_breaker_window: float = 30.0
+    api_breaker_min_requests: int = 10
+    api_breaker_failure_rate: float = 0.5
+    api_breaker_open_timeout: float = 15.0
+    # Bulkhead: одновременные запросы к одному эндпоинту и сколько ждать свободного места (секунды)
+    api_endpoint_max_concurrency: int = 20
+    api_endpoint_queue_timeout: float = 1.0
+    # Одинаковые одновременные GET к API выполняются одним запросом; ответы GET дополнительно
+    # кэшируются на api_get_cache_ttl секунд (по умолчанию 0 — без кэша), изменяющий запрос клиента сбрасывает кэш
+    api_get_coalescing: bool = True
+    api_get_cache_ttl: float = 0.0
+    api_get_cache_size: int = 1000
+
+    # Кэш профилей пользователей (секунды / количество записей)
+    user_cache_size: int = 10000
+    user_cache_ttl: float = 300.0
+    user_cache_negative_ttl: float = 30.0
+
+    # Кэш связей пользователь <-> топик поддержки
+    support_topics_cache_size: int = 50000
+    support_topics_cache_ttl: float = 3600.0
+    # Окно сбора альбома (секунды): фото одного media_group_id пересылаются одним copy_messages
+    media_group_window: float = 0.5
+
+    # Сколько /start нового пользователя ждёт фото профиля для регистрации (секунды); не дождались — регистрируем без фото
+    profile_photo_timeout: float = 1.0
+
+    # Фоновые действия хендлеров после ответа пользователю (топик поддержки, уведомления, пересылка):
+    # журнал для восстановления после рестарта, повторы с экспоненциальной задержкой, затем dead-letter
+    side_effects_queue_size: int = 1000
+    side_effects_workers: int = 4
+    side_effects_journal_path: str | None = "state/side_effects.jsonl"
+    side_effects_max_attempts: int = 8
+    side_effects_retry_base_delay: float = 1.0
+    side_effects_retry_max_delay: float = 300.0
+
+    # События заказов от backend (POST /internal/order-events): окно объединения событий одного заказа, секунды
+    order_events_window: float = 3.0
+
+    # Рассылки покупателям (/broadcast в админском чате): темп в сообщениях в секунду (ниже telegram_global_rate,
+    # чтобы оставался запас для ответов пользователям), параллельные отправки, размер страницы получателей,
+    # файл прогресса для продолжения после рестарта и период обновления отчёта (секунды)
+    broadcast_rate: float = 20.0
+    broadcast_workers: int = 10
+    broadcast_page_size: int = 500
+    broadcast_state_path: str | None = "state/broadcast.json"
+    broadcast_report_interval: float = 15.0
+
+    # Кэш загруженных страниц «Мои заказы» на пользователя (секунды / количество пользователей)
+    orders_page_cache_size: int = 10000
+    orders_page_cache_ttl: float = 60.0
 
     @computed_field
     @property
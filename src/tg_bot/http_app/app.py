@@ -1,13 +1,29 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from aiogram import Bot, Dispatcher
 
 from tg_bot.config import Settings
-from tg_bot.http_app import telegram_webhook, health
+from tg_bot.http_app import telegram_webhook, internal_api, health, metrics
+from tg_bot.http_app.sharding import ShardRouter
+from tg_bot.http_app.update_queue import UpdateQueue
 
 
-def create_app(settings: Settings, bot: Bot, dispatcher: Dispatcher) -> FastAPI:
-    app = FastAPI(title="LeafFlow Telegram Bot")
+@asynccontextmanager
+async def _lifespan(app: FastAPI) -> AsyncIterator[None]:
+    await app.state.update_queue.start()
+    try:
+        yield
+    finally:
+        await app.state.update_queue.stop()
+        if app.state.update_deduplicator is not None:
+            app.state.update_deduplicator.save()
+
+
+def _create_base_app(settings: Settings) -> FastAPI:
+    app = FastAPI(title="LeafFlow Telegram Bot", lifespan=_lifespan)
 
     app.add_middleware(
         CORSMiddleware,
@@ -17,10 +33,42 @@ def create_app(settings: Settings, bot: Bot, dispatcher: Dispatcher) -> FastAPI:
     )
 
     app.state.settings = settings
+    app.include_router(telegram_webhook.router, prefix="", tags=["telegram"])
+    app.include_router(internal_api.router, tags=["internal"])
+    app.include_router(health.router, tags=["health"])
+    app.include_router(metrics.router, tags=["metrics"])
+    return app
+
+
+def create_app(settings: Settings, bot: Bot, dispatcher: Dispatcher) -> FastAPI:
+    app = _create_base_app(settings)
     app.state.bot = bot
     app.state.dispatcher = dispatcher
+    app.state.update_deduplicator = dispatcher["update_deduplicator"]
+    app.state.side_effects = dispatcher["side_effects"]
+    app.state.order_events = dispatcher["order_events"]
+    app.state.shard_router = None
+    app.state.api_guards = dispatcher["api_guards"]
+    app.state.update_queue = UpdateQueue(
+        dispatcher=dispatcher,
+        bot=bot,
+        maxsize=settings.webhook_queue_size,
+        workers=settings.webhook_workers,
+        deduplicator=app.state.update_deduplicator,
+    )
+
+    return app
 
-    app.include_router(telegram_webhook.router, prefix="", tags=["telegram"])
-    app.include_router(health.router, tags=["health"])
 
+def create_shard_front_app(settings: Settings, shard_router: ShardRouter) -> FastAPI:
+    """Фронт-процесс: принимает вебхук и раздаёт апдейты воркер-процессам по chat_id."""
+    app = _create_base_app(settings)
+    # Вебхук работает с роутером так же, как с локальной очередью
+    app.state.update_queue = shard_router
+    app.state.update_deduplicator = None
+    app.state.side_effects = None
+    app.state.order_events = None
+    # События заказов передаются воркер-процессам покупателей
+    app.state.shard_router = shard_router
+    app.state.api_guards = None
     return app
@@ -1,8 +1,22 @@
-from fastapi import APIRouter
+from typing import Any
+
+from fastapi import APIRouter, Request
+
+from tg_bot.api_client.breaker import CLOSED, EndpointGuards
 
 router = APIRouter()
 
 
 @router.get("/health")
-async def health() -> dict[str, str]:
-    return {"status": "ok"}
+async def health(request: Request) -> dict[str, Any]:
+    """
+    Процесс жив (всегда 200). Если circuit breaker какого-то эндпоинта
+    LeafFlow API не закрыт, статус — degraded, а в `backend` перечислены
+    такие эндпоинты и их состояние.
+    """
+    guards: EndpointGuards | None = request.app.state.api_guards
+    if guards is None:
+        # Фронт-процесс (WEBHOOK_PROCESSES > 1) сам не обращается к LeafFlow API
+        return {"status": "ok"}
+    degraded = {endpoint: state for endpoint, state in guards.states().items() if state != CLOSED}
+    return {"status": "degraded" if degraded else "ok", "backend": degraded}
@@ -0,0 +1,79 @@
+import hmac
+from dataclasses import asdict
+from typing import Any
+
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import TypeAdapter, ValidationError
+
+from tg_bot.api_client.models import OrderEvent
+from tg_bot.bot.side_effects import SideEffectQueue
+from tg_bot.http_app.sharding import ShardRouter
+from tg_bot.services.order_events import OrderEventsService
+
+router = APIRouter(prefix="/internal")
+
+# Одно событие или массив событий
+_ORDER_EVENTS = TypeAdapter(OrderEvent | list[OrderEvent])
+
+
+def _verify_token(request: Request) -> None:
+    """Внутренний API доступен backend с тем же токеном, что бот использует для LeafFlow API."""
+    expected = f"Bearer {request.app.state.settings.internal_token}"
+    if not hmac.compare_digest(request.headers.get("Authorization", ""), expected):
+        raise HTTPException(status_code=401, detail="invalid token")
+
+
+def _side_effects(request: Request) -> SideEffectQueue:
+    side_effects: SideEffectQueue | None = request.app.state.side_effects
+    if side_effects is None:
+        # Фронт-процесс (WEBHOOK_PROCESSES > 1): действия выполняются в воркер-процессах
+        raise HTTPException(status_code=503, detail="side effects are handled by worker processes")
+    return side_effects
+
+
+@router.post("/order-events", status_code=202)
+async def push_order_events(request: Request) -> dict[str, Any]:
+    """
+    События заказов от backend (создание, смена статуса).
+
+    Уведомления админу и покупателю отправляются в фоне; события одного
+    заказа за ORDER_EVENTS_WINDOW секунд объединяются в одно сообщение.
+    """
+    _verify_token(request)
+    try:
+        parsed = _ORDER_EVENTS.validate_json(await request.body())
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+    events = parsed if isinstance(parsed, list) else [parsed]
+    shard_router: ShardRouter | None = request.app.state.shard_router
+    if shard_router is not None:
+        # Фронт-процесс (WEBHOOK_PROCESSES > 1): уведомления отправляет воркер-процесс покупателя
+        if not shard_router.submit_order_events(events):
+            raise HTTPException(status_code=503, detail="worker process is unavailable")
+    else:
+        order_events: OrderEventsService = request.app.state.order_events
+        order_events.submit(events)
+    return {"status": "accepted", "events": len(events)}
+
+
+@router.get("/side-effects/dead")
+async def list_dead_letters(request: Request) -> dict[str, Any]:
+    """Фоновые действия, исчерпавшие попытки: тип, данные, число попыток и последняя ошибка."""
+    _verify_token(request)
+    return {"items": [asdict(job) for job in _side_effects(request).dead_letters()]}
+
+
+@router.post("/side-effects/dead/{job_id}/retry")
+async def retry_dead_letter(job_id: str, request: Request) -> dict[str, str]:
+    _verify_token(request)
+    if not _side_effects(request).retry_dead(job_id):
+        raise HTTPException(status_code=404, detail="job not found")
+    return {"status": "queued"}
+
+
+@router.delete("/side-effects/dead/{job_id}")
+async def discard_dead_letter(job_id: str, request: Request) -> dict[str, str]:
+    _verify_token(request)
+    if not _side_effects(request).discard_dead(job_id):
+        raise HTTPException(status_code=404, detail="job not found")
+    return {"status": "discarded"}
@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Response
+
+from tg_bot.metrics import REGISTRY
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def metrics() -> Response:
+    """Метрики процесса в текстовом формате Prometheus."""
+    return Response(content=REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,257 @@
+import asyncio
+import json
+import logging
+import os
+import struct
+from typing import Any
+
+from pydantic import TypeAdapter, ValidationError
+
+from tg_bot.api_client.models import OrderEvent
+from tg_bot.config import Settings
+from tg_bot.http_app.update_queue import UpdateQueue
+from tg_bot.metrics import REGISTRY
+from tg_bot.services.order_events import OrderEventsService
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson необязателен (extra `speedups`)
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Кадр IPC: тип (1 байт), длина тела (4 байта, big-endian) и тело —
+# сырой апдейт от Telegram или JSON-массив событий заказов
+FRAME_HEADER = struct.Struct("!BI")
+FRAME_UPDATE = 0
+FRAME_ORDER_EVENTS = 1
+
+SHARD_UPDATES = REGISTRY.counter("shard_updates_total", "Апдейты, переданные воркер-процессам", ["shard"])
+SHARD_ORDER_EVENTS = REGISTRY.counter(
+    "shard_order_events_total",
+    "События заказов, переданные воркер-процессам",
+    ["shard"],
+)
+SHARD_REJECTED = REGISTRY.counter(
+    "shard_updates_rejected_total",
+    "Апдейты и события заказов, отклонённые фронт-процессом (воркер недоступен или перегружен)",
+    ["shard", "reason"],
+)
+
+_loads = orjson.loads if orjson is not None else json.loads
+_ORDER_EVENT_LIST = TypeAdapter(list[OrderEvent])
+
+
+def shard_key(update: dict[str, Any]) -> int | None:
+    """
+    Ключ шардирования апдейта: id чата, а для callback — чата сообщения с кнопкой.
+
+    Так апдейты одного чата (и его состояние FSM) всегда попадают в один
+    процесс, включая нажатия кнопок в админском чате. Апдейты без чата
+    шардируются по id пользователя.
+    """
+    for field, event in update.items():
+        if not isinstance(event, dict):
+            continue
+        message = event.get("message") if field == "callback_query" else event
+        chat = message.get("chat") if isinstance(message, dict) else None
+        if chat:
+            return chat["id"]
+        user = event.get("from") or event.get("user")
+        if user:
+            return user["id"]
+    return None
+
+
+def shard_settings(settings: Settings, index: int, processes: int) -> Settings:
+    """
+    Настройки воркер-процесса: общие лимиты Telegram делятся между процессами.
+
+    Лимиты бота и админского чата общие для всех процессов (в админский чат
+    пишет каждый), поэтому каждому достаётся 1/N. Файлы дедупликации,
+    журнала фоновых действий и прогресса рассылки свои у каждого процесса:
+    повторная доставка апдейта (и команды админского чата) попадает в тот же шард.
+    Реестр file_id тоже свой: процессы не перезаписывают файл друг друга.
+    """
+    update: dict[str, Any] = {
+        "telegram_global_rate": settings.telegram_global_rate / processes,
+        "telegram_admin_chat_rate_per_minute": settings.telegram_admin_chat_rate_per_minute / processes,
+        # Рассылка идёт в процессе админского чата и не должна занимать всю его долю общего лимита
+        "broadcast_rate": settings.broadcast_rate / processes,
+    }
+    if settings.dedup_state_path:
+        update["dedup_state_path"] = f"{settings.dedup_state_path}.{index}"
+    if settings.side_effects_journal_path:
+        update["side_effects_journal_path"] = f"{settings.side_effects_journal_path}.{index}"
+    if settings.broadcast_state_path:
+        update["broadcast_state_path"] = f"{settings.broadcast_state_path}.{index}"
+    if settings.media_state_path:
+        update["media_state_path"] = f"{settings.media_state_path}.{index}"
+    return settings.model_copy(update=update)
+
+
+class ShardRouter:
+    """
+    Маршрутизатор апдейтов фронт-процесса по воркер-процессам.
+
+    Апдейт отправляется в Unix-сокет воркера `hash(chat_id) % N`. Интерфейс
+    совпадает с UpdateQueue (`submit`/`start`/`stop`), поэтому вебхук
+    работает с ним без изменений: если воркер недоступен или его буфер
+    переполнен, `submit` возвращает False и Telegram получает 503.
+
+    События заказов от backend (`submit_order_events`) уходят воркеру
+    покупателя — `userTelegramId % N`, того же процесса, что обрабатывает
+    его личный чат и создаёт его топик поддержки.
+    """
+
+    def __init__(
+        self,
+        *,
+        socket_paths: list[str],
+        max_buffer: int = 4 * 1024 * 1024,
+        connect_timeout: float = 30.0,
+    ):
+        self.socket_paths = socket_paths
+        self.max_buffer = max_buffer
+        self.connect_timeout = connect_timeout
+        self._writers: list[asyncio.StreamWriter | None] = [None] * len(socket_paths)
+        self._connecting: dict[int, asyncio.Task] = {}
+
+    def submit(self, raw_update: bytes, reply: asyncio.Future | None = None) -> bool:
+        # Ответ в теле вебхука требует обработки в этом же процессе — здесь только подтверждение
+        if reply is not None and not reply.done():
+            reply.set_result(None)
+        try:
+            key = shard_key(_loads(raw_update))
+        except (ValueError, TypeError, KeyError, AttributeError):
+            # Некорректный апдейт отклонит валидация в воркере
+            key = None
+        index = (key or 0) % len(self._writers)
+        if not self._writable(index):
+            return False
+        self._write(index, FRAME_UPDATE, raw_update)
+        SHARD_UPDATES.inc(shard=str(index))
+        return True
+
+    def submit_order_events(self, events: list[OrderEvent]) -> bool:
+        """
+        Передать события заказов воркерам их покупателей.
+
+        Возвращает False (backend повторит запрос), если недоступен хотя бы
+        один из нужных воркеров; тогда не отправляется ни одно событие, и
+        повтор не продублирует уведомления.
+        """
+        shards: dict[int, list[OrderEvent]] = {}
+        for event in events:
+            shards.setdefault(event.userTelegramId % len(self._writers), []).append(event)
+        if not all([self._writable(index) for index in shards]):
+            return False
+        for index, shard_events in shards.items():
+            self._write(index, FRAME_ORDER_EVENTS, _ORDER_EVENT_LIST.dump_json(shard_events))
+            SHARD_ORDER_EVENTS.inc(len(shard_events), shard=str(index))
+        return True
+
+    async def start(self) -> None:
+        await asyncio.gather(*(self._connect(index) for index in range(len(self.socket_paths))))
+        logger.info(f"Подключено воркер-процессов: {len(self.socket_paths)}")
+
+    async def stop(self, drain_timeout: float = 10.0) -> None:
+        """Дописать отправленные апдейты в сокеты воркеров и закрыть соединения."""
+        for task in self._connecting.values():
+            task.cancel()
+        writers = [writer for writer in self._writers if writer is not None]
+        try:
+            async with asyncio.timeout(drain_timeout):
+                for writer in writers:
+                    await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            logger.warning("Не удалось передать воркерам все апдейты при остановке")
+        for writer in writers:
+            writer.close()
+        self._writers = [None] * len(self.socket_paths)
+
+    def qsize(self) -> int:
+        return sum(
+            writer.transport.get_write_buffer_size()
+            for writer in self._writers
+            if writer is not None and not writer.is_closing()
+        )
+
+    def _writable(self, index: int) -> bool:
+        writer = self._writers[index]
+        if writer is None or writer.is_closing():
+            SHARD_REJECTED.inc(shard=str(index), reason="unavailable")
+            self._reconnect(index)
+            return False
+        # Воркер не успевает читать — не копим апдейты в памяти фронта
+        if writer.transport.get_write_buffer_size() > self.max_buffer:
+            SHARD_REJECTED.inc(shard=str(index), reason="backlog")
+            return False
+        return True
+
+    def _write(self, index: int, kind: int, body: bytes) -> None:
+        self._writers[index].write(FRAME_HEADER.pack(kind, len(body)) + body)
+
+    def _reconnect(self, index: int) -> None:
+        if index not in self._connecting:
+            task = asyncio.create_task(self._connect(index))
+            self._connecting[index] = task
+            task.add_done_callback(lambda _: self._connecting.pop(index, None))
+
+    async def _connect(self, index: int) -> None:
+        path = self.socket_paths[index]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.connect_timeout
+        while True:
+            try:
+                _, writer = await asyncio.open_unix_connection(path)
+            except (FileNotFoundError, ConnectionError):
+                # Воркер ещё запускается (или перезапускается после падения)
+                if loop.time() >= deadline:
+                    logger.error(f"Воркер-процесс {index} недоступен: {path}")
+                    return
+                await asyncio.sleep(0.1)
+                continue
+            self._writers[index] = writer
+            return
+
+
+async def serve_shard(
+    socket_path: str,
+    update_queue: UpdateQueue,
+    order_events: OrderEventsService | None = None,
+) -> asyncio.AbstractServer:
+    """Принимать апдейты и события заказов от фронт-процесса через Unix-сокет."""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                kind, size = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+                body = await reader.readexactly(size)
+                if kind == FRAME_ORDER_EVENTS:
+                    _submit_order_events(order_events, body)
+                    continue
+                # Ждём места в очереди: пока воркер занят, фронт копит буфер и затем отвечает 503
+                await update_queue.put(body)
+        except asyncio.IncompleteReadError:
+            # Фронт-процесс закрыл соединение
+            pass
+        finally:
+            writer.close()
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    return await asyncio.start_unix_server(handle, path=socket_path)
+
+
+def _submit_order_events(order_events: OrderEventsService | None, body: bytes) -> None:
+    if order_events is None:
+        logger.error("События заказов от фронт-процесса отброшены: воркер запущен без OrderEventsService")
+        return
+    try:
+        events = _ORDER_EVENT_LIST.validate_json(body)
+    except ValidationError as e:
+        # Фронт уже проверил события — сюда попадает только кадр другой версии протокола
+        logger.error(f"Некорректные события заказов от фронт-процесса: {e}")
+        return
+    order_events.submit(events)
@@ -1,21 +1,15 @@
 import asyncio
 import logging
 
-from fastapi import APIRouter, Depends, Request, HTTPException, BackgroundTasks
-from aiogram import Bot, Dispatcher
-from aiogram.types import Update
+from fastapi import APIRouter, Request, HTTPException, Response
+
+from tg_bot.http_app.update_queue import UpdateQueue
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-
-def _get_bot(request: Request) -> Bot:
-    return request.app.state.bot
-
-
-def _get_dispatcher(request: Request) -> Dispatcher:
-    return request.app.state.dispatcher
+_ACCEPTED = b'{"status":"accepted"}'
 
 
 def _verify_secret(request: Request) -> None:
@@ -25,38 +19,45 @@ def _verify_secret(request: Request) -> None:
         raise HTTPException(status_code=403, detail="invalid secret")
 
 
-async def _process_update(dispatcher: Dispatcher, bot: Bot, update: Update) -> None:
-    """Обработка update в фоновой задаче с таймаутом и обработкой ошибок."""
-    try:
-        # Таймаут на обработку одного update — 55 секунд 
-        # (меньше чем 60 сек таймаут Telegram на повторную отправку)
-        async with asyncio.timeout(55.0):
-            await dispatcher.feed_update(bot=bot, update=update)
-    except asyncio.TimeoutError:
-        logger.error(f"Timeout processing update id={update.update_id}")
-    except Exception as e:
-        logger.exception(f"Error processing update id={update.update_id}: {e}")
-
-
 @router.post("/telegram/webhook")
-async def handle_telegram_webhook(
-    request: Request,
-    background_tasks: BackgroundTasks,
-    bot: Bot = Depends(_get_bot),
-    dispatcher: Dispatcher = Depends(_get_dispatcher),
-) -> dict[str, str]:
+async def handle_telegram_webhook(request: Request) -> Response:
     """
     Webhook для получения обновлений от Telegram.
     
-    Обработка выполняется в фоновой задаче, чтобы:
+    Обработка выполняется воркерами ограниченной очереди, чтобы:
     1. Быстро вернуть ответ Telegram (избежать таймаута)
     2. Не блокировать обработку следующих обновлений
+    3. Ограничить число одновременно обрабатываемых апдейтов
+    
+    В запросе только проверяется секрет: разбор и валидация апдейта
+    (Update.model_validate_json) и отсев повторов выполняются воркером.
+    
+    С WEBHOOK_REPLY_IN_RESPONSE запрос ждёт обработки не дольше
+    WEBHOOK_REPLY_TIMEOUT: метод, возвращённый хендлером, уходит в теле
+    ответа вместо отдельного запроса к Bot API. Медленные апдейты
+    дообрабатываются в фоне, как обычно.
     """
     _verify_secret(request)
-    payload = await request.json()
-    update = Update.model_validate(payload)
+    raw_update = await request.body()
+    # Без Depends: синхронные зависимости FastAPI выполняет в пуле потоков
+    update_queue: UpdateQueue = request.app.state.update_queue
+    settings = request.app.state.settings
+    
+    reply: asyncio.Future | None = None
+    if settings.webhook_reply_in_response:
+        reply = asyncio.get_running_loop().create_future()
+    
+    # Очередь заполнена — отвечаем 503, Telegram повторит доставку позже
+    if not update_queue.submit(raw_update, reply):
+        raise HTTPException(status_code=503, detail="update queue is full", headers={"Retry-After": "1"})
     
-    # Запускаем обработку в фоне и сразу возвращаем ответ
-    background_tasks.add_task(_process_update, dispatcher, bot, update)
+    if reply is not None:
+        try:
+            await asyncio.wait((reply,), timeout=settings.webhook_reply_timeout)
+        finally:
+            # Не дождались — воркер увидит отменённый future и выполнит метод сам
+            reply.cancel()
+        if not reply.cancelled() and reply.result() is not None:
+            return Response(content=reply.result(), media_type="application/json")
     
-    return {"status": "accepted"}
+    return Response(content=_ACCEPTED, media_type="application/json")
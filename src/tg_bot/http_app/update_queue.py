@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import AbstractAsyncContextManager, nullcontext
+from typing import Hashable
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiogram.types import Update
+from pydantic import ValidationError
+
+from tg_bot.bot.dedup import UpdateDeduplicator
+from tg_bot.bot.middlewares.retry_policy import update_deadline
+from tg_bot.bot.scheduler import OrderedDispatcher, update_lane_key
+from tg_bot.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Таймаут на обработку одного update — 55 секунд
+# (меньше чем 60 сек таймаут Telegram на повторную отправку)
+UPDATE_TIMEOUT = 55.0
+
+QUEUE_DEPTH = REGISTRY.gauge("webhook_queue_depth", "Апдейты, ожидающие обработки (в очереди и в очередях полос)")
+QUEUE_WAIT = REGISTRY.histogram("webhook_queue_wait_seconds", "Время ожидания апдейта в очереди")
+QUEUE_DROPPED = REGISTRY.counter("webhook_updates_dropped_total", "Апдейты, отклонённые из-за переполнения очереди")
+LANE_BACKLOGGED = REGISTRY.counter(
+    "webhook_updates_backlogged_total",
+    "Апдейты, переданные воркеру, который уже обрабатывает апдейты того же чата",
+)
+INVALID_UPDATES = REGISTRY.counter("webhook_invalid_updates_total", "Апдейты, не прошедшие валидацию")
+HANDLER_REPLIES = REGISTRY.counter(
+    "webhook_handler_replies_total",
+    "Методы, возвращённые хендлерами: в ответе на вебхук или отдельным запросом",
+    ["via"],
+)
+
+
+def webhook_reply_body(bot: Bot, method: TelegramMethod) -> bytes | None:
+    """
+    Тело ответа на вебхук с вызовом метода Bot API.
+
+    Возвращает None, если метод загружает файлы: такой ответ требует
+    multipart, и метод выполняется обычным запросом.
+    """
+    files: dict = {}
+    # prepare_value подставляет значения по умолчанию бота (parse_mode и т.п.)
+    payload = bot.session.prepare_value(
+        {"method": method.__api_method__, **method.model_dump(warnings=False)},
+        bot=bot,
+        files=files,
+    )
+    if files:
+        return None
+    return payload.encode()
+
+
+class UpdateQueue:
+    """
+    Ограниченная очередь апдейтов вебхука с фиксированным пулом воркеров.
+
+    Ограничивает число одновременно обрабатываемых апдейтов: при всплеске
+    трафика лишние апдейты не принимаются, и Telegram повторяет их позже.
+    В очередь кладётся тело запроса как есть; разбор, валидация и отсев
+    повторных доставок выполняются воркером, вне пути ответа Telegram.
+
+    Апдейты одного чата (полосы, см. `update_lane_key`) обрабатывает один
+    воркер по очереди: апдейт занятого чата откладывается в очередь его
+    полосы, и воркер сразу берёт следующий апдейт. Поэтому всплеск в одном
+    чате занимает один воркер, а не весь пул. Отложенные апдейты считаются
+    в общий лимит `maxsize` вместе с очередью: поток апдейтов одного чата
+    тоже упирается в лимит и получает 503.
+
+    Если вместе с апдейтом передан `reply` (future), метод Bot API,
+    возвращённый хендлером, отдаётся через него в ответ на вебхук.
+    Если future уже отменён (ответ на вебхук ушёл), метод выполняется
+    отдельным запросом, как и в polling-режиме.
+    """
+
+    def __init__(
+        self,
+        *,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        maxsize: int,
+        workers: int,
+        deduplicator: UpdateDeduplicator | None = None,
+    ):
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.workers = workers
+        self.deduplicator = deduplicator
+        self.maxsize = maxsize
+        # Лимит maxsize проверяется в submit/put — общий для очереди и очередей полос
+        self._queue: asyncio.Queue[tuple[bytes, float, asyncio.Future | None]] = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+        # Очереди полос, которые сейчас обрабатываются, и число апдейтов в них
+        self._backlogs: dict[Hashable, deque[tuple[Update, asyncio.Future | None]]] = {}
+        self._backlogged = 0
+        # Взводится, когда апдейт покидает очередь или очередь полосы (put ждёт места)
+        self._room = asyncio.Event()
+
+    def submit(self, raw_update: bytes, reply: asyncio.Future | None = None) -> bool:
+        """Поставить сырой апдейт в очередь. Возвращает False, если очередь заполнена."""
+        if self.qsize() >= self.maxsize:
+            QUEUE_DROPPED.inc()
+            logger.warning("Очередь апдейтов переполнена, апдейт отклонён")
+            return False
+        self._queue.put_nowait((raw_update, time.monotonic(), reply))
+        QUEUE_DEPTH.set(self.qsize())
+        return True
+
+    async def put(self, raw_update: bytes) -> None:
+        """Поставить апдейт в очередь, дождавшись свободного места (апдейты от фронт-процесса)."""
+        while self.qsize() >= self.maxsize:
+            self._room.clear()
+            await self._room.wait()
+        self._queue.put_nowait((raw_update, time.monotonic(), None))
+        QUEUE_DEPTH.set(self.qsize())
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"update-worker-{index}")
+            for index in range(self.workers)
+        ]
+        logger.info(f"Запущено воркеров обработки апдейтов: {self.workers}")
+
+    async def stop(self, drain_timeout: float = 10.0) -> None:
+        """Дождаться обработки накопленных апдейтов (не дольше drain_timeout) и остановить воркеры."""
+        try:
+            async with asyncio.timeout(drain_timeout):
+                await self._queue.join()
+        except asyncio.TimeoutError:
+            logger.warning(f"Не дождались обработки {self._queue.qsize()} апдейтов при остановке")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def qsize(self) -> int:
+        """Апдейты, ожидающие обработки: в очереди и в очередях полос."""
+        return self._queue.qsize() + self._backlogged
+
+    def _left_queue(self) -> None:
+        QUEUE_DEPTH.set(self.qsize())
+        self._room.set()
+
+    async def _worker(self) -> None:
+        while True:
+            raw_update, enqueued_at, reply = await self._queue.get()
+            self._left_queue()
+            QUEUE_WAIT.observe(time.monotonic() - enqueued_at)
+            try:
+                update = self._parse_update(raw_update)
+            except BaseException:
+                self._finish(reply)
+                raise
+            if update is None:
+                self._finish(reply)
+                continue
+            key = update_lane_key(update)
+            if key is None:
+                try:
+                    await self._process_update(update, reply)
+                finally:
+                    self._finish(reply)
+                continue
+            backlog = self._backlogs.get(key)
+            if backlog is not None:
+                # Чат уже обрабатывает другой воркер — он возьмёт и этот апдейт
+                backlog.append((update, reply))
+                self._backlogged += 1
+                LANE_BACKLOGGED.inc()
+                continue
+            await self._run_lane(key, update, reply)
+
+    async def _run_lane(self, key: Hashable, update: Update, reply: asyncio.Future | None) -> None:
+        """Обработать апдейт и всё, что накопилось в очереди его полосы за это время."""
+        backlog = self._backlogs[key] = deque()
+        try:
+            while True:
+                try:
+                    await self._process_update(update, reply)
+                finally:
+                    self._finish(reply)
+                if not backlog:
+                    break
+                update, reply = backlog.popleft()
+                self._backlogged -= 1
+                self._left_queue()
+        finally:
+            del self._backlogs[key]
+            # Остаток очереди полосы при отмене воркера (остановка после stop-таймаута)
+            while backlog:
+                _, reply = backlog.popleft()
+                self._backlogged -= 1
+                self._finish(reply)
+            self._left_queue()
+
+    def _finish(self, reply: asyncio.Future | None) -> None:
+        # Хендлер ничего не вернул — вебхук отвечает пустым подтверждением
+        if reply is not None and not reply.done():
+            reply.set_result(None)
+        self._queue.task_done()
+
+    def _lane(self, update: Update) -> AbstractAsyncContextManager[None]:
+        if isinstance(self.dispatcher, OrderedDispatcher):
+            return self.dispatcher.lane(update)
+        return nullcontext()
+
+    def _parse_update(self, raw_update: bytes) -> Update | None:
+        """Разобрать апдейт и отсеять повторную доставку."""
+        try:
+            # Контекст bot сразу привязывает апдейт к боту — feed_update не будет пересоздавать его
+            update = Update.model_validate_json(raw_update, context={"bot": self.bot})
+        except ValidationError as e:
+            INVALID_UPDATES.inc()
+            logger.error(f"Некорректный апдейт от Telegram: {e}")
+            return None
+        # Повторная доставка (медленный ответ, рестарт) — не обрабатываем повторно
+        if self.deduplicator is not None and self.deduplicator.seen(update.update_id):
+            logger.info(f"Пропускаем повторный update id={update.update_id}")
+            return None
+        return update
+
+    async def _process_update(self, update: Update, reply: asyncio.Future | None = None) -> None:
+        """Обработка update с таймаутом и обработкой ошибок."""
+        try:
+            # Дедлайн отсчитывается после получения полосы (ожидание лимита полос его не съедает)
+            # и ограничивает и повторы запросов к Telegram внутри обработки
+            async with self._lane(update):
+                with update_deadline(UPDATE_TIMEOUT):
+                    async with asyncio.timeout(UPDATE_TIMEOUT):
+                        result = await self.dispatcher.feed_update(bot=self.bot, update=update)
+                        if isinstance(result, TelegramMethod):
+                            await self._answer(result, reply)
+        except asyncio.TimeoutError:
+            logger.error(f"Timeout processing update id={update.update_id}")
+        except Exception as e:
+            logger.exception(f"Error processing update id={update.update_id}: {e}")
+
+    async def _answer(self, method: TelegramMethod, reply: asyncio.Future | None) -> None:
+        """Отдать метод в ответ на вебхук, если запрос Telegram ещё ждёт, иначе выполнить его."""
+        if reply is not None and not reply.done():
+            body = webhook_reply_body(self.bot, method)
+            if body is not None:
+                reply.set_result(body)
+                HANDLER_REPLIES.inc(via="webhook")
+                return
+        HANDLER_REPLIES.inc(via="request")
+        # Как и при ответе на вебхук, ошибка Telegram не роняет обработку — только логируется
+        await self.dispatcher.silent_call_request(self.bot, method)
@@ -9,6 +9,8 @@ def configure_logging(level: str = "INFO") -> None:
     dictConfig(
         {
             "version": 1,
+            # Логгеры модулей создаются при импорте, до настройки — не отключаем их
+            "disable_existing_loggers": False,
             "formatters": {
                 "default": {
                     "format": LOG_FORMAT,
@@ -1,19 +1,44 @@
 import asyncio
 import logging
+import multiprocessing
+import os
+import shutil
 import signal
+import tempfile
 from typing import Any
 
 import uvicorn
 from aiogram import Bot, Dispatcher
+from fastapi import FastAPI
 
 from tg_bot.bot.app import create_bot_and_dispatcher
+from tg_bot.bot.dedup import DeduplicationMiddleware
 from tg_bot.config import Settings, load_settings
-from tg_bot.http_app.app import create_app
+from tg_bot.http_app.app import create_app, create_shard_front_app
+from tg_bot.http_app.sharding import ShardRouter, serve_shard, shard_settings
+from tg_bot.http_app.update_queue import UpdateQueue
 from tg_bot.logging import configure_logging
 
 logger = logging.getLogger(__name__)
 
 
+async def _close_clients(bot: Bot, dispatcher: Dispatcher) -> None:
+    """Остановить рассылку, дождаться фоновых действий и закрыть сессию Telegram, пул соединений к LeafFlow API и хранилище FSM."""
+    await dispatcher["broadcast_service"].stop()
+    await dispatcher["support_topics_service"].flush_media_groups()
+    dispatcher["order_events"].flush_all()
+    await dispatcher["side_effects"].stop()
+    await bot.session.close()
+    await dispatcher["api_pool"].aclose()
+    await dispatcher.storage.close()
+
+
+async def _warm_up_media(settings: Settings, bot: Bot, dispatcher: Dispatcher) -> None:
+    """Заранее загрузить в Telegram новые и изменённые изображения (в админский чат)."""
+    if settings.media_warm_up:
+        await dispatcher["media_registry"].warm_up(bot, settings.admin_chat_id)
+
+
 async def _run_polling(bot: Bot, dispatcher: Dispatcher) -> None:
     """Запуск бота в polling-режиме (через прокси, если настроена)."""
     logger.info("Запуск бота в polling-режиме")
@@ -21,19 +46,19 @@ async def _run_polling(bot: Bot, dispatcher: Dispatcher) -> None:
         # Удаляем webhook, чтобы Telegram отдавал обновления через getUpdates
         await bot.delete_webhook(drop_pending_updates=True)
         logger.info("Webhook удалён, запускаем polling")
+        await _warm_up_media(dispatcher["settings"], bot, dispatcher)
+        await dispatcher["side_effects"].start()
+        await dispatcher["broadcast_service"].resume()
 
+        dispatcher.update.outer_middleware(DeduplicationMiddleware(dispatcher["update_deduplicator"]))
         await dispatcher.start_polling(bot)
     finally:
-        await bot.session.close()
-
+        dispatcher["update_deduplicator"].save()
+        await _close_clients(bot, dispatcher)
 
-async def _run_webhook(
-    settings: Settings, bot: Bot, dispatcher: Dispatcher
-) -> None:
-    """Запуск бота через webhook (текущее поведение)."""
-    logger.info("Запуск бота в webhook-режиме")
-    app = create_app(settings=settings, bot=bot, dispatcher=dispatcher)
 
+async def _serve(app: FastAPI, settings: Settings) -> None:
+    """Запустить uvicorn и остановить его по SIGTERM/SIGINT."""
     config = uvicorn.Config(
         app,
         host=settings.host,
@@ -43,13 +68,7 @@ async def _run_webhook(
     server = uvicorn.Server(config)
 
     shutdown_event = asyncio.Event()
-
-    def signal_handler() -> None:
-        shutdown_event.set()
-
-    loop = asyncio.get_running_loop()
-    for sig in (signal.SIGTERM, signal.SIGINT):
-        loop.add_signal_handler(sig, signal_handler)
+    _on_shutdown_signal(shutdown_event)
 
     serve_task = asyncio.create_task(server.serve())
 
@@ -67,13 +86,125 @@ async def _run_webhook(
                 await serve_task
             except asyncio.CancelledError:
                 pass
-        await bot.session.close()
+
+
+def _on_shutdown_signal(event: asyncio.Event) -> None:
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, event.set)
+
+
+async def _run_webhook(
+    settings: Settings, bot: Bot, dispatcher: Dispatcher
+) -> None:
+    """Запуск бота через webhook (текущее поведение)."""
+    logger.info("Запуск бота в webhook-режиме")
+    app = create_app(settings=settings, bot=bot, dispatcher=dispatcher)
+    try:
+        await _warm_up_media(settings, bot, dispatcher)
+        await dispatcher["side_effects"].start()
+        await dispatcher["broadcast_service"].resume()
+        await _serve(app, settings)
+    finally:
+        await _close_clients(bot, dispatcher)
+
+
+async def _run_supervisor(settings: Settings) -> None:
+    """
+    Webhook-режим с несколькими процессами (WEBHOOK_PROCESSES > 1).
+
+    Фронт-процесс принимает вебхук и по chat_id передаёт апдейты
+    воркер-процессам через Unix-сокеты: апдейты одного чата всегда
+    обрабатывает один процесс, поэтому порядок и FSM чата сохраняются.
+    Упавший воркер перезапускается.
+    """
+    processes = settings.webhook_processes
+    logger.info(f"Запуск бота в webhook-режиме: {processes} воркер-процессов")
+    socket_dir = tempfile.mkdtemp(prefix="tg_bot_shards_")
+    socket_paths = [os.path.join(socket_dir, f"shard-{index}.sock") for index in range(processes)]
+    context = multiprocessing.get_context("spawn")
+
+    def start_worker(index: int) -> multiprocessing.process.BaseProcess:
+        process = context.Process(
+            target=run_shard_worker,
+            args=(index, processes, socket_paths[index]),
+            name=f"tg-bot-shard-{index}",
+        )
+        process.start()
+        return process
+
+    workers = [start_worker(index) for index in range(processes)]
+
+    async def watch_workers() -> None:
+        while True:
+            await asyncio.sleep(1.0)
+            for index, process in enumerate(workers):
+                if not process.is_alive():
+                    logger.error(f"Воркер-процесс {index} завершился (код {process.exitcode}), перезапускаем")
+                    workers[index] = start_worker(index)
+
+    watchdog = asyncio.create_task(watch_workers())
+    app = create_shard_front_app(settings, ShardRouter(socket_paths=socket_paths))
+    try:
+        await _serve(app, settings)
+    finally:
+        watchdog.cancel()
+        # SIGTERM: воркеры дорабатывают свои очереди и сохраняют состояние
+        for process in workers:
+            process.terminate()
+        for process in workers:
+            await asyncio.to_thread(process.join, 15.0)
+            if process.is_alive():
+                process.kill()
+        shutil.rmtree(socket_dir, ignore_errors=True)
+
+
+async def _run_shard_worker(index: int, processes: int, socket_path: str) -> None:
+    settings = shard_settings(load_settings(), index, processes)
+    configure_logging(level=settings.log_level)
+
+    bot, dispatcher = create_bot_and_dispatcher(settings)
+    update_deduplicator = dispatcher["update_deduplicator"]
+    update_queue = UpdateQueue(
+        dispatcher=dispatcher,
+        bot=bot,
+        maxsize=settings.webhook_queue_size,
+        workers=settings.webhook_workers,
+        deduplicator=update_deduplicator,
+    )
+    # Реестр file_id у каждого процесса свой (shard_settings) — и предзагрузка тоже
+    await _warm_up_media(settings, bot, dispatcher)
+    await dispatcher["side_effects"].start()
+    await dispatcher["broadcast_service"].resume()
+    await update_queue.start()
+    server = await serve_shard(socket_path, update_queue, dispatcher["order_events"])
+    logger.info(f"Воркер-процесс {index} слушает {socket_path}")
+
+    shutdown_event = asyncio.Event()
+    _on_shutdown_signal(shutdown_event)
+    try:
+        await shutdown_event.wait()
+    finally:
+        server.close()
+        await update_queue.stop()
+        update_deduplicator.save()
+        await _close_clients(bot, dispatcher)
+
+
+def run_shard_worker(index: int, processes: int, socket_path: str) -> None:
+    """Точка входа воркер-процесса (запускается супервизором через multiprocessing)."""
+    asyncio.run(_run_shard_worker(index, processes, socket_path))
 
 
 async def _run() -> None:
     settings = load_settings()
     configure_logging(level=settings.log_level)
 
+    if not settings.use_polling and settings.webhook_processes > 1:
+        # Бот и диспетчер создаются в воркер-процессах
+        await _run_supervisor(settings)
+        return
+
     bot, dispatcher = create_bot_and_dispatcher(settings)
 
     if settings.use_polling:
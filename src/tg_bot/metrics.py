@@ -0,0 +1,180 @@
+"""
+Лёгкие внутрипроцессные метрики.
+
+Все обновления выполняются из одного event loop, поэтому метрики хранятся
+в обычных словарях без блокировок: инкремент стоит одну операцию со словарём.
+Текстовый формат Prometheus собирается только при запросе `/metrics`.
+"""
+from bisect import bisect_left
+from typing import Iterable, Iterator
+
+
+LabelValues = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """Монотонно возрастающий счётчик с метками."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[LabelValues, float] = {}
+
+    def _key(self, labels: dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> list[tuple[LabelValues, float]]:
+        return list(self._values.items())
+
+    def expose(self) -> Iterator[str]:
+        samples = self.samples()
+        if not samples and not self.labelnames:
+            samples = [((), 0.0)]
+        for values, value in samples:
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    """Значение, которое может как расти, так и уменьшаться."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+# Бакеты по умолчанию (секунды): от миллисекунд до таймаута обработки апдейта
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Гистограмма с фиксированными бакетами: наблюдение — бинарный поиск и два сложения."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Для каждого набора меток: счётчики по бакетам (+Inf последним), сумма, количество
+        self._values: dict[LabelValues, tuple[list[int], list[float]]] = {}
+
+    def _key(self, labels: dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            entry = ([0] * (len(self.buckets) + 1), [0.0, 0.0])
+            self._values[key] = entry
+        counts, totals = entry
+        counts[bisect_left(self.buckets, value)] += 1
+        totals[0] += value
+        totals[1] += 1
+
+    def count(self, **labels: str) -> int:
+        entry = self._values.get(self._key(labels))
+        return int(entry[1][1]) if entry else 0
+
+    def samples(self) -> list[tuple[LabelValues, tuple[list[int], list[float]]]]:
+        return list(self._values.items())
+
+    def expose(self) -> Iterator[str]:
+        bounds = [*self.buckets, float("inf")]
+        for values, (counts, (total, count)) in self.samples():
+            # В формате Prometheus бакеты накопительные: le="X" — все наблюдения <= X
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, values, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {_format_value(count)}"
+
+
+Metric = Counter | Gauge | Histogram
+
+
+class MetricsRegistry:
+    """Реестр метрик процесса. Повторная регистрация возвращает уже созданную метрику."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(name, lambda: Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(name, lambda: Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(name, lambda: Histogram(name, documentation, labelnames, buckets))
+
+    def metrics(self) -> list[Metric]:
+        return list(self._metrics.values())
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus (0.0.4)."""
+        lines: list[str] = []
+        for metric in self.metrics():
+            documentation = metric.documentation.replace("\\", "\\\\").replace("\n", "\\n")
+            lines.append(f"# HELP {metric.name} {documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.expose())
+        lines.append("")
+        return "\n".join(lines)
+
+    def _register(self, name: str, factory):  # type: ignore[no-untyped-def]
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = factory()
+            self._metrics[name] = metric
+        return metric
+
+
+REGISTRY = MetricsRegistry()
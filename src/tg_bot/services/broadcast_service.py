@@ -0,0 +1,347 @@
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from functools import partial
+from html import escape
+from pathlib import Path
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+
+from tg_bot.api_client.users import UsersApi
+from tg_bot.bot.middlewares.rate_limiter import TokenBucket
+from tg_bot.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_MESSAGES = REGISTRY.counter(
+    "bot_broadcast_messages_total",
+    "Сообщения рассылки по результату (sent, blocked, failed)",
+    ["status"],
+)
+BROADCAST_RUNNING = REGISTRY.gauge("bot_broadcast_running", "Идёт ли рассылка (1/0)")
+
+# Попытки отправки одному получателю, если повторы сессии не пережили флуд-контроль
+DELIVERY_ATTEMPTS = 3
+
+
+@dataclass
+class BroadcastState:
+    """Прогресс рассылки; сохраняется в файл и переживает рестарт."""
+
+    id: str
+    # Сообщение, которое копируется получателям
+    from_chat_id: int
+    message_id: int
+    started_by: int | None = None
+    started_at: float = field(default_factory=time.time)
+    # Начало текущей страницы получателей и число уже обработанных получателей на ней
+    cursor: str | None = None
+    offset: int = 0
+    position: int = 0
+    sent: int = 0
+    blocked: int = 0
+    failed: int = 0
+    # Сообщение в админском чате, в котором обновляется отчёт
+    report_message_id: int | None = None
+    error: str | None = None
+
+
+class BroadcastService:
+    """
+    Рассылка сообщения из админского чата всем покупателям.
+
+    Получатели загружаются из LeafFlow API страницами (`UsersApi.iter_recipients`),
+    сообщение копируется каждому через copy_message. Темп рассылки `rate`
+    ниже общего лимита бота, чтобы оставался запас для ответов
+    пользователям; сами отправки проходят через лимитер сессии (общий и по
+    чатам) и его повторы при флуд-контроле.
+
+    Позиция (страница и число обработанных на ней получателей) и счётчики
+    сохраняются в `state_path`: после рестарта рассылка продолжается с
+    того же места. Сообщения, отправка которых шла в момент остановки,
+    могут уйти повторно — не больше `workers` штук.
+    """
+
+    # Как часто сохранять прогресс во время отправки (секунды)
+    CHECKPOINT_INTERVAL = 1.0
+
+    def __init__(
+        self,
+        *,
+        bot: Bot,
+        users_api: UsersApi,
+        admin_chat_id: int,
+        state_path: str | None = None,
+        rate: float = 20.0,
+        workers: int = 10,
+        page_size: int = 500,
+        report_interval: float = 15.0,
+        retry_max_delay: float = 60.0,
+    ):
+        self.bot = bot
+        self.users_api = users_api
+        self.admin_chat_id = admin_chat_id
+        self.state_path = Path(state_path) if state_path else None
+        self.rate = rate
+        self.workers = workers
+        self.page_size = page_size
+        self.report_interval = report_interval
+        self.retry_max_delay = retry_max_delay
+        self._bucket = TokenBucket(rate=rate)
+        self._state: BroadcastState | None = None
+        self._task: asyncio.Task | None = None
+        self._cancelled = False
+        self._last_saved = 0.0
+        self._run_started = 0.0
+        self._run_processed = 0
+
+    @property
+    def current(self) -> BroadcastState | None:
+        """Текущая рассылка (None — рассылка не идёт)."""
+        return self._state
+
+    def start_broadcast(
+        self,
+        *,
+        from_chat_id: int,
+        message_id: int,
+        started_by: int | None = None,
+        report_message_id: int | None = None,
+    ) -> BroadcastState | None:
+        """Запустить рассылку. Возвращает None, если уже идёт другая."""
+        if self._state is not None:
+            return None
+        self._state = BroadcastState(
+            id=uuid.uuid4().hex,
+            from_chat_id=from_chat_id,
+            message_id=message_id,
+            started_by=started_by,
+            report_message_id=report_message_id,
+        )
+        self._save(self._state)
+        self._spawn()
+        logger.info(f"Администратор {started_by} запустил рассылку {self._state.id} сообщения {message_id}")
+        return self._state
+
+    def cancel_broadcast(self) -> bool:
+        """Остановить рассылку насовсем (в отличие от остановки процесса, после которой она продолжится)."""
+        if self._task is None or self._task.done():
+            return False
+        self._cancelled = True
+        self._task.cancel()
+        return True
+
+    def load(self) -> None:
+        """Загрузить прогресс незавершённой рассылки."""
+        if not self.state_path or not self.state_path.exists():
+            return
+        try:
+            self._state = BroadcastState(**json.loads(self.state_path.read_text(encoding="utf-8")))
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Не удалось загрузить прогресс рассылки из {self.state_path}: {e}")
+            return
+        logger.info(
+            f"Незавершённая рассылка {self._state.id}: отправлено {self._state.sent}, "
+            f"продолжится после запуска"
+        )
+
+    async def resume(self) -> None:
+        """Продолжить рассылку, загруженную из файла прогресса."""
+        if self._state is not None and self._task is None:
+            self._spawn()
+
+    async def stop(self) -> None:
+        """Остановить отправку при остановке процесса; прогресс остаётся в файле."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+    def _spawn(self) -> None:
+        # Пустой контекст: дедлайн апдейта, в котором запущена рассылка, не должен ограничивать повторы отправки
+        self._task = asyncio.create_task(self._run(self._state), name="broadcast", context=contextvars.Context())
+
+    async def _run(self, state: BroadcastState) -> None:
+        BROADCAST_RUNNING.set(1)
+        self._run_started = time.monotonic()
+        self._run_processed = 0
+        reporter = asyncio.create_task(self._report_periodically(state))
+        outcome = "finished"
+        delay = 1.0
+        try:
+            while True:
+                try:
+                    await self._send_all(state)
+                    break
+                except Exception as e:
+                    # Страница получателей не загрузилась: повторяем с сохранённой позиции
+                    state.error = f"{type(e).__name__}: {e}"
+                    self._save(state)
+                    logger.error(f"Ошибка рассылки {state.id}, повтор через {delay:.0f} с: {state.error}")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.retry_max_delay)
+        except asyncio.CancelledError:
+            if not self._cancelled:
+                # Остановка процесса: рассылка продолжится после рестарта
+                self._save(state)
+                raise
+            outcome = "cancelled"
+        finally:
+            reporter.cancel()
+            BROADCAST_RUNNING.set(0)
+        self._state = None
+        self._task = None
+        self._cancelled = False
+        self._forget()
+        logger.info(
+            f"Рассылка {state.id} {'завершена' if outcome == 'finished' else 'остановлена'}: "
+            f"отправлено {state.sent}, заблокировали бота {state.blocked}, ошибок {state.failed}"
+        )
+        await self._report(state, outcome)
+
+    async def _send_all(self, state: BroadcastState) -> None:
+        pages = self.users_api.iter_recipients(page_size=self.page_size, cursor=state.cursor, offset=state.offset)
+        try:
+            async for page in pages:
+                await self._send_page(state, page.items)
+                state.cursor = page.nextCursor
+                state.offset += len(page.items)
+                state.position = 0
+                state.error = None
+                self._save(state)
+        finally:
+            await pages.aclose()
+
+    async def _send_page(self, state: BroadcastState, recipients: list[int]) -> None:
+        slots = asyncio.Semaphore(self.workers)
+        delivered = bytearray(len(recipients))
+        tasks: set[asyncio.Task] = set()
+
+        def on_done(index: int, task: asyncio.Task) -> None:
+            slots.release()
+            tasks.discard(task)
+            if task.cancelled():
+                return
+            delivered[index] = 1
+            # Позиция — число получателей с начала страницы, которым отправка уже завершена
+            while state.position < len(recipients) and delivered[state.position]:
+                state.position += 1
+            if time.monotonic() - self._last_saved >= self.CHECKPOINT_INTERVAL:
+                self._save(state)
+
+        try:
+            for index in range(state.position, len(recipients)):
+                await slots.acquire()
+                await self._pace()
+                task = asyncio.create_task(self._deliver(state, recipients[index]))
+                tasks.add(task)
+                task.add_done_callback(partial(on_done, index))
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _pace(self) -> None:
+        delay = self._bucket.reserve(time.monotonic())
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _deliver(self, state: BroadcastState, chat_id: int) -> None:
+        for _ in range(DELIVERY_ATTEMPTS):
+            try:
+                await self.bot.copy_message(
+                    chat_id=chat_id,
+                    from_chat_id=state.from_chat_id,
+                    message_id=state.message_id,
+                )
+            except TelegramRetryAfter as e:
+                # Флуд-контроль пережил повторы сессии: притормаживаем всю рассылку
+                self._bucket.pause_until(time.monotonic() + e.retry_after)
+                await asyncio.sleep(e.retry_after)
+                continue
+            except TelegramForbiddenError:
+                self._count(state, "blocked")
+            except Exception as e:
+                logger.warning(f"Рассылка {state.id}: не удалось отправить сообщение {chat_id}: {e}")
+                self._count(state, "failed")
+            else:
+                self._count(state, "sent")
+            return
+        self._count(state, "failed")
+
+    def _count(self, state: BroadcastState, status: str) -> None:
+        setattr(state, status, getattr(state, status) + 1)
+        self._run_processed += 1
+        BROADCAST_MESSAGES.inc(status=status)
+
+    async def _report_periodically(self, state: BroadcastState) -> None:
+        await self._report(state)
+        while True:
+            await asyncio.sleep(self.report_interval)
+            await self._report(state)
+
+    async def _report(self, state: BroadcastState, outcome: str | None = None) -> None:
+        """Отправить или обновить отчёт о рассылке в админском чате."""
+        text = self.report_text(state, outcome)
+        try:
+            if state.report_message_id is None:
+                message = await self.bot.send_message(chat_id=self.admin_chat_id, text=text)
+                state.report_message_id = message.message_id
+            else:
+                await self.bot.edit_message_text(
+                    chat_id=self.admin_chat_id,
+                    message_id=state.report_message_id,
+                    text=text,
+                )
+        except TelegramBadRequest as e:
+            if "message is not modified" not in str(e):
+                logger.warning(f"Не удалось обновить отчёт о рассылке {state.id}: {e}")
+        except Exception as e:
+            logger.warning(f"Не удалось обновить отчёт о рассылке {state.id}: {e}")
+
+    def report_text(self, state: BroadcastState, outcome: str | None = None) -> str:
+        titles = {
+            None: "📣 <b>Рассылка идёт</b>",
+            "finished": "✅ <b>Рассылка завершена</b>",
+            "cancelled": "⏹ <b>Рассылка остановлена</b>",
+        }
+        elapsed = time.monotonic() - self._run_started
+        throughput = self._run_processed / elapsed if elapsed > 0 else 0.0
+        text = (
+            f"{titles[outcome]}\n\n"
+            f"📨 Отправлено: {state.sent}\n"
+            f"🚫 Заблокировали бота: {state.blocked}\n"
+            f"⚠️ Ошибки: {state.failed}\n"
+            f"⚡ Скорость: {throughput:.1f} сообщ./с"
+        )
+        if state.error and outcome is None:
+            text += f"\n\n❗ Ошибка загрузки получателей, повторяем: {escape(state.error[:200])}"
+        if outcome is None:
+            text += "\n\nОстановить: /broadcast_stop"
+        return text
+
+    def _save(self, state: BroadcastState) -> None:
+        self._last_saved = time.monotonic()
+        if not self.state_path:
+            return
+        tmp_path = self.state_path.with_suffix(self.state_path.suffix + ".tmp")
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text(json.dumps(asdict(state), ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить прогресс рассылки в {self.state_path}: {e}")
+
+    def _forget(self) -> None:
+        if not self.state_path:
+            return
+        try:
+            self.state_path.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Не удалось удалить файл прогресса рассылки {self.state_path}: {e}")
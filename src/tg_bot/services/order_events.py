@@ -0,0 +1,99 @@
+import asyncio
+import logging
+from typing import Any
+
+from aiogram import Bot
+
+from tg_bot.api_client.models import OrderEvent
+from tg_bot.bot.keyboards.inline import order_actions
+from tg_bot.bot.side_effects import SideEffectQueue
+from tg_bot.metrics import REGISTRY
+from tg_bot.services.order_service import OrdersTextBuilder
+from tg_bot.services.support_topics_service import SupportTopicsService
+
+logger = logging.getLogger(__name__)
+
+ORDER_EVENTS = REGISTRY.counter("order_events_total", "События заказов, присланные backend", ["type"])
+ORDER_EVENTS_COALESCED = REGISTRY.counter(
+    "order_events_coalesced_total",
+    "События заказов, объединённые с предыдущими в одно уведомление",
+)
+
+
+class OrderEventsService:
+    """
+    Уведомления о событиях заказов, присланных backend во внутренний API.
+
+    События одного заказа копятся `window` секунд с первого события и
+    уходят одним сообщением админу (в топик покупателя) и одним —
+    покупателю. Отправка идёт через очередь фоновых действий: с повторами
+    и общими лимитами исходящих сообщений Telegram.
+    """
+
+    def __init__(
+        self,
+        *,
+        bot: Bot,
+        support_topics_service: SupportTopicsService,
+        side_effects: SideEffectQueue,
+        window: float,
+    ):
+        self.bot = bot
+        self.support_topics_service = support_topics_service
+        self.side_effects = side_effects
+        self.window = window
+        self._pending: dict[str, list[OrderEvent]] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        side_effects.register("order_events_admin", self._notify_admin)
+        side_effects.register("order_events_customer", self._notify_customer)
+
+    def submit(self, events: list[OrderEvent]) -> None:
+        loop = asyncio.get_running_loop()
+        for event in events:
+            ORDER_EVENTS.inc(type=event.type)
+            pending = self._pending.get(event.orderId)
+            if pending is not None:
+                ORDER_EVENTS_COALESCED.inc()
+                pending.append(event)
+                continue
+            self._pending[event.orderId] = [event]
+            # Окно отсчитывается от первого события: поток событий не откладывает уведомление бесконечно
+            self._timers[event.orderId] = loop.call_later(self.window, self._flush, event.orderId)
+
+    def flush_all(self) -> None:
+        """Поставить в очередь уведомления по всем накопленным событиям (при остановке)."""
+        for order_id in list(self._pending):
+            self._timers[order_id].cancel()
+            self._flush(order_id)
+
+    def _flush(self, order_id: str) -> None:
+        events = self._pending.pop(order_id)
+        self._timers.pop(order_id, None)
+        last = events[-1]
+        payload = {
+            "order_id": order_id,
+            "user_telegram_id": last.userTelegramId,
+            "user_fullname": next((event.userFullname for event in events if event.userFullname), None),
+            "events": [event.model_dump(mode="json") for event in events],
+        }
+        # Уведомление админа — в порядке остальных сообщений топика пользователя
+        self.side_effects.enqueue("order_events_admin", payload, key=f"user:{last.userTelegramId}")
+        self.side_effects.enqueue("order_events_customer", payload, key=f"customer:{last.userTelegramId}")
+
+    async def _notify_admin(self, payload: dict[str, Any]) -> None:
+        await self.support_topics_service.notify_admin_about_order_events(
+            user_telegram_id=payload["user_telegram_id"],
+            user_fullname=payload["user_fullname"],
+            order_id=payload["order_id"],
+            events=[OrderEvent.model_validate(event) for event in payload["events"]],
+        )
+
+    async def _notify_customer(self, payload: dict[str, Any]) -> None:
+        order_id = payload["order_id"]
+        events = [OrderEvent.model_validate(event) for event in payload["events"]]
+        await self.bot.send_message(
+            chat_id=payload["user_telegram_id"],
+            text=OrdersTextBuilder.order_events_customer(order_id, events),
+            reply_markup=order_actions(order_id),
+        )
+        logger.info(f"Покупателю {payload['user_telegram_id']} отправлено уведомление о заказе {order_id}")
@@ -1,4 +1,6 @@
-from tg_bot.api_client.models import OrderDetails, OrderListResponse, OrderSummary
+from html import escape
+
+from tg_bot.api_client.models import OrderDetails, OrderEvent, OrderListResponse, OrderSummary
 
 
 class OrdersTextBuilder:
@@ -11,6 +13,21 @@ class OrdersTextBuilder:
             messages.append(self.format_order(order))
         return messages
 
+    def orders_page(self, orders: list[OrderSummary], page: int) -> str:
+        """Страница списка заказов одним сообщением (кнопки заказов — в клавиатуре)."""
+        lines = [f"📦 <b>Ваши заказы</b> · стр. {page}", ""]
+        for order in orders:
+            created_at = order.createdAt.strftime("%d.%m.%Y")
+            lines.append(
+                f"<b>#{order.orderId}</b> от {created_at}\n"
+                f"{self._status_emoji(order.status)} {order.human_status} · "
+                f"{self._delivery_emoji(order.deliveryMethod)} {order.human_delivery} · "
+                f"💰 {order.total} ₽"
+            )
+            lines.append("")
+        lines.append("Нажмите на заказ, чтобы открыть подробности 👇")
+        return "\n".join(lines)
+
     def order_details(self, order: OrderDetails | None) -> str:
         if not order:
             return "❌ <b>Ошибка</b>\n\nНе удалось получить детали заказа. Попробуйте позже."
@@ -57,6 +74,54 @@ class OrdersTextBuilder:
 
         return "\n".join(lines)
     
+    @staticmethod
+    def order_events_admin(order_id: str, events: list[OrderEvent], order_info: str | None) -> str:
+        """Уведомление админа обо всех событиях заказа за окно — одним сообщением."""
+        created = any(event.type == "created" for event in events)
+        lines = [
+            "🆕 <b>Новый заказ создан</b>" if created else "🔄 <b>Статус заказа изменён</b>",
+            "",
+            f"📦 <b>Заказ:</b> #{order_id}",
+        ]
+
+        changes = [event for event in events if event.type == "status_changed" and event.status]
+        if changes:
+            lines.append("")
+            for event in changes:
+                line = f"{OrdersTextBuilder._status_emoji(event.status)} {OrdersTextBuilder._human_status(event.status)}"
+                if event.comment:
+                    line += f" — {escape(event.comment)}"
+                lines.append(line)
+
+        if order_info:
+            lines.append("")
+            lines.append("━━━━━━━━━━━━━━━━━━━━")
+            lines.append("")
+            lines.append("ℹ️ <b>Информация по заказу:</b>")
+            lines.append("")
+            lines.append(order_info)
+
+        return "\n".join(lines)
+
+    @staticmethod
+    def order_events_customer(order_id: str, events: list[OrderEvent]) -> str:
+        """Уведомление покупателя: промежуточные статусы за окно не показываем, только итоговый."""
+        changes = [event for event in events if event.type == "status_changed" and event.status]
+        if not changes:
+            return (
+                f"✅ <b>Заказ #{order_id} оформлен</b>\n\n"
+                "Мы сообщим, когда статус заказа изменится."
+            )
+
+        last = changes[-1]
+        text = (
+            f"{OrdersTextBuilder._status_emoji(last.status)} <b>Заказ #{order_id}</b>\n\n"
+            f"Новый статус: <b>{OrdersTextBuilder._human_status(last.status)}</b>"
+        )
+        if last.comment:
+            text += f"\n\n💬 {escape(last.comment)}"
+        return text
+
     @staticmethod
     def _status_emoji(status: str) -> str:
         """Возвращает эмодзи для статуса заказа"""
@@ -1,19 +1,29 @@
 import logging
+from functools import partial
+from typing import Any, Awaitable, Callable
 
 from aiogram import Bot
-from aiogram.exceptions import TelegramBadRequest
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
 from aiogram.types import Message
 
 from tg_bot.api_client.support_topics import SupportTopicsApi
 from tg_bot.api_client.orders import OrdersApi
-from tg_bot.api_client.models import OrderSummary
+from tg_bot.api_client.models import OrderEvent, OrderSummary
 from tg_bot.config import Settings
 from tg_bot.services.order_service import OrdersTextBuilder
 from tg_bot.bot.keyboards.inline import admin_order_details_button
+from tg_bot.bot.media_group import MediaGroupCollector
+from tg_bot.bot.side_effects import SideEffectQueue
+from tg_bot.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
 
+def _message_ids(payload: dict[str, Any]) -> list[int]:
+    # Записи журнала до появления альбомов содержат один message_id
+    return payload.get("message_ids") or [payload["message_id"]]
+
+
 class SupportTopicsService:
     def __init__(
         self, 
@@ -23,12 +33,26 @@ class SupportTopicsService:
         support_topics_api: SupportTopicsApi,
         orders_api: OrdersApi | None = None,
         order_builder: OrdersTextBuilder | None = None,
+        side_effects: SideEffectQueue | None = None,
+        media_group_window: float = 0.5,
     ):
         self.bot = bot
         self.settings = settings
         self.support_topics_api = support_topics_api
         self.orders_api = orders_api
         self.order_builder = order_builder
+        # Одновременные запросы топика для одного пользователя (альбом, серия
+        # сообщений) ждут одно создание вместо создания дублей
+        self._thread_flight: SingleFlight[int, int] = SingleFlight()
+        # Сообщения альбома копятся media_group_window секунд и пересылаются одним запросом
+        self.media_groups = MediaGroupCollector(window=media_group_window)
+        # Пересылка и уведомления выполняются в фоне с повторами; None — сразу в хендлере
+        self.side_effects = side_effects
+        if side_effects is not None:
+            side_effects.register("support_topic", self._create_thread)
+            side_effects.register("relay_to_topic", self._relay_to_topic)
+            side_effects.register("relay_to_user", self._relay_to_user)
+            side_effects.register("notify_order_chat", self._notify_order_chat)
 
     async def get_or_create_thread(
         self,
@@ -47,24 +71,29 @@ class SupportTopicsService:
         Returns:
             thread_id топика в админской супергруппе
         """
+        return await self._thread_flight.do(
+            user_telegram_id,
+            lambda: self._get_or_create_thread(user_telegram_id, user_fullname),
+        )
+
+    async def _get_or_create_thread(self, user_telegram_id: int, user_fullname: str | None) -> int:
         # Пытаемся получить существующую связь
         logger.debug(f"Попытка получить существующую связь для user_telegram_id={user_telegram_id}")
         try:
             mapping = await self.support_topics_api.get_by_telegram(user_telegram_id)
-            if mapping:
-                logger.info(
-                    f"Используем существующий топик для user_telegram_id={user_telegram_id}, "
-                    f"thread_id={mapping.thread_id}"
-                )
-                return mapping.thread_id
         except Exception as e:
-            logger.warning(
-                f"Ошибка при получении существующей связи для user_telegram_id={user_telegram_id}: {e}. "
-                f"Продолжаем создание нового топика."
+            # Backend недоступен (в том числе CircuitOpenError/BulkheadFullError) — связь неизвестна,
+            # а не отсутствует: новый топик не создаём, действие повторится позже
+            logger.warning(f"Не удалось получить связь для user_telegram_id={user_telegram_id}: {e}")
+            raise
+        if mapping:
+            logger.info(
+                f"Используем существующий топик для user_telegram_id={user_telegram_id}, "
+                f"thread_id={mapping.thread_id}"
             )
-            # Продолжаем создание нового топика, если не удалось получить связь
+            return mapping.thread_id
 
-        # Связи нет - создаём новый топик
+        # Связи нет (404) - создаём новый топик
         topic_name = f"{user_fullname or user_telegram_id}"
         
         logger.info(f"Создание нового топика для user_telegram_id={user_telegram_id}, название: {topic_name}")
@@ -103,10 +132,22 @@ class SupportTopicsService:
 
         return thread_id
 
+    async def create_thread_later(self, user_telegram_id: int, user_fullname: str | None) -> None:
+        """Создать топик поддержки для пользователя в фоне (регистрация, write_access_allowed)."""
+        await self._submit(
+            "support_topic",
+            {"user_telegram_id": user_telegram_id, "user_fullname": user_fullname},
+            key=f"user:{user_telegram_id}",
+            run=self._create_thread,
+        )
+
     async def forward_user_to_topic(self, message: Message, order_id: str | None = None) -> None:
         """
         Переслать сообщение пользователя в соответствующий топик админской супергруппы.
         
+        Пересылка выполняется в фоне, сообщения одного пользователя — по порядку.
+        Альбом собирается целиком и пересылается одним copy_messages.
+        
         Args:
             message: Сообщение от пользователя
             order_id: Опциональный ID заказа
@@ -115,40 +156,27 @@ class SupportTopicsService:
             logger.warning("Попытка переслать сообщение без from_user")
             return
 
-        user_telegram_id = message.from_user.id
-        user_fullname = message.from_user.full_name
-
-        try:
-            thread_id = await self.get_or_create_thread(
-                user_telegram_id=user_telegram_id,
-                user_fullname=user_fullname,
-                order_id=order_id,
-            )
-        except Exception as e:
-            logger.error(
-                f"КРИТИЧЕСКАЯ ОШИБКА при получении/создании топика для пользователя {user_telegram_id}: {e}",
-                exc_info=True
-            )
-            # Возвращаемся, чтобы не падать боту, но логируем полную информацию
-            return
-
-        try:
-            await self.bot.copy_message(
-                chat_id=self.settings.admin_chat_id,
-                message_thread_id=thread_id,
-                from_chat_id=message.chat.id,
-                message_id=message.message_id,
-            )
-        except Exception as e:
-            logger.error(
-                f"Ошибка при пересылке сообщения пользователя {user_telegram_id} "
-                f"в топик {thread_id}: {e}"
-            )
+        payload = {
+            "user_telegram_id": message.from_user.id,
+            "user_fullname": message.from_user.full_name,
+            "from_chat_id": message.chat.id,
+            "order_id": order_id,
+        }
+        await self._relay_in_order(
+            message,
+            scope=("user", message.from_user.id),
+            relay=partial(
+                self._submit_relay, "relay_to_topic", payload, f"user:{message.from_user.id}", self._relay_to_topic
+            ),
+        )
 
     async def forward_admin_to_user(self, message: Message) -> None:
         """
         Переслать сообщение админа из топика пользователю в личку.
         
+        Пересылка выполняется в фоне, сообщения одного топика — по порядку.
+        Альбом собирается целиком и пересылается одним copy_messages.
+        
         Args:
             message: Сообщение админа из топика
         """
@@ -156,21 +184,115 @@ class SupportTopicsService:
             logger.warning("Попытка переслать сообщение без message_thread_id")
             return
 
-        thread_id = message.message_thread_id
-        admin_chat_id = message.chat.id
+        payload = {"admin_chat_id": message.chat.id, "thread_id": message.message_thread_id}
+        await self._relay_in_order(
+            message,
+            scope=("thread", message.chat.id, message.message_thread_id),
+            relay=partial(
+                self._submit_relay,
+                "relay_to_user",
+                payload,
+                f"thread:{message.chat.id}:{message.message_thread_id}",
+                self._relay_to_user,
+            ),
+        )
+
+    async def flush_media_groups(self) -> None:
+        """Переслать альбомы, которые ещё собираются (при остановке бота)."""
+        await self.media_groups.flush_all()
 
+    async def notify_admin_about_order_chat(
+        self,
+        user_telegram_id: int,
+        user_fullname: str | None,
+        order_id: str,
+    ) -> None:
+        """
+        Уведомить администратора о том, что пользователь нажал кнопку "Чат по заказу".
+        
+        Уведомление отправляется в фоне, но раньше следующих сообщений пользователя.
+        
+        Args:
+            user_telegram_id: Telegram ID пользователя
+            user_fullname: Полное имя пользователя
+            order_id: ID заказа
+        """
+        await self._submit(
+            "notify_order_chat",
+            {"user_telegram_id": user_telegram_id, "user_fullname": user_fullname, "order_id": order_id},
+            key=f"user:{user_telegram_id}",
+            run=self._notify_order_chat,
+        )
+
+    async def _relay_in_order(
+        self,
+        message: Message,
+        *,
+        scope: tuple,
+        relay: Callable[[list[int]], Awaitable[None]],
+    ) -> None:
+        if message.media_group_id:
+            # Остальные сообщения альбома придут отдельными апдейтами через мгновение
+            self.media_groups.add(scope, message.media_group_id, message.message_id, relay)
+            return
+        # Собранные альбомы уходят раньше нового сообщения
+        await self.media_groups.flush_scope(scope)
+        await relay([message.message_id])
+
+    async def _submit_relay(
+        self,
+        kind: str,
+        payload: dict[str, Any],
+        key: str,
+        run: Callable[[dict[str, Any]], Awaitable[None]],
+        message_ids: list[int],
+    ) -> None:
+        await self._submit(kind, {**payload, "message_ids": message_ids}, key=key, run=run)
+
+    async def _submit(
+        self,
+        kind: str,
+        payload: dict[str, Any],
+        *,
+        key: str,
+        run: Callable[[dict[str, Any]], Awaitable[None]],
+    ) -> None:
+        """Поставить действие в очередь фоновых действий; без очереди (или при переполнении) выполнить сразу."""
+        if self.side_effects is not None and self.side_effects.enqueue(kind, payload, key=key):
+            return
         try:
-            mapping = await self.support_topics_api.get_by_thread(
-                admin_chat_id=admin_chat_id,
-                thread_id=thread_id,
-            )
+            await run(payload)
         except Exception as e:
-            logger.error(
-                f"Ошибка при получении связи для thread_id={thread_id}, "
-                f"admin_chat_id={admin_chat_id}: {e}"
-            )
-            return
+            logger.error(f"Ошибка при выполнении действия {kind} ({payload}): {e}", exc_info=True)
 
+    async def _create_thread(self, payload: dict[str, Any]) -> None:
+        await self.get_or_create_thread(
+            user_telegram_id=payload["user_telegram_id"],
+            user_fullname=payload["user_fullname"],
+        )
+
+    async def _relay_to_topic(self, payload: dict[str, Any]) -> None:
+        user_telegram_id = payload["user_telegram_id"]
+        thread_id = await self.get_or_create_thread(
+            user_telegram_id=user_telegram_id,
+            user_fullname=payload["user_fullname"],
+            order_id=payload["order_id"],
+        )
+        await self._copy(
+            chat_id=self.settings.admin_chat_id,
+            message_thread_id=thread_id,
+            from_chat_id=payload["from_chat_id"],
+            message_ids=_message_ids(payload),
+        )
+
+    async def _relay_to_user(self, payload: dict[str, Any]) -> None:
+        thread_id = payload["thread_id"]
+        admin_chat_id = payload["admin_chat_id"]
+
+        mapping = await self.support_topics_api.get_by_thread(
+            admin_chat_id=admin_chat_id,
+            thread_id=thread_id,
+        )
         if not mapping:
             logger.warning(
                 f"Не найдено соответствие для thread_id={thread_id}, "
@@ -179,32 +301,94 @@ class SupportTopicsService:
             return
 
         user_telegram_id = mapping.user_telegram_id
-
         try:
-            await self.bot.copy_message(
+            await self._copy(
                 chat_id=user_telegram_id,
                 from_chat_id=admin_chat_id,
-                message_id=message.message_id,
+                message_ids=_message_ids(payload),
             )
-        except TelegramBadRequest as e:
-            # Пользователь заблокировал бота или другие проблемы с доставкой
+        except (TelegramBadRequest, TelegramForbiddenError) as e:
+            # Пользователь заблокировал бота или другие проблемы с доставкой — повтор не поможет
             logger.warning(
                 f"Не удалось отправить сообщение пользователю {user_telegram_id} "
                 f"(возможно, бот заблокирован): {e}"
             )
-        except Exception as e:
-            logger.error(
-                f"Ошибка при пересылке сообщения админа пользователю {user_telegram_id}: {e}"
+            raise
+
+    async def _copy(
+        self,
+        *,
+        chat_id: int,
+        from_chat_id: int,
+        message_ids: list[int],
+        message_thread_id: int | None = None,
+    ) -> None:
+        if len(message_ids) == 1:
+            await self.bot.copy_message(
+                chat_id=chat_id,
+                message_thread_id=message_thread_id,
+                from_chat_id=from_chat_id,
+                message_id=message_ids[0],
+            )
+        else:
+            # Один запрос на весь альбом, группировка сохраняется
+            await self.bot.copy_messages(
+                chat_id=chat_id,
+                message_thread_id=message_thread_id,
+                from_chat_id=from_chat_id,
+                message_ids=message_ids,
             )
 
-    async def notify_admin_about_order_chat(
+    async def _notify_order_chat(self, payload: dict[str, Any]) -> None:
+        user_telegram_id = payload["user_telegram_id"]
+        order_id = payload["order_id"]
+
+        # Получаем или создаем топик для пользователя
+        thread_id = await self.get_or_create_thread(
+            user_telegram_id=user_telegram_id,
+            user_fullname=payload["user_fullname"],
+        )
+
+        # Получаем информацию о заказе
+        order_info = await self._order_info(order_id)
+
+        # Формируем сообщение
+        message_lines = [
+            f"💬 <b>Пользователь нажал кнопку «Чат по заказу»</b>",
+            f"",
+            f"📦 <b>Заказ:</b> #{order_id}",
+        ]
+
+        if order_info:
+            message_lines.append("")
+            message_lines.append("━━━━━━━━━━━━━━━━━━━━")
+            message_lines.append("")
+            message_lines.append("ℹ️ <b>Информация по заказу:</b>")
+            message_lines.append("")
+            message_lines.append(order_info)
+
+        message_text = "\n".join(message_lines)
+
+        # Отправляем сообщение администратору в топик с кнопкой "Подробнее"
+        await self.bot.send_message(
+            chat_id=self.settings.admin_chat_id,
+            message_thread_id=thread_id,
+            text=message_text,
+            reply_markup=admin_order_details_button(order_id),
+        )
+        logger.info(
+            f"Отправлено уведомление администратору о чате по заказу {order_id} "
+            f"для пользователя {user_telegram_id} в топик {thread_id}"
+        )
+
+    async def notify_admin_about_new_order(
         self,
         user_telegram_id: int,
         user_fullname: str | None,
         order_id: str,
     ) -> None:
         """
-        Уведомить администратора о том, что пользователь нажал кнопку "Чат по заказу".
+        Уведомить администратора о новом заказе в топик пользователя.
         
         Args:
             user_telegram_id: Telegram ID пользователя
@@ -212,138 +396,67 @@ class SupportTopicsService:
             order_id: ID заказа
         """
         try:
-            # Получаем или создаем топик для пользователя
-            thread_id = await self.get_or_create_thread(
+            await self.notify_admin_about_order_events(
                 user_telegram_id=user_telegram_id,
                 user_fullname=user_fullname,
-            )
-            
-            # Получаем информацию о заказе
-            order_info = None
-            if self.orders_api:
-                try:
-                    order_details = await self.orders_api.get_order(order_id)
-                    if order_details and self.order_builder:
-                        order_info = self.order_builder.format_order(
-                            OrderSummary(
-                                orderId=order_details.orderId,
-                                customerName=None,
-                                deliveryMethod=order_details.deliveryMethod or "",
-                                total=order_details.total,
-                                status=order_details.status,
-                                createdAt=order_details.createdAt,
-                            )
-                        )
-                except Exception as e:
-                    logger.warning(f"Не удалось получить информацию о заказе {order_id}: {e}")
-            
-            # Формируем сообщение
-            message_lines = [
-                f"💬 <b>Пользователь нажал кнопку «Чат по заказу»</b>",
-                f"",
-                f"📦 <b>Заказ:</b> #{order_id}",
-            ]
-            
-            if order_info:
-                message_lines.append("")
-                message_lines.append("━━━━━━━━━━━━━━━━━━━━")
-                message_lines.append("")
-                message_lines.append("ℹ️ <b>Информация по заказу:</b>")
-                message_lines.append("")
-                message_lines.append(order_info)
-            
-            message_text = "\n".join(message_lines)
-            
-            # Отправляем сообщение администратору в топик с кнопкой "Подробнее"
-            await self.bot.send_message(
-                chat_id=self.settings.admin_chat_id,
-                message_thread_id=thread_id,
-                text=message_text,
-                reply_markup=admin_order_details_button(order_id),
-            )
-            logger.info(
-                f"Отправлено уведомление администратору о чате по заказу {order_id} "
-                f"для пользователя {user_telegram_id} в топик {thread_id}"
+                order_id=order_id,
+                events=[OrderEvent(type="created", orderId=order_id, userTelegramId=user_telegram_id)],
             )
         except Exception as e:
             logger.error(
-                f"Ошибка при отправке уведомления администратору о чате по заказу {order_id} "
+                f"Ошибка при отправке уведомления администратору о новом заказе {order_id} "
                 f"для пользователя {user_telegram_id}: {e}",
                 exc_info=True
             )
 
-    async def notify_admin_about_new_order(
+    async def notify_admin_about_order_events(
         self,
         user_telegram_id: int,
         user_fullname: str | None,
         order_id: str,
+        events: list[OrderEvent],
     ) -> None:
         """
-        Уведомить администратора о новом заказе в топик пользователя.
-        
-        Args:
-            user_telegram_id: Telegram ID пользователя
-            user_fullname: Полное имя пользователя
-            order_id: ID заказа
+        Отправить в топик пользователя одно уведомление о событиях заказа
+        (создание, смены статуса). Ошибки пробрасываются — для повтора.
         """
+        # Получаем или создаем топик для пользователя
+        thread_id = await self.get_or_create_thread(
+            user_telegram_id=user_telegram_id,
+            user_fullname=user_fullname,
+        )
+        order_info = await self._order_info(order_id)
+
+        # Отправляем сообщение администратору в топик с кнопкой "Подробнее"
+        await self.bot.send_message(
+            chat_id=self.settings.admin_chat_id,
+            message_thread_id=thread_id,
+            text=OrdersTextBuilder.order_events_admin(order_id, events, order_info),
+            reply_markup=admin_order_details_button(order_id),
+        )
+        logger.info(
+            f"Отправлено уведомление администратору о событиях заказа {order_id} "
+            f"({', '.join(event.type for event in events)}) для пользователя {user_telegram_id} в топик {thread_id}"
+        )
+
+    async def _order_info(self, order_id: str) -> str | None:
+        """Краткая карточка заказа для уведомлений админа; None, если заказ получить не удалось."""
+        if not self.orders_api or not self.order_builder:
+            return None
         try:
-            # Получаем или создаем топик для пользователя
-            thread_id = await self.get_or_create_thread(
-                user_telegram_id=user_telegram_id,
-                user_fullname=user_fullname,
-            )
-            
-            # Получаем информацию о заказе
-            order_info = None
-            if self.orders_api:
-                try:
-                    order_details = await self.orders_api.get_order(order_id)
-                    if order_details and self.order_builder:
-                        order_info = self.order_builder.format_order(
-                            OrderSummary(
-                                orderId=order_details.orderId,
-                                customerName=None,
-                                deliveryMethod=order_details.deliveryMethod or "",
-                                total=order_details.total,
-                                status=order_details.status,
-                                createdAt=order_details.createdAt,
-                            )
-                        )
-                except Exception as e:
-                    logger.warning(f"Не удалось получить информацию о заказе {order_id}: {e}")
-            
-            # Формируем сообщение
-            message_lines = [
-                f"🆕 <b>Новый заказ создан</b>",
-                f"",
-                f"📦 <b>Заказ:</b> #{order_id}",
-            ]
-            
-            if order_info:
-                message_lines.append("")
-                message_lines.append("━━━━━━━━━━━━━━━━━━━━")
-                message_lines.append("")
-                message_lines.append("ℹ️ <b>Информация по заказу:</b>")
-                message_lines.append("")
-                message_lines.append(order_info)
-            
-            message_text = "\n".join(message_lines)
-            
-            # Отправляем сообщение администратору в топик с кнопкой "Подробнее"
-            await self.bot.send_message(
-                chat_id=self.settings.admin_chat_id,
-                message_thread_id=thread_id,
-                text=message_text,
-                reply_markup=admin_order_details_button(order_id),
-            )
-            logger.info(
-                f"Отправлено уведомление администратору о новом заказе {order_id} "
-                f"для пользователя {user_telegram_id} в топик {thread_id}"
-            )
+            order_details = await self.orders_api.get_order(order_id)
         except Exception as e:
-            logger.error(
-                f"Ошибка при отправке уведомления администратору о новом заказе {order_id} "
-                f"для пользователя {user_telegram_id}: {e}",
-                exc_info=True
+            logger.warning(f"Не удалось получить информацию о заказе {order_id}: {e}")
+            return None
+        if not order_details:
+            return None
+        return self.order_builder.format_order(
+            OrderSummary(
+                orderId=order_details.orderId,
+                customerName=None,
+                deliveryMethod=order_details.deliveryMethod or "",
+                total=order_details.total,
+                status=order_details.status,
+                createdAt=order_details.createdAt,
             )
-
+        )
@@ -0,0 +1,39 @@
+import asyncio
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[K, T]):
+    """
+    Объединение одновременных вызовов с одинаковым ключом.
+
+    Первый вызов запускает операцию отдельной задачей, остальные ждут её
+    результат (или исключение). Отмена одного из ожидающих не прерывает
+    операцию для остальных.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: dict[K, asyncio.Task[T]] = {}
+
+    async def do(self, key: K, func: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+
+    def inflight(self, key: K) -> bool:
+        return key in self._inflight
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def _forget(self, key: K, task: asyncio.Task[T]) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Помечаем исключение полученным, если все ожидающие были отменены
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,33 @@
+import pytest
+
+from tg_bot.config import Settings
+
+ADMIN_CHAT_ID = -1001234567890
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+def make_settings(**overrides) -> Settings:
+    """Настройки без .env и без файлов состояния."""
+    values = {
+        "telegram_bot_token": "123456:test",
+        "admin_chat_id": ADMIN_CHAT_ID,
+        "api_base_url": "http://backend.test",
+        "internal_token": "test-token",
+        "webapp_url": "https://example.com",
+        "webhook_secret": "secret",
+        "dedup_state_path": None,
+        "media_state_path": None,
+        "side_effects_journal_path": None,
+        "broadcast_state_path": None,
+        **overrides,
+    }
+    return Settings(_env_file=None, **values)
+
+
+@pytest.fixture
+def settings() -> Settings:
+    return make_settings()
@@ -0,0 +1,121 @@
+import asyncio
+import re
+from collections import Counter
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+
+from tg_bot.api_client.base import BaseApiClient
+from tg_bot.api_client.breaker import EndpointGuards
+from tg_bot.api_client.cache import TTLCache
+from tg_bot.api_client.orders import OrdersApi
+from tg_bot.api_client.pool import ApiHttpPool
+from tg_bot.bot.app import _get_cache
+
+BACKEND_URL = "http://backend.test"
+
+
+class StubBackend:
+    """Заглушка эндпоинтов заказов: считает запросы, GET отвечает статусом на момент получения запроса."""
+
+    def __init__(self, get_latency: float = 0.05, patch_latency: float = 0.01):
+        self.get_latency = get_latency
+        self.patch_latency = patch_latency
+        self.hits: Counter = Counter()
+        self.statuses: dict[str, str] = {}
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.hits[request.method] += 1
+        match = re.fullmatch(r"/api/v1/internal/orders/([^/]+)(/status)?", request.url.path)
+        if match is None:
+            return httpx.Response(404, json={"detail": "unknown endpoint"})
+        order_id = match.group(1)
+        if request.method == "PATCH":
+            await asyncio.sleep(self.patch_latency)
+            self.statuses[order_id] = httpx.Response(200, content=request.content).json()["newStatus"]
+            return httpx.Response(200, json=self._order(order_id))
+        body = self._order(order_id)
+        await asyncio.sleep(self.get_latency)
+        return httpx.Response(200, json=body)
+
+    def _order(self, order_id: str) -> dict:
+        return {
+            "orderId": order_id,
+            "status": self.statuses.get(order_id, "created"),
+            "total": "1500.00",
+            "deliveryMethod": "courier",
+            "createdAt": datetime.now(timezone.utc).isoformat(),
+            "items": [],
+        }
+
+
+@pytest.fixture
+def backend() -> StubBackend:
+    return StubBackend()
+
+
+@pytest.fixture
+async def make_api(backend):
+    pools: list[ApiHttpPool] = []
+
+    def make(get_cache: TTLCache | None = None) -> OrdersApi:
+        pool = ApiHttpPool(base_url=BACKEND_URL, timeout=BaseApiClient.DEFAULT_TIMEOUT, max_connections=100)
+        pool.client = httpx.AsyncClient(base_url=BACKEND_URL, transport=httpx.MockTransport(backend.handler))
+        pools.append(pool)
+        return OrdersApi(
+            base_url=BACKEND_URL,
+            token="test",
+            pool=pool,
+            guards=EndpointGuards(max_concurrency=100),
+            get_cache=get_cache,
+        )
+
+    yield make
+    for pool in pools:
+        await pool.aclose()
+
+
+@pytest.mark.anyio
+async def test_concurrent_identical_gets_make_one_request(backend, make_api):
+    api = make_api()
+
+    orders = await asyncio.gather(*(api.get_order("A1") for _ in range(20)))
+
+    assert backend.hits["GET"] == 1
+    assert all(order is not None and order.orderId == "A1" for order in orders)
+
+
+@pytest.mark.anyio
+async def test_write_invalidates_get_cache(backend, make_api):
+    api = make_api(TTLCache(name="test_orders_get", maxsize=100, ttl=60.0))
+
+    before = await api.get_order("B1")
+    await api.get_order("B1")
+    assert backend.hits["GET"] == 1
+
+    await api.update_order_status("B1", "paid")
+    after = await api.get_order("B1")
+
+    assert backend.hits["GET"] == 2
+    assert before.status == "created"
+    assert after.status == "paid"
+
+
+@pytest.mark.anyio
+async def test_get_after_write_does_not_join_earlier_request(backend, make_api):
+    api = make_api()
+
+    stale = asyncio.create_task(api.get_order("C1"))
+    await asyncio.sleep(0.01)
+    await api.update_order_status("C1", "paid")
+    fresh = await api.get_order("C1")
+
+    assert (await stale).status == "created"
+    assert fresh.status == "paid"
+    assert backend.hits["GET"] == 2
+
+
+def test_get_cache_disabled_by_default(settings):
+    assert settings.api_get_cache_ttl == 0
+    assert _get_cache(settings, "test_orders_get_default") is None
@@ -0,0 +1,69 @@
+import asyncio
+import sqlite3
+
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+
+from tg_bot.bot.fsm_storage import SqliteStorage
+
+KEY = StorageKey(bot_id=1, chat_id=100, user_id=100)
+TTL = 0.05
+
+
+@pytest.fixture
+async def storage(tmp_path):
+    storage = SqliteStorage(path=str(tmp_path / "fsm.sqlite3"), ttl=TTL)
+    yield storage
+    await storage.close()
+
+
+@pytest.mark.anyio
+async def test_new_state_drops_expired_data(storage):
+    await storage.set_data(KEY, {"order_id": "A1"})
+    await asyncio.sleep(TTL * 2)
+
+    await storage.set_state(KEY, "Support:waiting_message")
+
+    assert await storage.get_state(KEY) == "Support:waiting_message"
+    assert await storage.get_data(KEY) == {}
+
+
+@pytest.mark.anyio
+async def test_new_data_drops_expired_state(storage):
+    await storage.set_state(KEY, "Support:waiting_message")
+    await asyncio.sleep(TTL * 2)
+
+    await storage.set_data(KEY, {"order_id": "A2"})
+
+    assert await storage.get_data(KEY) == {"order_id": "A2"}
+    assert await storage.get_state(KEY) is None
+
+
+@pytest.mark.anyio
+async def test_clearing_state_does_not_revive_expired_data(storage):
+    await storage.set_state(KEY, "Support:waiting_message")
+    await storage.set_data(KEY, {"order_id": "A3"})
+    await asyncio.sleep(TTL * 2)
+
+    await storage.set_state(KEY, None)
+
+    assert await storage.get_data(KEY) == {}
+
+
+@pytest.mark.anyio
+async def test_locked_database_does_not_block_event_loop(tmp_path):
+    path = str(tmp_path / "fsm.sqlite3")
+    storage = SqliteStorage(path=path, ttl=60)
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        write = asyncio.create_task(storage.set_state(KEY, "Support:waiting_message"))
+        # Запись ждёт блокировку в потоке хранилища, event loop продолжает работать
+        await asyncio.sleep(0.1)
+        assert not write.done()
+    finally:
+        other.execute("COMMIT")
+        other.close()
+    await write
+    assert await storage.get_state(KEY) == "Support:waiting_message"
+    await storage.close()
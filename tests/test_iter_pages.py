@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from tg_bot.api_client.base import iter_pages
+from tg_bot.api_client.models import RecipientListResponse
+
+TOTAL = 7
+PAGE_SIZE = 3
+
+
+class StubRecipients:
+    """Список получателей; с `use_cursor=False` backend не отдаёт nextCursor и листается по offset."""
+
+    def __init__(self, use_cursor: bool = True):
+        self.use_cursor = use_cursor
+        self.requests: list[tuple[str | None, int]] = []
+
+    async def fetch(self, *, cursor: str | None, offset: int) -> RecipientListResponse:
+        self.requests.append((cursor, offset))
+        await asyncio.sleep(0)
+        start = int(cursor) if cursor is not None else offset
+        end = min(start + PAGE_SIZE, TOTAL)
+        next_cursor = str(end) if self.use_cursor and end < TOTAL else None
+        return RecipientListResponse(items=list(range(start, end)), nextCursor=next_cursor)
+
+
+async def _collect(pages) -> list[int]:
+    return [item async for page in pages for item in page.items]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("use_cursor", [True, False])
+async def test_pages_are_read_to_the_end(use_cursor):
+    backend = StubRecipients(use_cursor)
+
+    items = await _collect(iter_pages(backend.fetch, page_size=PAGE_SIZE))
+
+    assert items == list(range(TOTAL))
+    # Без курсора конец списка виден по неполной странице — лишнего запроса нет
+    assert len(backend.requests) == 3
+
+
+@pytest.mark.anyio
+async def test_next_page_is_fetched_while_current_is_processed():
+    backend = StubRecipients()
+    pages = iter_pages(backend.fetch, page_size=PAGE_SIZE, cursor="3")
+
+    first = await anext(pages)
+    await asyncio.sleep(0.01)
+    assert first.items == [3, 4, 5]
+    assert backend.requests == [("3", 0), ("6", 3)]
+
+    await pages.aclose()
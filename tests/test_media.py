@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+
+import pytest
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import SendPhoto
+from aiogram.types import FSInputFile
+
+from tg_bot.bot.media import MediaRegistry
+from tg_bot.http_app.sharding import shard_settings
+
+from conftest import make_settings
+
+PHOTO = "img/support.jpg"
+
+
+class StubBot:
+    """send_photo: по file_id отвечает заданной ошибкой, загрузка файла выдаёт новый file_id."""
+
+    def __init__(self, error: str | None = None):
+        self.error = error
+        self.uploads = 0
+
+    async def send_photo(self, chat_id, photo, **kwargs):
+        if isinstance(photo, FSInputFile):
+            self.uploads += 1
+            return SimpleNamespace(message_id=1, photo=[SimpleNamespace(file_id=f"uploaded-{self.uploads}")])
+        if self.error is not None:
+            raise TelegramBadRequest(method=SendPhoto(chat_id=chat_id, photo=photo), message=self.error)
+        return SimpleNamespace(message_id=1, photo=[SimpleNamespace(file_id=photo)])
+
+
+@pytest.fixture
+def registry(tmp_path) -> MediaRegistry:
+    (tmp_path / "img").mkdir()
+    (tmp_path / PHOTO).write_bytes(b"photo")
+    registry = MediaRegistry(bot_id=1, media_dir=tmp_path)
+    registry._file_ids[registry._key(PHOTO)] = "stale-file-id"
+    return registry
+
+
+@pytest.mark.anyio
+async def test_rejected_file_id_is_reuploaded(registry):
+    bot = StubBot(error="Bad Request: wrong file identifier/HTTP URL specified")
+
+    message = await registry.send_photo(bot, 555, PHOTO)
+
+    assert bot.uploads == 1
+    assert message.photo[-1].file_id == "uploaded-1"
+    assert registry.file_id(PHOTO) == "uploaded-1"
+
+
+@pytest.mark.anyio
+async def test_other_bad_request_is_not_reuploaded(registry):
+    bot = StubBot(error="Bad Request: chat not found")
+
+    with pytest.raises(TelegramBadRequest):
+        await registry.send_photo(bot, 555, PHOTO)
+
+    assert bot.uploads == 0
+    assert registry.file_id(PHOTO) == "stale-file-id"
+
+
+def test_each_shard_has_own_media_registry():
+    settings = make_settings(media_state_path="state/media_file_ids.json")
+
+    paths = {shard_settings(settings, index, 2).media_state_path for index in range(2)}
+
+    assert paths == {"state/media_file_ids.json.0", "state/media_file_ids.json.1"}
@@ -0,0 +1,125 @@
+import asyncio
+from collections import Counter
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+
+from tg_bot.api_client.breaker import EndpointGuards
+from tg_bot.api_client.cache import TTLCache
+from tg_bot.api_client.orders import OrderPages, OrdersApi
+
+BACKEND_URL = "http://backend.test"
+USER_ID = 555
+PAGE_SIZE = 5
+TOTAL_ORDERS = 12
+
+
+class StubOrdersBackend:
+    """Список заказов с курсором; `fail_cursor` — курсор, запрос с которым один раз завершится ошибкой."""
+
+    def __init__(self):
+        self.requests: Counter = Counter()
+        self.fail_cursor: str | None = None
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        cursor = request.url.params.get("cursor")
+        self.requests[cursor] += 1
+        if cursor is not None and cursor == self.fail_cursor:
+            self.fail_cursor = None
+            return httpx.Response(500, json={"detail": "boom"})
+        start = int(cursor) if cursor is not None else 0
+        end = min(start + int(request.url.params["limit"]), TOTAL_ORDERS)
+        items = [
+            {
+                "orderId": f"O{index}",
+                "customerName": None,
+                "deliveryMethod": "courier",
+                "total": "100.00",
+                "status": "created",
+                "createdAt": datetime.now(timezone.utc).isoformat(),
+            }
+            for index in range(start, end)
+        ]
+        return httpx.Response(200, json={"items": items, "nextCursor": str(end) if end < TOTAL_ORDERS else None})
+
+
+@pytest.fixture
+def backend() -> StubOrdersBackend:
+    return StubOrdersBackend()
+
+
+@pytest.fixture
+async def api(backend):
+    api = OrdersApi(
+        base_url=BACKEND_URL,
+        token="test",
+        guards=EndpointGuards(),
+        page_cache=TTLCache(name="test_order_pages", maxsize=10, ttl=60.0, on_evict=OrderPages.close),
+    )
+    api._pool.client = httpx.AsyncClient(base_url=BACKEND_URL, transport=httpx.MockTransport(backend.handler))
+    yield api
+    await api._pool.aclose()
+
+
+def _ids(orders) -> list[str]:
+    return [order.orderId for order in orders]
+
+
+@pytest.mark.anyio
+async def test_pages_follow_cursor_and_are_cached(api, backend):
+    first, has_next = await api.orders_page(USER_ID, 0, page_size=PAGE_SIZE)
+    assert _ids(first) == ["O0", "O1", "O2", "O3", "O4"] and has_next
+    last, has_next = await api.orders_page(USER_ID, 2, page_size=PAGE_SIZE)
+    assert _ids(last) == ["O10", "O11"] and not has_next
+
+    again, _ = await api.orders_page(USER_ID, 0, page_size=PAGE_SIZE)
+    assert _ids(again) == _ids(first)
+    assert backend.requests == {None: 1, "5": 1, "10": 1}
+
+
+async def _wait_for(condition) -> None:
+    async with asyncio.timeout(1):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+@pytest.mark.anyio
+async def test_next_page_is_prefetched(api, backend):
+    await api.orders_page(USER_ID, 0, page_size=PAGE_SIZE)
+    # Следующая страница загружается, пока пользователь смотрит текущую
+    await _wait_for(lambda: backend.requests["5"] == 1)
+
+    second, has_next = await api.orders_page(USER_ID, 1, page_size=PAGE_SIZE)
+
+    assert _ids(second) == ["O5", "O6", "O7", "O8", "O9"] and has_next
+    assert backend.requests["5"] == 1
+
+
+@pytest.mark.anyio
+async def test_failed_prefetch_is_retried_from_saved_cursor(api, backend):
+    backend.fail_cursor = "5"
+    await api.orders_page(USER_ID, 0, page_size=PAGE_SIZE)
+    await _wait_for(lambda: backend.requests["5"] == 1)
+
+    second, has_next = await api.orders_page(USER_ID, 1, page_size=PAGE_SIZE)
+
+    assert _ids(second) == ["O5", "O6", "O7", "O8", "O9"] and has_next
+    # Первая страница не запрашивалась заново
+    assert backend.requests[None] == 1
+    assert backend.requests["5"] == 2
+
+
+@pytest.mark.anyio
+async def test_refresh_and_eviction_cancel_prefetch(api):
+    await api.orders_page(USER_ID, 0, page_size=PAGE_SIZE)
+    stale = api.page_cache.get((USER_ID, PAGE_SIZE))._prefetch
+
+    await api.orders_page(USER_ID, 0, page_size=PAGE_SIZE, refresh=True)
+    await asyncio.sleep(0)
+    assert stale.cancelled()
+
+    pending = api.page_cache.get((USER_ID, PAGE_SIZE))._prefetch
+    api.page_cache.invalidate((USER_ID, PAGE_SIZE))
+    await asyncio.sleep(0)
+    assert pending.cancelled()
@@ -0,0 +1,53 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from tg_bot.api_client.models import OrderSummary
+from tg_bot.bot.routers.orders import orders_pagination
+from tg_bot.services.order_service import OrdersTextBuilder
+
+
+class StubCallback:
+    def __init__(self, data: str, calls: list[str]):
+        self.data = data
+        self.from_user = SimpleNamespace(id=555)
+        self.calls = calls
+        self.message = SimpleNamespace(edit_text=self._edit_text)
+
+    async def answer(self, text: str | None = None) -> None:
+        self.calls.append("answer")
+
+    async def _edit_text(self, text: str, reply_markup=None) -> None:
+        self.calls.append("edit")
+
+
+class StubOrdersApi:
+    def __init__(self, calls: list[str]):
+        self.calls = calls
+
+    async def orders_page(self, telegram_id: int, index: int, *, page_size: int, refresh: bool = False):
+        self.calls.append("fetch")
+        order = OrderSummary(
+            orderId="O1",
+            customerName=None,
+            deliveryMethod="courier",
+            total="100.00",
+            status="created",
+            createdAt=datetime.now(timezone.utc),
+        )
+        return [order], False
+
+
+@pytest.mark.anyio
+async def test_pagination_answers_callback_before_fetching():
+    calls: list[str] = []
+
+    await orders_pagination(
+        StubCallback("orders:page:5", calls),
+        user_profile=SimpleNamespace(telegramId=555),
+        orders_api=StubOrdersApi(calls),
+        order_builder=OrdersTextBuilder(webapp_url="https://example.com"),
+    )
+
+    assert calls == ["answer", "fetch", "edit"]
@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+import pytest
+
+from tg_bot.bot.middlewares.rate_limiter import RateLimitDeadlineError, TelegramRateLimiter
+from tg_bot.bot.middlewares.retry_policy import update_deadline
+
+CHAT_ID = 555
+
+
+def _limiter() -> TelegramRateLimiter:
+    # Одна отправка в секунду в личный чат, без запаса
+    return TelegramRateLimiter(global_rate=100.0, private_rate=1.0, private_burst=1)
+
+
+def _chat_delay(limiter: TelegramRateLimiter) -> float:
+    bucket = limiter._chat_bucket(CHAT_ID)
+    delay = bucket.reserve(time.monotonic())
+    bucket.release()
+    return delay
+
+
+@pytest.mark.anyio
+async def test_cancelled_wait_returns_reservation():
+    limiter = _limiter()
+    await limiter.acquire("sendMessage", CHAT_ID)
+    waiting = asyncio.create_task(limiter.acquire("sendMessage", CHAT_ID))
+    await asyncio.sleep(0.05)
+
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+
+    # Следующая отправка ждёт только первую, а не отменённую
+    assert _chat_delay(limiter) < 1.0
+
+
+@pytest.mark.anyio
+async def test_delay_past_deadline_fails_fast():
+    limiter = _limiter()
+    await limiter.acquire("sendMessage", CHAT_ID)
+
+    started = time.monotonic()
+    with update_deadline(0.5):
+        with pytest.raises(RateLimitDeadlineError):
+            await limiter.acquire("sendMessage", CHAT_ID)
+
+    assert time.monotonic() - started < 0.1
+    assert _chat_delay(limiter) < 1.0
+
+
+@pytest.mark.anyio
+async def test_delay_within_deadline_waits():
+    limiter = TelegramRateLimiter(global_rate=100.0, private_rate=10.0, private_burst=1)
+    await limiter.acquire("sendMessage", CHAT_ID)
+
+    with update_deadline(1.0):
+        waited = await limiter.acquire("sendMessage", CHAT_ID)
+
+    assert 0 < waited <= 0.1
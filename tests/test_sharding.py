@@ -0,0 +1,99 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from tg_bot.api_client.models import OrderEvent
+from tg_bot.http_app.app import create_shard_front_app
+from tg_bot.http_app.sharding import ShardRouter, serve_shard
+
+
+class RecordingQueue:
+    def __init__(self):
+        self.updates: list[bytes] = []
+
+    async def put(self, raw_update: bytes) -> None:
+        self.updates.append(raw_update)
+
+
+class RecordingOrderEvents:
+    def __init__(self):
+        self.events: list[OrderEvent] = []
+
+    def submit(self, events: list[OrderEvent]) -> None:
+        self.events.extend(events)
+
+
+def _event(order_id: str, user_telegram_id: int) -> dict:
+    return {"type": "created", "orderId": order_id, "userTelegramId": user_telegram_id}
+
+
+@pytest.fixture
+async def shards(tmp_path):
+    socket_paths = [str(tmp_path / f"shard-{index}.sock") for index in range(2)]
+    queues = [RecordingQueue() for _ in socket_paths]
+    order_events = [RecordingOrderEvents() for _ in socket_paths]
+    servers = [
+        await serve_shard(path, queue, events)
+        for path, queue, events in zip(socket_paths, queues, order_events)
+    ]
+    router = ShardRouter(socket_paths=socket_paths)
+    await router.start()
+    yield router, queues, order_events
+    await router.stop(drain_timeout=1)
+    for server in servers:
+        server.close()
+
+
+async def _wait_for(condition) -> None:
+    async with asyncio.timeout(1):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+@pytest.mark.anyio
+async def test_front_forwards_order_events_to_customer_shard(shards, settings):
+    router, _, order_events = shards
+    app = create_shard_front_app(settings, router)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bot.test") as client:
+        response = await client.post(
+            "/internal/order-events",
+            headers={"Authorization": f"Bearer {settings.internal_token}"},
+            json=[_event("A1", 10), _event("A2", 11), _event("A3", 12)],
+        )
+
+    assert response.status_code == 202
+    assert response.json() == {"status": "accepted", "events": 3}
+    await _wait_for(lambda: len(order_events[0].events) + len(order_events[1].events) == 3)
+    assert [event.orderId for event in order_events[0].events] == ["A1", "A3"]
+    assert [event.orderId for event in order_events[1].events] == ["A2"]
+
+
+@pytest.mark.anyio
+async def test_updates_and_events_share_the_socket(shards):
+    router, queues, order_events = shards
+    raw_update = json.dumps({"update_id": 1, "message": {"chat": {"id": 11}}}).encode()
+
+    assert router.submit(raw_update)
+    assert router.submit_order_events([OrderEvent.model_validate(_event("B1", 11))])
+
+    await _wait_for(lambda: queues[1].updates and order_events[1].events)
+    assert queues[1].updates == [raw_update]
+    assert [event.orderId for event in order_events[1].events] == ["B1"]
+
+
+@pytest.mark.anyio
+async def test_unavailable_shard_rejects_all_events(tmp_path, settings):
+    router = ShardRouter(socket_paths=[str(tmp_path / "missing-0.sock"), str(tmp_path / "missing-1.sock")], connect_timeout=0)
+    app = create_shard_front_app(settings, router)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bot.test") as client:
+        response = await client.post(
+            "/internal/order-events",
+            headers={"Authorization": f"Bearer {settings.internal_token}"},
+            json=_event("C1", 10),
+        )
+
+    assert response.status_code == 503
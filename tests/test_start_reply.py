@@ -0,0 +1,159 @@
+import asyncio
+import json
+import re
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any
+
+import httpx
+import pytest
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import CreateForumTopic, GetUserProfilePhotos, SendMessage, TelegramMethod
+from aiogram.types import Chat, ForumTopic, Message, PhotoSize, Update, UserProfilePhotos
+
+from tg_bot.bot.app import create_bot_and_dispatcher
+
+from conftest import make_settings
+
+BACKEND_URL = "http://backend.test"
+BACKEND_LATENCY = 0.02
+TELEGRAM_LATENCY = 0.01
+# Создание топика — медленный вызов, которого первый ответ ждать не должен
+SLOW_TELEGRAM_LATENCY = 0.5
+PROFILE_PHOTO_TIMEOUT = 0.2
+NEW_USER_ID = 700001
+SLOW_PHOTO_USER_ID = 700002
+
+
+class StubTelegramSession(BaseSession):
+    """Telegram с задержкой на каждый вызов; запоминает время первого сообщения в каждый чат."""
+
+    def __init__(self):
+        super().__init__()
+        self.first_reply: dict[int, float] = {}
+        # Пользователи, фото профиля которых Telegram отдаёт дольше PROFILE_PHOTO_TIMEOUT
+        self.slow_photos: set[int] = set()
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: int | None = None) -> Any:
+        if isinstance(method, CreateForumTopic) or (
+            isinstance(method, GetUserProfilePhotos) and method.user_id in self.slow_photos
+        ):
+            await asyncio.sleep(SLOW_TELEGRAM_LATENCY)
+        else:
+            await asyncio.sleep(TELEGRAM_LATENCY)
+        if isinstance(method, SendMessage):
+            self.first_reply.setdefault(method.chat_id, time.perf_counter())
+            return Message(
+                message_id=1,
+                date=datetime.now(timezone.utc),
+                chat=Chat(id=method.chat_id, type="private"),
+                text=method.text,
+            )
+        if isinstance(method, GetUserProfilePhotos):
+            photo = PhotoSize(file_id="photo-file-id", file_unique_id="photo", width=640, height=640)
+            return UserProfilePhotos(total_count=1, photos=[[photo]])
+        if isinstance(method, CreateForumTopic):
+            return ForumTopic(message_thread_id=42, name=method.name, icon_color=0)
+        return True
+
+    async def close(self) -> None:
+        pass
+
+    async def stream_content(self, *args: Any, **kwargs: Any):  # pragma: no cover - не используется
+        raise NotImplementedError
+
+
+class StubBackend:
+    """LeafFlow API с задержкой; запоминает профили из регистрации."""
+
+    def __init__(self):
+        self.profiles: dict[int, dict] = {}
+        self.profile_lookups = 0
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(BACKEND_LATENCY)
+        path = request.url.path
+        if match := re.fullmatch(r"/api/v1/internal/users/by-telegram/(\d+)", path):
+            self.profile_lookups += 1
+            profile = self.profiles.get(int(match.group(1)))
+            if profile is None:
+                return httpx.Response(404, json={"detail": "not found"})
+            return httpx.Response(200, json=profile)
+        if path == "/api/v1/internal/users/register":
+            body = json.loads(request.content)
+            if body["telegramId"] in self.profiles:
+                return httpx.Response(409, json={"detail": "user already exists"})
+            profile = {"id": f"user-{body['telegramId']}", "lastName": None, "username": None, "photoUrl": None, **body}
+            self.profiles[body["telegramId"]] = profile
+            return httpx.Response(200, json=profile)
+        if path == "/api/v1/internal/orders":
+            return httpx.Response(200, json={"items": []})
+        if path.startswith("/api/v1/internal/support-topics/by-telegram/"):
+            return httpx.Response(404, json={"detail": "not found"})
+        if path == "/api/v1/internal/support-topics/ensure":
+            return httpx.Response(200, content=request.content)
+        return httpx.Response(404, json={"detail": "unknown endpoint"})
+
+
+@pytest.fixture(scope="module")
+def app():
+    # Роутеры модульные и подключаются к диспетчеру один раз за процесс
+    bot, dispatcher = create_bot_and_dispatcher(make_settings(user_cache_ttl=0, profile_photo_timeout=PROFILE_PHOTO_TIMEOUT))
+    bot.session = StubTelegramSession()
+    backend = StubBackend()
+    dispatcher["api_pool"].client = httpx.AsyncClient(base_url=BACKEND_URL, transport=httpx.MockTransport(backend.handler))
+    return SimpleNamespace(bot=bot, dispatcher=dispatcher, backend=backend)
+
+
+def _private_update(user_id: int, text: str) -> Update:
+    return Update.model_validate(
+        {
+            "update_id": 1,
+            "message": {
+                "message_id": 1,
+                "date": 1730000000,
+                "chat": {"id": user_id, "type": "private", "first_name": "Анна"},
+                "from": {"id": user_id, "is_bot": False, "first_name": "Анна", "language_code": "ru"},
+                "text": text,
+                "entities": [{"type": "bot_command", "offset": 0, "length": len(text)}],
+            },
+        }
+    )
+
+
+async def _first_reply(app, user_id: int) -> tuple[float, Any]:
+    started = time.perf_counter()
+    result = await app.dispatcher.feed_update(app.bot, _private_update(user_id, "/start"))
+    return app.bot.session.first_reply[user_id] - started, result
+
+
+@pytest.mark.anyio
+async def test_new_user_is_registered_with_photo_without_waiting_for_topic(app):
+    # Одна проверка на оба случая: диспетчер приложения создаётся один раз и привязан к своему циклу событий
+    app.bot.session.slow_photos.add(SLOW_PHOTO_USER_ID)
+    side_effects = app.dispatcher["side_effects"]
+    await side_effects.start()
+    try:
+        first_reply, result = await _first_reply(app, NEW_USER_ID)
+
+        # Профиль (404), фото, регистрация и отправка приветствия — без создания топика поддержки
+        assert first_reply < SLOW_TELEGRAM_LATENCY
+        assert isinstance(result, TelegramMethod)
+        # Фото профиля передано в первой же регистрации
+        assert app.backend.profiles[NEW_USER_ID]["photoUrl"] == "photo-file-id"
+
+        # Медленное фото не задерживает приветствие дольше PROFILE_PHOTO_TIMEOUT: регистрация без фото
+        first_reply, _ = await _first_reply(app, SLOW_PHOTO_USER_ID)
+        assert PROFILE_PHOTO_TIMEOUT <= first_reply < SLOW_TELEGRAM_LATENCY
+        assert app.backend.profiles[SLOW_PHOTO_USER_ID]["photoUrl"] is None
+
+        # Хендлеры без user_profile (здесь — catch-all пересылки в поддержку) профиль не запрашивают
+        lookups = app.backend.profile_lookups
+        await app.dispatcher.feed_update(app.bot, _private_update(NEW_USER_ID, "/help"))
+        assert app.backend.profile_lookups == lookups
+    finally:
+        await side_effects.stop(drain_timeout=5)
+        await app.dispatcher["api_pool"].aclose()
+    assert side_effects.dead_letters() == []
@@ -0,0 +1,60 @@
+import time
+
+from tg_bot.api_client.cache import CACHE_HITS, CACHE_MISSES
+from tg_bot.api_client.support_topics import SupportTopicMapping, SupportTopicMappingCache
+
+from conftest import ADMIN_CHAT_ID
+
+
+def _mapping(user_telegram_id: int, thread_id: int) -> SupportTopicMapping:
+    return SupportTopicMapping(user_telegram_id=user_telegram_id, admin_chat_id=ADMIN_CHAT_ID, thread_id=thread_id)
+
+
+def test_lookup_both_directions_with_metrics():
+    cache = SupportTopicMappingCache(maxsize=10, ttl=60, name="test_topics_lookup")
+    mapping = _mapping(1, 100)
+    cache.put(mapping)
+
+    assert cache.get_by_user(1) == mapping
+    assert cache.get_by_thread(ADMIN_CHAT_ID, 100) == mapping
+    assert cache.get_by_user(2) is None
+    assert CACHE_HITS.value(cache="test_topics_lookup") == 1
+    assert CACHE_HITS.value(cache="test_topics_lookup_by_thread") == 1
+    assert CACHE_MISSES.value(cache="test_topics_lookup") == 1
+
+
+def test_new_topic_replaces_old_reverse_key():
+    cache = SupportTopicMappingCache(maxsize=10, ttl=60, name="test_topics_replace")
+    cache.put(_mapping(1, 100))
+    cache.put(_mapping(1, 200))
+
+    assert cache.get_by_thread(ADMIN_CHAT_ID, 100) is None
+    assert cache.get_by_user(1).thread_id == 200
+
+
+def test_invalidation_clears_both_indexes():
+    cache = SupportTopicMappingCache(maxsize=10, ttl=60, name="test_topics_invalidate")
+    cache.put(_mapping(1, 100))
+    cache.put(_mapping(2, 200))
+
+    cache.invalidate_thread(ADMIN_CHAT_ID, 100)
+    cache.invalidate_user(2)
+
+    assert cache.get_by_user(1) is None
+    assert cache.get_by_thread(ADMIN_CHAT_ID, 200) is None
+    assert len(cache) == 0
+
+
+def test_lru_eviction_and_ttl():
+    cache = SupportTopicMappingCache(maxsize=2, ttl=60, name="test_topics_evict")
+    for user_telegram_id in (1, 2, 3):
+        cache.put(_mapping(user_telegram_id, 100 + user_telegram_id))
+    assert len(cache) == 2
+    assert cache.get_by_user(1) is None
+    assert cache.get_by_thread(ADMIN_CHAT_ID, 101) is None
+
+    short = SupportTopicMappingCache(maxsize=2, ttl=0.01, name="test_topics_ttl")
+    short.put(_mapping(1, 101))
+    time.sleep(0.02)
+    assert short.get_by_user(1) is None
+    assert short.get_by_thread(ADMIN_CHAT_ID, 101) is None
@@ -0,0 +1,108 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from aiogram.types import Message
+
+from tg_bot.api_client.errors import CircuitOpenError
+from tg_bot.api_client.support_topics import SupportTopicMapping
+from tg_bot.services.support_topics_service import SupportTopicsService
+
+USER_ID = 555
+
+
+class StubBot:
+    """Считает создание топиков и копирование сообщений."""
+
+    def __init__(self) -> None:
+        self.topics_created = 0
+        self.copied: list[tuple[int, int | None, int]] = []
+
+    async def create_forum_topic(self, chat_id: int, name: str) -> SimpleNamespace:
+        self.topics_created += 1
+        # Создание топика в Telegram заметно дольше остальных вызовов
+        await asyncio.sleep(0.05)
+        return SimpleNamespace(message_thread_id=100 + self.topics_created)
+
+    async def copy_message(self, chat_id: int, from_chat_id: int, message_id: int, message_thread_id=None) -> None:
+        self.copied.append((chat_id, message_thread_id, message_id))
+
+
+class StubSupportTopicsApi:
+    """Связи пользователь <-> топик в памяти, с задержкой backend."""
+
+    def __init__(self) -> None:
+        self.mappings: dict[int, SupportTopicMapping] = {}
+
+    async def get_by_telegram(self, user_telegram_id: int) -> SupportTopicMapping | None:
+        await asyncio.sleep(0.01)
+        return self.mappings.get(user_telegram_id)
+
+    async def ensure_mapping(self, user_telegram_id: int, admin_chat_id: int, thread_id: int) -> SupportTopicMapping:
+        await asyncio.sleep(0.01)
+        mapping = self.mappings.setdefault(
+            user_telegram_id,
+            SupportTopicMapping(user_telegram_id=user_telegram_id, admin_chat_id=admin_chat_id, thread_id=thread_id),
+        )
+        return mapping
+
+
+def _message(message_id: int) -> Message:
+    return Message.model_validate(
+        {
+            "message_id": message_id,
+            "date": 1730000000,
+            "chat": {"id": USER_ID, "type": "private", "first_name": "Анна"},
+            "from": {"id": USER_ID, "is_bot": False, "first_name": "Анна"},
+            "text": f"сообщение {message_id}",
+        }
+    )
+
+
+@pytest.fixture
+def bot() -> StubBot:
+    return StubBot()
+
+
+@pytest.fixture
+def support_topics_api() -> StubSupportTopicsApi:
+    return StubSupportTopicsApi()
+
+
+@pytest.fixture
+def service(bot, support_topics_api, settings) -> SupportTopicsService:
+    # Без очереди фоновых действий пересылка выполняется сразу
+    return SupportTopicsService(bot=bot, settings=settings, support_topics_api=support_topics_api)
+
+
+@pytest.mark.anyio
+async def test_concurrent_forwards_create_one_topic(service, bot, support_topics_api, settings):
+    await asyncio.gather(*(service.forward_user_to_topic(_message(index)) for index in range(50)))
+
+    assert bot.topics_created == 1
+    thread_id = support_topics_api.mappings[USER_ID].thread_id
+    assert len(bot.copied) == 50
+    assert {(chat_id, thread) for chat_id, thread, _ in bot.copied} == {(settings.admin_chat_id, thread_id)}
+
+
+@pytest.mark.anyio
+async def test_existing_mapping_is_reused(service, bot, support_topics_api, settings):
+    support_topics_api.mappings[USER_ID] = SupportTopicMapping(
+        user_telegram_id=USER_ID, admin_chat_id=settings.admin_chat_id, thread_id=42
+    )
+
+    assert await service.get_or_create_thread(USER_ID, "Анна") == 42
+    assert bot.topics_created == 0
+
+
+@pytest.mark.anyio
+async def test_lookup_failure_does_not_create_topic(service, bot, support_topics_api):
+    async def unavailable(user_telegram_id: int) -> SupportTopicMapping | None:
+        raise CircuitOpenError("circuit breaker is open")
+
+    support_topics_api.get_by_telegram = unavailable
+
+    with pytest.raises(CircuitOpenError):
+        await service.get_or_create_thread(USER_ID, "Анна")
+    assert bot.topics_created == 0
+    assert support_topics_api.mappings == {}
@@ -0,0 +1,116 @@
+import asyncio
+import json
+
+import pytest
+from aiogram import Bot, Router
+from aiogram.types import Message, Update
+
+from tg_bot.bot.scheduler import OrderedDispatcher, update_lane_key
+from tg_bot.http_app.update_queue import UpdateQueue
+
+from conftest import ADMIN_CHAT_ID
+
+BUSY_CHAT_ID = 111
+OTHER_CHAT_ID = 222
+
+
+def _raw_update(update_id: int, chat_id: int, *, thread_id: int | None = None, forum: bool = False) -> bytes:
+    chat = {"id": chat_id, "type": "supergroup" if forum else "private"}
+    if forum:
+        chat["is_forum"] = True
+    message = {
+        "message_id": update_id,
+        "date": 0,
+        "chat": chat,
+        "from": {"id": 555, "is_bot": False, "first_name": "Test"},
+        "text": str(update_id),
+    }
+    if thread_id is not None:
+        message["message_thread_id"] = thread_id
+        message["is_topic_message"] = True
+    return json.dumps({"update_id": update_id, "message": message}).encode()
+
+
+def _update(raw: bytes) -> Update:
+    return Update.model_validate_json(raw)
+
+
+def test_admin_forum_topics_get_own_lanes():
+    first = _update(_raw_update(1, ADMIN_CHAT_ID, thread_id=10, forum=True))
+    second = _update(_raw_update(2, ADMIN_CHAT_ID, thread_id=20, forum=True))
+    general = _update(_raw_update(3, ADMIN_CHAT_ID, forum=True))
+    private = _update(_raw_update(4, BUSY_CHAT_ID))
+
+    assert update_lane_key(first) == (ADMIN_CHAT_ID, 10)
+    assert update_lane_key(second) == (ADMIN_CHAT_ID, 20)
+    assert update_lane_key(general) == ADMIN_CHAT_ID
+    assert update_lane_key(private) == BUSY_CHAT_ID
+
+
+@pytest.mark.anyio
+async def test_busy_chat_does_not_hold_workers():
+    release = asyncio.Event()
+    handled: list[tuple[int, int]] = []
+    router = Router()
+
+    @router.message()
+    async def handler(message: Message) -> None:
+        if message.chat.id == BUSY_CHAT_ID:
+            await release.wait()
+        handled.append((message.chat.id, message.message_id))
+
+    dispatcher = OrderedDispatcher()
+    dispatcher.include_router(router)
+    queue = UpdateQueue(dispatcher=dispatcher, bot=Bot(token="123456:test"), maxsize=100, workers=2)
+    await queue.start()
+    try:
+        for update_id in range(1, 6):
+            assert queue.submit(_raw_update(update_id, BUSY_CHAT_ID))
+        assert queue.submit(_raw_update(6, OTHER_CHAT_ID))
+        # Апдейты занятого чата ждут в очереди полосы, второй воркер свободен для другого чата
+        async with asyncio.timeout(1):
+            while (OTHER_CHAT_ID, 6) not in handled:
+                await asyncio.sleep(0.01)
+        assert all(chat_id == OTHER_CHAT_ID for chat_id, _ in handled)
+
+        release.set()
+        async with asyncio.timeout(1):
+            await queue._queue.join()
+        assert [message_id for chat_id, message_id in handled if chat_id == BUSY_CHAT_ID] == [1, 2, 3, 4, 5]
+    finally:
+        await queue.stop(drain_timeout=1)
+
+
+@pytest.mark.anyio
+async def test_busy_chat_backlog_counts_against_queue_size():
+    release = asyncio.Event()
+    handled: list[int] = []
+    router = Router()
+
+    @router.message()
+    async def handler(message: Message) -> None:
+        await release.wait()
+        handled.append(message.message_id)
+
+    dispatcher = OrderedDispatcher()
+    dispatcher.include_router(router)
+    queue = UpdateQueue(dispatcher=dispatcher, bot=Bot(token="123456:test"), maxsize=2, workers=2)
+    await queue.start()
+    try:
+        accepted = []
+        for update_id in range(1, 201):
+            if queue.submit(_raw_update(update_id, BUSY_CHAT_ID)):
+                accepted.append(update_id)
+            # Даём воркерам разобрать очередь в очереди полосы
+            await asyncio.sleep(0)
+        # Один апдейт в обработке, остальные ждут в пределах maxsize
+        assert len(accepted) <= 1 + queue.maxsize
+        assert queue.qsize() == queue.maxsize
+
+        release.set()
+        async with asyncio.timeout(1):
+            await queue._queue.join()
+        assert handled == accepted
+        assert queue.qsize() == 0
+    finally:
+        await queue.stop(drain_timeout=1)